@@ -0,0 +1,148 @@
+# backend/alertas.py
+"""
+Alertas de permanencia: trabajos que llevan demasiado tiempo en un estado monitoreado.
+
+- Al entrar en un estado monitoreado, actualizar_estado_trabajo programa una tarea de Celery para
+  la fecha límite (celery_worker.programar_plazo_permanencia); si el trabajo ya salió del estado
+  cuando la tarea corre, no encuentra nada que alertar.
+- La detección es una sola consulta sobre los historiales abiertos (fecha_fin IS NULL) cuya fecha
+  límite ya pasó, excluyendo los que ya tienen alerta; el costo depende de las infracciones nuevas,
+  no de cuántos trabajos hay en el taller. La revisión periódica la usa como red de seguridad
+  (tareas perdidas, estados cambiados por fuera de la API).
+- Cada infracción queda en alertas_permanencia (una por historial) y se emite una sola vez.
+- La alerta se resuelve al cambiar de estado (actualizar_estado_trabajo); la revisión periódica
+  además resuelve las que hayan quedado abiertas con su historial ya cerrado.
+"""
+import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+import auth, eventos, models, schemas
+from database import get_db
+
+# Estados que queremos monitorear y sus límites de tiempo en horas
+ESTADOS_A_MONITOREAR = {
+    "espera de trabajo": 2,
+    "trabajo detenido": 24,
+}
+# Estados cuyo límite es la ETA informada al entrar (fecha_eta del historial), si la hay
+ESTADOS_CON_ETA = {"trabajo detenido"}
+
+
+def _utc_naive(fecha: datetime.datetime) -> datetime.datetime:
+    if fecha.tzinfo is not None:
+        return fecha.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+def fecha_limite(estado: str, fecha_inicio: datetime.datetime, fecha_eta: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """Momento (UTC) en que un estado monitoreado pasa a estar atrasado."""
+    if estado in ESTADOS_CON_ETA and fecha_eta:
+        return _utc_naive(fecha_eta)
+    return _utc_naive(fecha_inicio) + datetime.timedelta(hours=ESTADOS_A_MONITOREAR[estado])
+
+
+def _condicion_infraccion(ahora: datetime.datetime):
+    """La misma regla que fecha_limite(), en SQL, para todos los estados monitoreados a la vez."""
+    H = models.HistorialDeEstado
+    condiciones = []
+    for estado, limite_horas in ESTADOS_A_MONITOREAR.items():
+        por_horas = H.fecha_inicio < ahora - datetime.timedelta(hours=limite_horas)
+        if estado in ESTADOS_CON_ETA:
+            por_horas = or_(and_(H.fecha_eta.is_not(None), H.fecha_eta < ahora), and_(H.fecha_eta.is_(None), por_horas))
+        condiciones.append(and_(H.estado == estado, por_horas))
+    return or_(*condiciones)
+
+
+def _nueva_alerta(fila, ahora: datetime.datetime) -> models.AlertaPermanencia:
+    limite = fecha_limite(fila.estado, fila.fecha_inicio, fila.fecha_eta)
+    return models.AlertaPermanencia(
+        trabajo_id=fila.trabajo_id, historial_id=fila.id, estado=fila.estado,
+        limite_horas=round((limite - _utc_naive(fila.fecha_inicio)).total_seconds() / 3600, 2),
+        fecha_inicio_estado=fila.fecha_inicio, fecha_limite=limite, fecha_alerta=ahora,
+    )
+
+
+def detectar_alertas(
+    db: Session, ahora: Optional[datetime.datetime] = None, historial_id: Optional[int] = None
+) -> List[models.AlertaPermanencia]:
+    """
+    Registra (y confirma) una alerta por cada historial abierto que superó su límite y aún no la tenía.
+    Con `historial_id` revisa sólo ese estado. Devuelve las alertas nuevas.
+    """
+    ahora = ahora or datetime.datetime.utcnow()
+    H, A = models.HistorialDeEstado, models.AlertaPermanencia
+
+    consulta = select(H.id, H.trabajo_id, H.estado, H.fecha_inicio, H.fecha_eta).where(
+        H.fecha_fin.is_(None),
+        _condicion_infraccion(ahora),
+        ~exists().where(A.historial_id == H.id),
+    )
+    if historial_id is not None:
+        consulta = consulta.where(H.id == historial_id)
+
+    nuevas = [_nueva_alerta(fila, ahora) for fila in db.execute(consulta)]
+    if nuevas:
+        db.add_all(nuevas)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Otra revisión (el plazo programado y la periódica) registró la misma alerta a la vez
+            db.rollback()
+            return []
+    return nuevas
+
+
+def resolver_alertas_trabajo(db: Session, trabajo_id: int, ahora: datetime.datetime) -> None:
+    """Cierra las alertas abiertas del trabajo. No confirma: va dentro de la transacción de la transición."""
+    resolver_alertas_trabajos(db, [trabajo_id], ahora)
+
+
+def resolver_alertas_trabajos(db: Session, trabajo_ids: List[int], ahora: datetime.datetime) -> None:
+    """Igual que resolver_alertas_trabajo para varios trabajos, en un solo UPDATE (transiciones en lote)."""
+    A = models.AlertaPermanencia
+    db.execute(
+        update(A).where(A.trabajo_id.in_(trabajo_ids), A.fecha_resuelta.is_(None)).values(fecha_resuelta=ahora)
+    )
+
+
+def resolver_alertas_cerradas(db: Session, ahora: Optional[datetime.datetime] = None) -> int:
+    """Cierra las alertas abiertas cuyo historial ya terminó (p. ej. estados cambiados por fuera de la API)."""
+    ahora = ahora or datetime.datetime.utcnow()
+    H, A = models.HistorialDeEstado, models.AlertaPermanencia
+    resultado = db.execute(
+        update(A)
+        .where(A.fecha_resuelta.is_(None), exists().where(H.id == A.historial_id, H.fecha_fin.is_not(None)))
+        .values(fecha_resuelta=ahora)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+def publicar_alerta(alerta: models.AlertaPermanencia, patente: Optional[str] = None) -> None:
+    eventos.publicar_evento({
+        "tipo": "alerta", "alerta_id": alerta.id, "trabajo_id": alerta.trabajo_id, "patente": patente,
+        "estado_actual": alerta.estado, "limite_horas": alerta.limite_horas,
+        "desde": alerta.fecha_inicio_estado.isoformat(), "limite": alerta.fecha_limite.isoformat(),
+    })
+
+
+# --- Endpoints ---
+router = APIRouter(prefix="/alertas", tags=["Alertas"])
+
+@router.get("/", response_model=List[schemas.AlertaPermanencia], dependencies=[Depends(auth.get_principal_lectura)])
+def leer_alertas_abiertas(db: Session = Depends(get_db)):
+    """Alertas de permanencia sin resolver, de la más antigua a la más reciente."""
+    A = models.AlertaPermanencia
+    return (
+        db.query(A)
+        .options(joinedload(A.trabajo))
+        .filter(A.fecha_resuelta.is_(None))
+        .order_by(A.fecha_inicio_estado)
+        .all()
+    )
@@ -0,0 +1,182 @@
+# backend/analitica.py
+"""
+Tiempo de permanencia por estado (promedio y percentiles) por estado, técnico, asesor_servicio y
+tipo_pedido.
+
+El dashboard no recorre HistorialDeEstado: lee models.ResumenPermanencia, que guarda por día de cierre
+y valor de la dimensión un histograma de duraciones (cantidad y suma de segundos por cubeta de
+CUBETAS_SEGUNDOS). La tarea `actualizar_resumen_permanencia` de Celery suma al resumen sólo los
+historiales cerrados desde la marca anterior (models.MarcaAgregacion), con una consulta agrupada por
+dimensión.
+
+  - La marca queda ANALITICA_MARGEN_SEGUNDOS por detrás del reloj: una transición toma su hora antes
+    del commit, así que un cierre recién confirmado puede llevar una fecha_fin algo anterior a otro
+    ya confirmado.
+  - El técnico, asesor y tipo de pedido son los del trabajo al momento de agregar (minutos después
+    del cierre); el historial no guarda el técnico de cada estado.
+  - Los percentiles se interpolan dentro de la cubeta, así que son aproximados.
+"""
+import datetime
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, String, case, cast, func, literal, literal_column
+from sqlalchemy.orm import Session
+
+import models
+from funciones_sql import epoch
+
+logger = logging.getLogger(__name__)
+
+ANALITICA_MARGEN_SEGUNDOS = int(os.getenv("ANALITICA_MARGEN_SEGUNDOS", "120"))
+MARCA_PERMANENCIA = "resumen_permanencia"
+
+_HORA, _DIA = 3600, 24 * 3600
+# Límite inferior de cada cubeta (la última no tiene límite superior)
+CUBETAS_SEGUNDOS = (
+    0, 5 * 60, 15 * 60, 30 * 60, _HORA, 2 * _HORA, 4 * _HORA, 8 * _HORA, 12 * _HORA,
+    _DIA, 36 * _HORA, 2 * _DIA, 3 * _DIA, 5 * _DIA, 7 * _DIA, 10 * _DIA, 14 * _DIA, 21 * _DIA, 30 * _DIA, 60 * _DIA,
+)
+
+DIMENSIONES = {
+    "estado": None,
+    "tecnico": models.Trabajo.tecnico_id,
+    "asesor_servicio": models.Trabajo.asesor_servicio,
+    "tipo_pedido": models.Trabajo.tipo_pedido,
+}
+
+
+def _expr_cubeta(segundos):
+    return case(
+        *[(segundos < literal_column(str(limite)), literal_column(str(i))) for i, limite in enumerate(CUBETAS_SEGUNDOS[1:])],
+        else_=literal_column(str(len(CUBETAS_SEGUNDOS) - 1)),
+    )
+
+
+def _expr_valor(columna):
+    if columna is None:
+        return literal("")
+    return func.coalesce(cast(columna, String), literal(""))
+
+
+def _agregar_dimension(db: Session, dimension: str, desde: datetime.datetime, hasta: datetime.datetime) -> int:
+    H, R = models.HistorialDeEstado, models.ResumenPermanencia
+    segundos = epoch(H.fecha_fin) - epoch(H.fecha_inicio)
+    dia = func.date(H.fecha_fin, type_=Date).label("dia")
+    valor = _expr_valor(DIMENSIONES[dimension]).label("valor")
+    cubeta = _expr_cubeta(segundos).label("cubeta")
+    consulta = db.query(
+        dia, valor, H.estado, cubeta, func.count().label("cantidad"), func.sum(segundos).label("suma_segundos")
+    ).filter(H.fecha_fin > desde, H.fecha_fin <= hasta)
+    agrupar = [dia, H.estado, cubeta]
+    if DIMENSIONES[dimension] is not None:
+        # Postgres no admite una constante en GROUP BY: el valor sólo se agrupa si es una columna
+        consulta = consulta.join(models.Trabajo, models.Trabajo.id == H.trabajo_id)
+        agrupar.append(valor)
+    filas = consulta.group_by(*agrupar).all()
+    if not filas:
+        return 0
+
+    existentes = {
+        (r.dia, r.valor, r.estado, r.cubeta): r for r in
+        db.query(R).filter(R.dimension == dimension, R.dia.in_({fila.dia for fila in filas}))
+    }
+    for fila in filas:
+        resumen = existentes.get((fila.dia, fila.valor, fila.estado, fila.cubeta))
+        if resumen is None:
+            resumen = models.ResumenPermanencia(
+                dia=fila.dia, dimension=dimension, valor=fila.valor, estado=fila.estado, cubeta=fila.cubeta,
+                cantidad=0, suma_segundos=0,
+            )
+            db.add(resumen)
+        resumen.cantidad += fila.cantidad
+        resumen.suma_segundos += max(fila.suma_segundos or 0, 0)
+    return sum(fila.cantidad for fila in filas)
+
+
+def actualizar_resumen(db: Session, ahora: Optional[datetime.datetime] = None) -> int:
+    """
+    Suma al resumen los historiales cerrados desde la última marca y la avanza, todo en una transacción.
+    Devuelve cuántos historiales se agregaron. La primera ejecución agrega todo el historial vigente.
+    """
+    hasta = (ahora or datetime.datetime.utcnow()) - datetime.timedelta(seconds=ANALITICA_MARGEN_SEGUNDOS)
+    # FOR UPDATE: dos ejecuciones simultáneas no pueden sumar la misma ventana (Postgres)
+    marca = db.query(models.MarcaAgregacion).filter_by(nombre=MARCA_PERMANENCIA).with_for_update().first()
+    if marca is None:
+        marca = models.MarcaAgregacion(nombre=MARCA_PERMANENCIA, hasta=datetime.datetime(1970, 1, 1))
+        db.add(marca)
+    desde = marca.hasta
+    if desde.tzinfo is not None:
+        desde = desde.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    if hasta <= desde:
+        db.commit() # Libera el bloqueo de la marca
+        return 0
+    try:
+        agregados = 0
+        for dimension in DIMENSIONES:
+            cantidad = _agregar_dimension(db, dimension, desde, hasta)
+            if dimension == "estado":
+                agregados = cantidad
+        marca.hasta = hasta
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.error("Error actualizando el resumen de permanencia", exc_info=True)
+        raise
+    return agregados
+
+
+def _percentil(conteos: List[int], total: int, p: float) -> float:
+    objetivo = p * total
+    acumulado = 0
+    for i, cantidad in enumerate(conteos):
+        if cantidad and acumulado + cantidad >= objetivo:
+            inferior = CUBETAS_SEGUNDOS[i]
+            superior = CUBETAS_SEGUNDOS[i + 1] if i + 1 < len(CUBETAS_SEGUNDOS) else inferior
+            return inferior + (objetivo - acumulado) / cantidad * (superior - inferior)
+        acumulado += cantidad
+    return float(CUBETAS_SEGUNDOS[-1])
+
+
+def consultar_permanencia(db: Session, dimension: str, desde: datetime.date, hasta: datetime.date) -> List[dict]:
+    """Promedio y percentiles de permanencia por (valor, estado) para los cierres entre `desde` y `hasta`."""
+    R = models.ResumenPermanencia
+    filas = (
+        db.query(R.valor, R.estado, R.cubeta, func.sum(R.cantidad), func.sum(R.suma_segundos))
+        .filter(R.dimension == dimension, R.dia >= desde, R.dia <= hasta)
+        .group_by(R.valor, R.estado, R.cubeta)
+        .all()
+    )
+    grupos: Dict[Tuple[str, str], dict] = {}
+    for valor, estado, cubeta, cantidad, suma in filas:
+        grupo = grupos.setdefault(
+            (valor, estado), {"conteos": [0] * len(CUBETAS_SEGUNDOS), "cantidad": 0, "suma": 0.0}
+        )
+        grupo["conteos"][cubeta] += cantidad
+        grupo["cantidad"] += cantidad
+        grupo["suma"] += suma or 0
+
+    nombres = {}
+    if dimension == "tecnico":
+        ids = [int(valor) for valor, _ in grupos if valor]
+        nombres = {str(i): nombre for i, nombre in db.query(models.Tecnico.id, models.Tecnico.nombre).filter(models.Tecnico.id.in_(ids))}
+
+    resultado = []
+    for (valor, estado), grupo in sorted(grupos.items()):
+        total = grupo["cantidad"]
+        resultado.append({
+            "valor": valor,
+            "nombre": nombres.get(valor),
+            "estado": estado,
+            "cantidad": total,
+            "promedio_segundos": grupo["suma"] / total,
+            "p50_segundos": _percentil(grupo["conteos"], total, 0.5),
+            "p90_segundos": _percentil(grupo["conteos"], total, 0.9),
+            "p95_segundos": _percentil(grupo["conteos"], total, 0.95),
+        })
+    return resultado
+
+
+def marca_actual(db: Session) -> Optional[datetime.datetime]:
+    return db.query(models.MarcaAgregacion.hasta).filter_by(nombre=MARCA_PERMANENCIA).scalar()
@@ -0,0 +1,85 @@
+# backend/archivo.py
+"""
+Archivo de trabajos entregados.
+
+Los trabajos que llevan más de ARCHIVO_DIAS en 'entregado al cliente' se mueven, con su historial y su
+mismo id, a `trabajos_archivados` / `historial_archivado` (ver models.TrabajoArchivado). Así las tablas
+vigentes (y sus índices) quedan del tamaño del trabajo en curso más los entregados recientes.
+
+Cada lote se mueve con INSERT ... SELECT + DELETE en una sola transacción. Las alertas de permanencia
+del trabajo (ya resueltas) se eliminan. Leen el archivo:
+  - GET /trabajos/ con `activos=false` o `patente` (mezcla ambas tablas),
+  - GET /trabajos/{id}/historial,
+  - la carga de Excel, que no reabre un pedido archivado.
+"""
+import datetime
+import logging
+import os
+from typing import List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+import models
+from cache import cache_tablero
+
+logger = logging.getLogger(__name__)
+
+# Días en 'entregado al cliente' antes de archivar; 0 desactiva el archivo
+ARCHIVO_DIAS = int(os.getenv("ARCHIVO_DIAS", "30"))
+ARCHIVO_TAMANO_LOTE = int(os.getenv("ARCHIVO_TAMANO_LOTE", "1000"))
+
+
+def _ids_a_archivar(db: Session, limite: datetime.datetime, tamano_lote: int) -> List[int]:
+    # Recorre el índice parcial de estados abiertos (estado, fecha_inicio)
+    return [
+        trabajo_id for (trabajo_id,) in
+        db.query(models.HistorialDeEstado.trabajo_id)
+        .filter(
+            models.HistorialDeEstado.estado == "entregado al cliente",
+            models.HistorialDeEstado.fecha_fin.is_(None),
+            models.HistorialDeEstado.fecha_inicio < limite,
+        )
+        .order_by(models.HistorialDeEstado.fecha_inicio)
+        .limit(tamano_lote)
+    ]
+
+
+def _copiar(db: Session, origen, destino, condicion) -> None:
+    columnas = [columna.name for columna in destino.columns]
+    db.execute(destino.insert().from_select(columnas, select(*[origen.c[n] for n in columnas]).where(condicion)))
+
+
+def archivar_lote(db: Session, trabajo_ids: List[int]) -> None:
+    """Mueve los trabajos indicados (y su historial) al archivo. No hace commit."""
+    trabajos, historial = models.Trabajo.__table__, models.HistorialDeEstado.__table__
+    _copiar(db, trabajos, models.TrabajoArchivado.__table__, trabajos.c.id.in_(trabajo_ids))
+    _copiar(db, historial, models.HistorialArchivado.__table__, historial.c.trabajo_id.in_(trabajo_ids))
+    db.execute(delete(models.AlertaPermanencia).where(models.AlertaPermanencia.trabajo_id.in_(trabajo_ids)))
+    db.execute(delete(models.HistorialDeEstado).where(models.HistorialDeEstado.trabajo_id.in_(trabajo_ids)))
+    db.execute(delete(models.Trabajo).where(models.Trabajo.id.in_(trabajo_ids)))
+
+
+def archivar_entregados(
+    db: Session,
+    ahora: Optional[datetime.datetime] = None,
+    dias: int = ARCHIVO_DIAS,
+    tamano_lote: int = ARCHIVO_TAMANO_LOTE,
+) -> int:
+    """Archiva, por lotes y con commit tras cada uno, los trabajos entregados hace más de `dias`. Devuelve cuántos."""
+    if dias <= 0:
+        return 0
+    limite = (ahora or datetime.datetime.utcnow()) - datetime.timedelta(days=dias)
+    archivados = 0
+    while trabajo_ids := _ids_a_archivar(db, limite, tamano_lote):
+        try:
+            archivar_lote(db, trabajo_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.error(f"Error archivando el lote {trabajo_ids[0]}..{trabajo_ids[-1]}", exc_info=True)
+            raise
+        archivados += len(trabajo_ids)
+    if archivados:
+        cache_tablero.incrementar_version() # Cambia el listado de entregados (ETag)
+    return archivados
@@ -3,8 +3,10 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from jose import JWTError, jwt
+import os
 
 import crud, models, schemas, security
+from cache import cache_usuarios, PRINCIPAL_CACHE_TTL
 from database import get_db, SessionLocal 
 
 router = APIRouter(tags=["Auth"]) 
@@ -20,12 +22,12 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
 @router.post("/token", response_model=schemas.Token) 
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    # 👇 Ahora esta función sí existe en security.py
-    user = security.authenticate_user(db, form_data.username, form_data.password) 
+    # bcrypt corre en el pool de security: este endpoint sólo espera, sin bloquear un hilo
+    user = await security.autenticar_usuario(db, form_data.username, form_data.password) 
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -35,7 +37,7 @@ def login_for_access_token(
     
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": user.username, "role": user.role}, expires_delta=access_token_expires 
+        data={"sub": user.username, "role": user.role, "uid": user.id}, expires_delta=access_token_expires 
     )
     return {"access_token": access_token, "token_type": "bearer", "user": user} 
 
@@ -43,31 +45,59 @@ def login_for_access_token(
 # Usamos el oauth2_scheme definido en security.py
 oauth2_scheme = security.oauth2_scheme 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+# Con PRINCIPAL_CACHE_TTL > 0 el usuario autenticado se cachea por `sub` y no se consulta la BD en cada petición.
+# La caché se invalida al registrar usuarios o cambiar roles (crud.create_user, create_admin.py).
+USAR_CACHE_PRINCIPAL = PRINCIPAL_CACHE_TTL > 0
+# Con AUTH_CONFIAR_CLAIMS_LECTURA=1 los endpoints de sólo lectura usan los claims firmados del token
+# (sub, role, uid) sin tocar la BD: un cambio de rol o usuario borrado se nota recién al expirar el token.
+CONFIAR_CLAIMS_LECTURA = os.getenv("AUTH_CONFIAR_CLAIMS_LECTURA") == "1"
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials", 
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decodificar_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        username: str | None = payload.get("sub") 
-        if username is None:
-            raise credentials_exception
-        # token_data = schemas.TokenData(username=username) # Opcional
     except JWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def _cargar_principal(db: Session, username: str) -> dict | None:
     user = crud.get_user_by_username(db, username=username)
-    if user is None:
-        raise credentials_exception
-    return user
+    return schemas.User.model_validate(user).model_dump() if user else None
+
+# Las dependencias que consultan la BD son `def`: FastAPI las ejecuta en el threadpool y la consulta
+# síncrona no bloquea el event loop (las `async def` de más abajo sólo leen el resultado).
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> schemas.User:
+    username = _decodificar_token(token)["sub"]
+
+    if USAR_CACHE_PRINCIPAL:
+        datos = cache_usuarios.obtener(f"principal:{username}", lambda: _cargar_principal(db, username))
+    else:
+        datos = _cargar_principal(db, username)
+    if datos is None:
+        raise _credentials_exception()
+    return schemas.User(**datos)
+
+def get_principal_lectura(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> schemas.User:
+    """Dependencia para endpoints de sólo lectura (ver CONFIAR_CLAIMS_LECTURA)."""
+    if CONFIAR_CLAIMS_LECTURA:
+        payload = _decodificar_token(token)
+        if payload.get("role") and payload.get("uid") is not None:
+            return schemas.User(id=payload["uid"], username=payload["sub"], email="", role=payload["role"])
+    return get_current_user(token=token, db=db)
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: schemas.User = Depends(get_current_user)):
     # Lógica de usuario activo/inactivo (si la hubiera)
     return current_user
 
-async def get_current_admin_user(current_user: models.User = Depends(get_current_active_user)):
+async def get_current_admin_user(current_user: schemas.User = Depends(get_current_active_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -77,5 +107,5 @@ async def get_current_admin_user(current_user: models.User = Depends(get_current
 
 # --- Endpoint /users/me ---
 @router.get("/users/me/", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
+async def read_users_me(current_user: schemas.User = Depends(get_current_active_user)):
     return current_user
\ No newline at end of file
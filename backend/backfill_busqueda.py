@@ -0,0 +1,75 @@
+# backend/backfill_busqueda.py
+"""
+Tarea única: prepara una base existente para la búsqueda indexada.
+Agrega (si faltan) `patente_normalizada` y `vin_normalizado`, las rellena, y en Postgres
+habilita pg_trgm y crea los índices GIN trigram declarados en models.Trabajo.
+Se puede volver a ejecutar sin problema.
+"""
+from sqlalchemy import inspect, text, update
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal, engine
+
+
+def asegurar_columnas() -> None:
+    columnas = {c["name"] for c in inspect(engine).get_columns("trabajos")}
+    with engine.begin() as conn:
+        for nombre in ("patente_normalizada", "vin_normalizado"):
+            if nombre not in columnas:
+                conn.execute(text(f"ALTER TABLE trabajos ADD COLUMN {nombre} VARCHAR"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_trabajos_{nombre} ON trabajos ({nombre})"))
+                print(f"Columna '{nombre}' creada.")
+
+
+def crear_indices_trigram() -> None:
+    if engine.dialect.name != "postgresql":
+        print("No es Postgres: se omiten los índices trigram.")
+        return
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for indice in models.Trabajo.__table__.indexes:
+        if indice.name.endswith("_trgm"):
+            indice.create(bind=engine, checkfirst=True)
+            print(f"Índice '{indice.name}' verificado.")
+
+
+def rellenar(db: Session, lote: int = 5000) -> int:
+    """Normaliza patente y VIN en Python (misma regla que los eventos ORM), por lotes de ids."""
+    actualizados, ultimo_id = 0, 0
+    while True:
+        filas = (
+            db.query(models.Trabajo.id, models.Trabajo.patente, models.Trabajo.vin)
+            .filter(models.Trabajo.id > ultimo_id)
+            .order_by(models.Trabajo.id)
+            .limit(lote)
+            .all()
+        )
+        if not filas:
+            break
+        db.execute(
+            update(models.Trabajo),
+            [
+                {
+                    "id": fila.id,
+                    "patente_normalizada": models.normalizar_identificador(fila.patente),
+                    "vin_normalizado": models.normalizar_identificador(fila.vin),
+                }
+                for fila in filas
+            ],
+        )
+        db.commit()
+        actualizados += len(filas)
+        ultimo_id = filas[-1].id
+    return actualizados
+
+
+if __name__ == "__main__":
+    print("--- Preparando búsqueda indexada de trabajos ---")
+    asegurar_columnas()
+    crear_indices_trigram()
+    db = SessionLocal()
+    try:
+        print(f"{rellenar(db)} trabajos normalizados.")
+    finally:
+        db.close()
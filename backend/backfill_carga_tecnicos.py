@@ -0,0 +1,20 @@
+# backend/backfill_carga_tecnicos.py
+"""
+Tarea única: crea (si falta) la tabla carga_tecnicos y rellena los contadores de carga de cada técnico
+a partir de trabajos (ver carga.py).
+Se puede volver a ejecutar sin problema: recalcula los contadores desde cero.
+"""
+import carga
+import models
+from database import SessionLocal, engine
+
+
+if __name__ == "__main__":
+    print("--- Rellenando la carga de trabajo de los técnicos ---")
+    models.CargaTecnico.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        filas = carga.recalcular(db)
+        print(f"{filas} contadores (técnico, estado) creados.")
+    finally:
+        db.close()
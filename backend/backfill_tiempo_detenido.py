@@ -0,0 +1,68 @@
+# backend/backfill_tiempo_detenido.py
+"""
+Tarea única: agrega (si faltan) las columnas `segundos_detenido_acumulados` y `detenido_desde`
+a `trabajos` y las rellena a partir de `historial_de_estados`.
+Se puede volver a ejecutar sin problema: recalcula los valores desde el historial.
+"""
+from sqlalchemy import func, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal, engine
+from funciones_sql import epoch
+
+ESTADO_DETENIDO = "trabajo detenido"
+
+
+def asegurar_columnas() -> None:
+    columnas = {c["name"] for c in inspect(engine).get_columns("trabajos")}
+    tipo_fecha = "TIMESTAMP WITH TIME ZONE" if engine.dialect.name == "postgresql" else "DATETIME"
+    with engine.begin() as conn:
+        if "segundos_detenido_acumulados" not in columnas:
+            conn.execute(text("ALTER TABLE trabajos ADD COLUMN segundos_detenido_acumulados FLOAT NOT NULL DEFAULT 0"))
+            print("Columna 'segundos_detenido_acumulados' creada.")
+        if "detenido_desde" not in columnas:
+            conn.execute(text(f"ALTER TABLE trabajos ADD COLUMN detenido_desde {tipo_fecha}"))
+            print("Columna 'detenido_desde' creada.")
+
+
+def rellenar(db: Session) -> int:
+    """Recalcula ambas columnas con dos UPDATE set-based. Devuelve las filas actualizadas."""
+    historial = models.HistorialDeEstado
+    detenciones_cerradas = (
+        select(func.coalesce(func.sum(epoch(historial.fecha_fin) - epoch(historial.fecha_inicio)), 0))
+        .where(
+            historial.trabajo_id == models.Trabajo.id,
+            historial.estado == ESTADO_DETENIDO,
+            historial.fecha_fin.isnot(None)
+        )
+        .scalar_subquery()
+    )
+    detencion_abierta = (
+        select(func.max(historial.fecha_inicio))
+        .where(
+            historial.trabajo_id == models.Trabajo.id,
+            historial.estado == ESTADO_DETENIDO,
+            historial.fecha_fin.is_(None)
+        )
+        .scalar_subquery()
+    )
+    resultado = db.execute(
+        update(models.Trabajo).values(
+            segundos_detenido_acumulados=detenciones_cerradas,
+            detenido_desde=detencion_abierta
+        )
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+if __name__ == "__main__":
+    print("--- Rellenando tiempo detenido de trabajos ---")
+    asegurar_columnas()
+    db = SessionLocal()
+    try:
+        filas = rellenar(db)
+        print(f"{filas} trabajos actualizados.")
+    finally:
+        db.close()
@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_auth.py
+"""
+Benchmark de peticiones por segundo en GET /trabajos/ según cómo se resuelve el usuario autenticado:
+  - bd:     consulta a `users` en cada petición (comportamiento anterior),
+  - cache:  caché de principales por `sub` (PRINCIPAL_CACHE_TTL),
+  - claims: claims firmados del token en endpoints de lectura (AUTH_CONFIAR_CLAIMS_LECTURA).
+
+Uso (desde backend/):
+    DATABASE_URL=sqlite:///./bench_auth.db python benchmarks/bench_auth.py --peticiones 500
+Las peticiones pasan por la app completa (TestClient), con una página chica para que pese la autenticación.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import auth, crud, schemas  # noqa: E402
+from benchmarks.bench_busqueda import poblar  # noqa: E402
+from cache import cache_usuarios  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from main import app  # noqa: E402
+
+MODOS = {
+    "bd": {"USAR_CACHE_PRINCIPAL": False, "CONFIAR_CLAIMS_LECTURA": False},
+    "cache": {"USAR_CACHE_PRINCIPAL": True, "CONFIAR_CLAIMS_LECTURA": False},
+    "claims": {"USAR_CACHE_PRINCIPAL": True, "CONFIAR_CLAIMS_LECTURA": True},
+}
+
+
+def _token(client: TestClient) -> str:
+    usuario = f"bench_{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    try:
+        crud.create_user(db, schemas.UserCreate(username=usuario, email=f"{usuario}@bench.local", password="bench"))
+    finally:
+        db.close()
+    respuesta = client.post("/token", data={"username": usuario, "password": "bench"})
+    return respuesta.json()["access_token"]
+
+
+def _medir(client: TestClient, cabeceras: dict, peticiones: int) -> float:
+    for _ in range(10):  # calentamiento (también llena la caché)
+        client.get("/trabajos/", params={"limit": 5, "total_mode": "none"}, headers=cabeceras)
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        client.get("/trabajos/", params={"limit": 5, "total_mode": "none"}, headers=cabeceras)
+    return peticiones / (time.perf_counter() - inicio)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trabajos", type=int, default=5_000)
+    parser.add_argument("--peticiones", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    poblar(args.trabajos)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with TestClient(app) as client:
+        cabeceras = {"Authorization": f"Bearer {_token(client)}"}
+        print(f"\nMotor: {engine.dialect.name} | GET /trabajos/ x {args.peticiones}")
+        print(f"{'modo':<10}{'req/s':>10}")
+        base = None
+        for modo, ajustes in MODOS.items():
+            for nombre, valor in ajustes.items():
+                setattr(auth, nombre, valor)
+            cache_usuarios.incrementar_version()
+            rps = _medir(client, cabeceras, args.peticiones)
+            base = base or rps
+            print(f"{modo:<10}{rps:>10.1f}   ({rps / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
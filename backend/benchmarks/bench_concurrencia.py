@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_concurrencia.py
+"""
+Latencia bajo concurrencia de los endpoints autenticados:
+  - async_bloqueante: get_current_user como `async def` con la consulta síncrona dentro del event loop
+                      (comportamiento anterior),
+  - threadpool:       get_current_user como `def`, ejecutada en el threadpool (actual).
+
+Cada consulta a la BD se alarga artificialmente (--latencia-bd-ms) para simular el viaje de red a
+Postgres; sin eso SQLite local responde tan rápido que el bloqueo no se nota. La caché de principales
+se desactiva para que cada petición consulte `users`.
+
+Uso (desde backend/):
+    DATABASE_URL=sqlite:///./bench_concurrencia.db python benchmarks/bench_concurrencia.py --clientes 32
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import auth, crud, schemas  # noqa: E402
+from database import Base, SessionLocal, engine, get_db  # noqa: E402
+from main import app  # noqa: E402
+
+
+async def _get_current_user_bloqueante(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(get_db)):
+    return auth.get_current_user(token=token, db=db)
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] * 1000
+
+
+def _medir(client: TestClient, cabeceras: dict, clientes: int, peticiones: int) -> dict:
+    def pedir(_):
+        inicio = time.perf_counter()
+        client.get("/users/me/", headers=cabeceras)
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clientes) as ejecutor:
+        latencias = list(ejecutor.map(pedir, range(peticiones)))
+    duracion = time.perf_counter() - inicio
+    return {
+        "rps": peticiones / duracion,
+        "p50": statistics.median(latencias) * 1000,
+        "p95": _percentil(latencias, 0.95),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=32)
+    parser.add_argument("--peticiones", type=int, default=400)
+    parser.add_argument("--latencia-bd-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    auth.USAR_CACHE_PRINCIPAL = False
+
+    usuario = f"bench_{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    try:
+        crud.create_user(db, schemas.UserCreate(username=usuario, email=f"{usuario}@bench.local", password="bench"))
+    finally:
+        db.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _latencia_red(*_):
+        time.sleep(args.latencia_bd_ms / 1000)
+
+    with TestClient(app) as client:
+        token = client.post("/token", data={"username": usuario, "password": "bench"}).json()["access_token"]
+        cabeceras = {"Authorization": f"Bearer {token}"}
+
+        print(f"\nGET /users/me/ x {args.peticiones} | {args.clientes} clientes | latencia BD simulada {args.latencia_bd_ms} ms")
+        print(f"{'modo':<18}{'req/s':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+        for modo in ("async_bloqueante", "threadpool"):
+            if modo == "async_bloqueante":
+                app.dependency_overrides[auth.get_current_user] = _get_current_user_bloqueante
+            else:
+                app.dependency_overrides.pop(auth.get_current_user, None)
+            r = _medir(client, cabeceras, args.clientes, args.peticiones)
+            print(f"{modo:<18}{r['rps']:>8.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# backend/benchmarks/bench_login.py
+"""
+Benchmark de logins concurrentes (cambio de turno): N usuarios piden /token a la vez mientras un
+lector consulta GET /trabajos/. Compara:
+  - legado: bcrypt en el threadpool del servidor (comportamiento anterior),
+  - pool:   bcrypt en el pool de procesos de security, con límite de admisión.
+
+Uso (desde backend/):
+    DATABASE_URL=sqlite:///./bench_login.db python benchmarks/bench_login.py --logins 64 --concurrencia 32
+Reporta logins por segundo, cuántos recibieron 503 y la latencia del lector durante la ráfaga.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+import crud, schemas, security  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from main import app  # noqa: E402
+
+USUARIOS = 16
+
+
+def _autenticar_en_hilo(db, username, password):
+    user = crud.get_user_by_username(db, username=username)
+    if not user or not security.pwd_context.verify(password, user.hashed_password):
+        return None
+    return user
+
+
+async def _autenticar_legado(db, username, password):
+    # Equivale al endpoint síncrono anterior: consulta + bcrypt dentro de un hilo del threadpool
+    return await run_in_threadpool(_autenticar_en_hilo, db, username, password)
+
+
+def _crear_usuarios() -> None:
+    db = SessionLocal()
+    try:
+        for i in range(USUARIOS):
+            nombre = f"turno_{i}"
+            if not crud.get_user_by_username(db, nombre):
+                crud.create_user(db, schemas.UserCreate(username=nombre, email=f"{nombre}@bench.local", password="clave"))
+    finally:
+        db.close()
+
+
+def _rafaga(client: TestClient, logins: int, concurrencia: int, cabeceras_lector: dict) -> dict:
+    terminado = threading.Event()
+    latencias_lector = []
+
+    def lector():
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            client.get("/trabajos/", params={"limit": 5, "total_mode": "none"}, headers=cabeceras_lector)
+            latencias_lector.append(time.perf_counter() - inicio)
+
+    def login(i):
+        return client.post("/token", data={"username": f"turno_{i % USUARIOS}", "password": "clave"}).status_code
+
+    hilo_lector = threading.Thread(target=lector)
+    hilo_lector.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        codigos = list(ejecutor.map(login, range(logins)))
+    duracion = time.perf_counter() - inicio
+    terminado.set()
+    hilo_lector.join()
+
+    return {
+        "ok_por_seg": codigos.count(200) / duracion,
+        "rechazados": codigos.count(503),
+        "lector_p50_ms": statistics.median(latencias_lector) * 1000 if latencias_lector else 0,
+        "lector_max_ms": max(latencias_lector) * 1000 if latencias_lector else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    _crear_usuarios()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with TestClient(app) as client:
+        token = client.post("/token", data={"username": "turno_0", "password": "clave"}).json()["access_token"]
+        cabeceras = {"Authorization": f"Bearer {token}"}
+
+        print(f"\n{args.logins} logins, {args.concurrencia} simultáneos | bcrypt rounds={security.BCRYPT_ROUNDS}, "
+              f"pool={security.HASH_POOL_WORKERS} procesos, máx. pendientes={security.HASH_MAX_PENDIENTES}")
+        print(f"{'modo':<8}{'logins/s':>10}{'503':>6}{'lector p50 (ms)':>18}{'lector máx (ms)':>18}")
+        autenticar_pool = security.autenticar_usuario
+        for modo, autenticar in (("legado", _autenticar_legado), ("pool", autenticar_pool)):
+            security.autenticar_usuario = autenticar
+            r = _rafaga(client, args.logins, args.concurrencia, cabeceras)
+            print(f"{modo:<8}{r['ok_por_seg']:>10.1f}{r['rechazados']:>6}{r['lector_p50_ms']:>18.1f}{r['lector_max_ms']:>18.1f}")
+        security.autenticar_usuario = autenticar_pool
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# backend/busqueda.py
+"""
+Búsqueda por subcadena sobre trabajos respaldada por índices.
+
+- Postgres: `ILIKE '%x%'` / `LIKE` sobre columnas con índice GIN pg_trgm (ver models.Trabajo)
+  y relevancia con `similarity()`.
+- SQLite (tests): tabla FTS5 `trabajos_fts` con tokenizer trigram y relevancia con `bm25()`.
+
+Las funciones reciben el modelo a filtrar: models.Trabajo (por defecto) o models.TrabajoArchivado,
+que tiene sus propios índices trigram / su tabla `trabajos_archivados_fts`.
+
+Patente y VIN se comparan siempre en su forma normalizada (models.normalizar_identificador).
+"""
+from sqlalchemy import column, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+import models
+
+# El tokenizer trigram de FTS5 no encuentra subcadenas de menos de 3 caracteres
+LARGO_MINIMO_FTS = 3
+
+
+def _fts(modelo):
+    """(tabla FTS5, literal para MATCH/bm25) del modelo dado."""
+    nombre = f"{modelo.__table__.name}_fts"
+    return table(nombre, column("rowid")), literal_column(nombre)
+
+
+def _dialecto(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _frase_fts(texto: str) -> str:
+    return '"' + texto.replace('"', '""') + '"'
+
+
+def _consulta_fts(termino: str, normalizado: str) -> str:
+    partes = [f"{{cliente_nombre pedido_dbm}} : {_frase_fts(termino)}"]
+    if len(normalizado) >= LARGO_MINIMO_FTS:
+        partes.append(f"{{patente_normalizada vin_normalizado}} : {_frase_fts(normalizado)}")
+    return " OR ".join(partes)
+
+
+def _usa_fts(db: Session, termino: str) -> bool:
+    return _dialecto(db) == "sqlite" and len(termino) >= LARGO_MINIMO_FTS
+
+
+def filtro_busqueda(db: Session, termino: str, modelo=models.Trabajo):
+    """Condición para el parámetro `search`: cliente, pedido DBM, patente o VIN contienen el término."""
+    normalizado = models.normalizar_identificador(termino)
+
+    if _usa_fts(db, termino):
+        fts, fts_tabla = _fts(modelo)
+        coincidencias = select(fts.c.rowid).where(fts_tabla.op("MATCH")(_consulta_fts(termino, normalizado)))
+        return modelo.id.in_(coincidencias)
+
+    condiciones = [
+        modelo.cliente_nombre.ilike(f"%{termino}%"),
+        modelo.pedido_dbm.ilike(f"%{termino}%"),
+    ]
+    if normalizado:
+        condiciones += [
+            modelo.patente_normalizada.like(f"%{normalizado}%"),
+            modelo.vin_normalizado.like(f"%{normalizado}%"),
+        ]
+    return or_(*condiciones)
+
+
+def filtro_patente(termino: str, modelo=models.Trabajo):
+    """Condición para el parámetro `patente`, tolerante a guiones, espacios y mayúsculas."""
+    normalizado = models.normalizar_identificador(termino)
+    return modelo.patente_normalizada.like(f"%{normalizado}%")
+
+
+def expr_relevancia(db: Session, termino: str, modelo=models.Trabajo):
+    """Expresión de relevancia para `sort_by=relevancia` (mayor es más relevante)."""
+    normalizado = models.normalizar_identificador(termino)
+    dialecto = _dialecto(db)
+
+    if dialecto == "postgresql":
+        return func.greatest(
+            func.similarity(modelo.cliente_nombre, termino),
+            func.similarity(modelo.pedido_dbm, termino),
+            func.similarity(modelo.patente_normalizada, normalizado),
+            func.similarity(modelo.vin_normalizado, normalizado),
+        )
+
+    if _usa_fts(db, termino):
+        # bm25() es menor cuanto mejor la coincidencia: lo negamos para ordenar igual que similarity()
+        fts, fts_tabla = _fts(modelo)
+        puntaje = (
+            select(func.bm25(fts_tabla))
+            .where(fts.c.rowid == modelo.id, fts_tabla.op("MATCH")(_consulta_fts(termino, normalizado)))
+            .scalar_subquery()
+        )
+        return -puntaje
+
+    # Sin índice de texto (término corto): primero las coincidencias exactas
+    return or_(
+        modelo.pedido_dbm == termino,
+        modelo.patente_normalizada == normalizado,
+    )
@@ -0,0 +1,154 @@
+# backend/cache.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Caché en memoria, segura entre hilos, con expiración por entrada.
+    Cuando se supera `max_entradas` se descarta la entrada usada hace más tiempo.
+    """
+
+    def __init__(self, ttl_segundos: float, max_entradas: int = 1024):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._datos: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave: Hashable, valor: Any) -> None:
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl_segundos, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+
+# --- Caché versionada del tablero ---
+# Los resultados agregados del tablero (stats, facetas, ...) sólo cambian con una transición de estado
+# o una importación. Cada cambio incrementa la "versión del tablero" y las entradas se guardan bajo
+# esa versión: así nunca se sirve un resultado anterior al último cambio y no hace falta borrar nada.
+#
+# Sin CACHE_REDIS_URL la versión vive en memoria del proceso (sirve con un solo proceso de API);
+# con Redis la comparten todos los procesos de la API y el worker de Celery.
+
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+# Red de seguridad: aunque no cambie la versión, las entradas se recalculan tras este tiempo
+TABLERO_CACHE_TTL = int(os.getenv("TABLERO_CACHE_TTL", "300"))
+# Usuarios autenticados (auth.get_current_user); 0 desactiva la caché
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+
+class CacheVersionada:
+    """Caché de resultados indexada por la versión del tablero, en memoria o en Redis."""
+
+    def __init__(self, redis_url: Optional[str] = None, ttl_segundos: int = TABLERO_CACHE_TTL, prefijo: str = "taller:tablero"):
+        self.ttl_segundos = ttl_segundos
+        self.prefijo = prefijo
+        self._redis_url = redis_url
+        self._redis = None
+        self._version_local = 0
+        self._memoria = TTLCache(ttl_segundos=ttl_segundos, max_entradas=256)
+        self._lock = threading.Lock()
+
+    def usar_redis(self, cliente) -> None:
+        """Reemplaza el backend por un cliente Redis ya construido (en tests, uno falso)."""
+        self._redis = cliente
+        self._memoria.clear()
+
+    def _cliente(self):
+        if self._redis is None and self._redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(self._redis_url, socket_timeout=0.5)
+        return self._redis
+
+    @property
+    def compartida(self) -> bool:
+        """True si la versión vive en Redis y la ven todos los procesos (API y worker)."""
+        return self._cliente() is not None
+
+    @property
+    def _clave_version(self) -> str:
+        return f"{self.prefijo}:version"
+
+    def version(self) -> int:
+        cliente = self._cliente()
+        if cliente is None:
+            return self._version_local
+        return int(cliente.get(self._clave_version) or 0)
+
+    def incrementar_version(self) -> None:
+        """Marca que el tablero cambió: las entradas guardadas dejan de usarse."""
+        with self._lock:
+            self._version_local += 1
+        cliente = self._cliente()
+        if cliente is not None:
+            try:
+                cliente.incr(self._clave_version)
+            except Exception as e:
+                logger.warning(f"No se pudo incrementar la versión del tablero en Redis: {e}")
+
+    def get(self, nombre: str, version: int) -> Optional[Any]:
+        cliente = self._cliente()
+        if cliente is None:
+            return self._memoria.get((nombre, version))
+        crudo = cliente.get(f"{self.prefijo}:{nombre}:v{version}")
+        return json.loads(crudo) if crudo is not None else None
+
+    def set(self, nombre: str, version: int, valor: Any) -> None:
+        cliente = self._cliente()
+        if cliente is None:
+            self._memoria.set((nombre, version), valor)
+            return
+        cliente.set(f"{self.prefijo}:{nombre}:v{version}", json.dumps(valor), ex=self.ttl_segundos)
+
+    def obtener(self, nombre: str, calcular):
+        """
+        Devuelve el valor cacheado para la versión actual o lo calcula con `calcular()`.
+        Si Redis no responde, se calcula sin caché en lugar de fallar la petición.
+        """
+        try:
+            version = self.version()
+            valor = self.get(nombre, version)
+        except Exception as e:
+            logger.warning(f"Caché del tablero no disponible, se calcula directo: {e}")
+            return calcular()
+        if valor is not None:
+            return valor
+
+        # La versión se leyó antes de calcular: si hubo un cambio entretanto, el valor queda bajo la versión vieja
+        valor = calcular()
+        try:
+            self.set(nombre, version, valor)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en la caché del tablero: {e}")
+        return valor
+
+
+cache_tablero = CacheVersionada(redis_url=CACHE_REDIS_URL)
+# Sólo se usa su versión (ETag de /tecnicos/ y del listado, que incluye el técnico asignado)
+cache_tecnicos = CacheVersionada(redis_url=CACHE_REDIS_URL, prefijo="taller:tecnicos")
+# Se invalida entera al crear un usuario o cambiar un rol (cambios poco frecuentes)
+cache_usuarios = CacheVersionada(redis_url=CACHE_REDIS_URL, ttl_segundos=PRINCIPAL_CACHE_TTL, prefijo="taller:usuarios")
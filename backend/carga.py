@@ -0,0 +1,93 @@
+# backend/carga.py
+"""
+Carga de trabajo de cada técnico: trabajos activos (no entregados) asignados, por estado.
+
+models.CargaTecnico guarda un contador por (técnico, estado) que se ajusta dentro de la transacción de
+cada transición (trabajos._aplicar_transicion es el único lugar que cambia el estado o el técnico de un
+trabajo; la carga de Excel no toca ninguno de los dos), así que GET /tecnicos/carga no recorre trabajos.
+`recalcular` reconstruye los contadores desde trabajos: carga inicial (backfill_carga_tecnicos.py) y
+revisión diaria en el worker.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+import models
+
+ESTADO_CERRADO = "entregado al cliente"
+ESTADO_DETENIDO = "trabajo detenido"
+
+Clave = Tuple[Optional[int], str] # (tecnico_id, estado)
+
+
+def _cuenta(clave: Clave) -> bool:
+    tecnico_id, estado = clave
+    return tecnico_id is not None and estado != ESTADO_CERRADO
+
+
+def registrar_cambio(deltas: Dict[Clave, int], antes: Clave, despues: Clave) -> None:
+    """Acumula en `deltas` el efecto de que un trabajo pase de (técnico, estado) `antes` a `despues`."""
+    if antes == despues:
+        return
+    if _cuenta(antes):
+        deltas[antes] = deltas.get(antes, 0) - 1
+    if _cuenta(despues):
+        deltas[despues] = deltas.get(despues, 0) + 1
+
+
+def _insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def aplicar(db: Session, deltas: Dict[Clave, int]) -> None:
+    """Suma los deltas a los contadores con un único upsert. No hace commit: va con la transición."""
+    # En orden de clave: dos transiciones concurrentes bloquean las filas en el mismo orden
+    filas = [
+        {"tecnico_id": tecnico_id, "estado": estado, "cantidad": delta}
+        for (tecnico_id, estado), delta in sorted(deltas.items()) if delta
+    ]
+    if not filas:
+        return
+    tabla = models.CargaTecnico.__table__
+    sentencia = _insert(db)(tabla).values(filas)
+    db.execute(sentencia.on_conflict_do_update(
+        index_elements=[tabla.c.tecnico_id, tabla.c.estado],
+        set_={"cantidad": tabla.c.cantidad + sentencia.excluded.cantidad},
+    ))
+
+
+def recalcular(db: Session) -> int:
+    """Reconstruye los contadores desde trabajos con dos sentencias set-based. Devuelve las filas creadas."""
+    T, tabla = models.Trabajo, models.CargaTecnico.__table__
+    db.execute(delete(models.CargaTecnico))
+    resultado = db.execute(tabla.insert().from_select(
+        ["tecnico_id", "estado", "cantidad"],
+        select(T.tecnico_id, T.estado_actual, func.count())
+        .where(T.tecnico_id.is_not(None), T.estado_actual != ESTADO_CERRADO)
+        .group_by(T.tecnico_id, T.estado_actual),
+    ))
+    db.commit()
+    return resultado.rowcount
+
+
+def leer_carga(db: Session) -> List[dict]:
+    """Todos los técnicos (también los sin trabajos) con su carga, en dos consultas."""
+    C = models.CargaTecnico
+    por_tecnico: Dict[int, Dict[str, int]] = {}
+    for tecnico_id, estado, cantidad in db.query(C.tecnico_id, C.estado, C.cantidad).filter(C.cantidad > 0):
+        por_tecnico.setdefault(tecnico_id, {})[estado] = cantidad
+    return [
+        {
+            "tecnico_id": tecnico_id,
+            "nombre": nombre,
+            "activos": sum(por_tecnico.get(tecnico_id, {}).values()),
+            "detenidos": por_tecnico.get(tecnico_id, {}).get(ESTADO_DETENIDO, 0),
+            "por_estado": por_tecnico.get(tecnico_id, {}),
+        }
+        for tecnico_id, nombre in db.query(models.Tecnico.id, models.Tecnico.nombre).order_by(models.Tecnico.nombre)
+    ]
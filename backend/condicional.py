@@ -0,0 +1,104 @@
+# backend/condicional.py
+"""
+GET condicional (ETag / If-None-Match) para las lecturas que el frontend repite sin que haya cambios:
+/trabajos/, /trabajos/{id}/historial, /dashboard/stats y /tecnicos/.
+
+El validador no toca la consulta pesada: es un hash de la ruta, los parámetros y las versiones de las
+cachés versionadas que cubren los datos de la respuesta (cache_tablero se incrementa en cada cambio de
+trabajos o historial, cache_tecnicos en cada alta/baja de técnico). Si coincide con If-None-Match se
+responde 304 sin cuerpo; si no, la respuesta 200 lleva el ETag.
+
+Sin CACHE_REDIS_URL cada proceso tiene su propia versión (los cambios hechos por el worker no se ven),
+así que el validador además caduca cada TABLERO_CACHE_TTL segundos, igual que la caché de stats.
+
+Las respuestas con valores calculados al momento de la petición (días de estadía y tiempo detenido del
+listado, y el orden por ellos) cambian sin escrituras: esas rutas pasan `vigencia_segundos` y su
+validador caduca con ese período, haya o no Redis.
+"""
+import hashlib
+import logging
+import os
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
+
+import auth
+from cache import CacheVersionada
+
+logger = logging.getLogger(__name__)
+
+ETAG_VIGENCIA_SEGUNDOS = int(os.getenv("ETAG_VIGENCIA_SEGUNDOS", "60"))
+
+
+def calcular_etag(request: Request, *caches: CacheVersionada, vigencia_segundos: Optional[float] = None) -> Optional[str]:
+    """ETag débil de la petición, o None si alguna versión no se puede leer (Redis caído)."""
+    try:
+        versiones = []
+        for cache in caches:
+            version = str(cache.version())
+            if not cache.compartida:
+                version += f"@{int(time.time() // cache.ttl_segundos)}"
+            versiones.append(f"{cache.prefijo}={version}")
+        if vigencia_segundos:
+            versiones.append(f"t={int(time.time() // vigencia_segundos)}")
+    except Exception as e:
+        logger.warning(f"No se pudo leer la versión para el ETag, se responde sin validador: {e}")
+        return None
+    parametros = sorted(request.query_params.multi_items())
+    crudo = f"{request.url.path}?{parametros}|{'|'.join(versiones)}"
+    return f'W/"{hashlib.sha1(crudo.encode()).hexdigest()[:20]}"'
+
+
+def _coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = {valor.strip() for valor in if_none_match.split(",")}
+    # La comparación de If-None-Match es débil: W/"x" equivale a "x"
+    return "*" in candidatos or etag in candidatos or etag[2:] in candidatos
+
+
+def etag_condicional(*caches: CacheVersionada, vigencia_segundos: Optional[float] = None):
+    """
+    Dependencia para el decorador de la ruta (`dependencies=[Depends(etag_condicional(...))]`).
+    Autentica primero (misma dependencia que los endpoints de lectura, resuelta una sola vez) y
+    luego corta con 304 si el cliente ya tiene la versión actual.
+    Con `vigencia_segundos` el validador cambia también al pasar cada período de ese largo.
+    """
+    def dependencia(request: Request, _principal=Depends(auth.get_principal_lectura)) -> None:
+        etag = calcular_etag(request, *caches, vigencia_segundos=vigencia_segundos)
+        if etag is None:
+            return
+        if _coincide(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        request.state.etag = etag
+
+    return dependencia
+
+
+class ETagMiddleware:
+    """
+    Agrega el ETag calculado por `etag_condicional` a las respuestas 200 (también a las que el
+    endpoint devuelve como JSONResponse, que no heredan las cabeceras de la dependencia).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] == 200:
+                etag = scope.get("state", {}).get("etag")
+                if etag:
+                    mensaje["headers"] = [
+                        *mensaje.get("headers", []),
+                        (b"etag", etag.encode()),
+                        (b"cache-control", b"private, no-cache"),
+                    ]
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
@@ -1,6 +1,7 @@
 # backend/create_admin.py
 from sqlalchemy.orm import Session
 import crud, schemas
+from cache import cache_usuarios
 from database import SessionLocal
 import getpass  # <--- IMPORTANTE: Importamos getpass
 
@@ -26,6 +27,7 @@ def create_super_user():
         if choice == 's':
             db_user.role = "admin"
             db.commit()
+            cache_usuarios.incrementar_version() # La API deja de usar el rol anterior cacheado
             print("Rol de usuario actualizado a 'admin'.")
         else:
             print("Operación cancelada.")
@@ -35,6 +37,7 @@ def create_super_user():
         # Le asigna el rol de admin
         new_user.role = "admin"
         db.commit()
+        cache_usuarios.incrementar_version()
         print(f"Usuario admin '{new_user.username}' creado exitosamente.")
 
     db.close()
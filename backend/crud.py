@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 import models, schemas, security
+from cache import cache_tecnicos, cache_usuarios
 
 # --- Funciones CRUD para Usuarios (Tu código original) ---
 
@@ -21,6 +22,7 @@ def create_user(db: Session, user: schemas.UserCreate):
     )
     db.add(db_user)
     db.commit()
+    cache_usuarios.incrementar_version()
     db.refresh(db_user)
     return db_user
 
@@ -39,6 +41,7 @@ def create_tecnico(db: Session, tecnico: schemas.TecnicoCreate):
     db_tecnico = models.Tecnico(nombre=tecnico.nombre)
     db.add(db_tecnico)
     db.commit()
+    cache_tecnicos.incrementar_version()
     db.refresh(db_tecnico)
     return db_tecnico
 
@@ -46,8 +49,11 @@ def delete_tecnico(db: Session, tecnico_id: int):
     """Elimina un técnico por ID."""
     db_tecnico = db.query(models.Tecnico).filter(models.Tecnico.id == tecnico_id).first()
     if db_tecnico:
+        # Contadores de carga (en cero: sólo se borra un técnico sin trabajos)
+        db.query(models.CargaTecnico).filter(models.CargaTecnico.tecnico_id == tecnico_id).delete()
         db.delete(db_tecnico)
         db.commit()
+        cache_tecnicos.incrementar_version()
     return db_tecnico
 
 # --- Añade aquí más funciones CRUD para Trabajos si las necesitas ---
\ No newline at end of file
@@ -1,25 +1,27 @@
 # backend/dashboard.py
-from fastapi import APIRouter, Depends
+import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-import models, auth, schemas
-from database import SessionLocal
+import models, auth, schemas, analitica
+from cache import cache_tablero
+from condicional import etag_condicional
+from database import get_db
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.get("/stats", dependencies=[Depends(auth.get_current_user)])
+@router.get("/stats", dependencies=[Depends(auth.get_principal_lectura), Depends(etag_condicional(cache_tablero))])
 def get_dashboard_stats(db: Session = Depends(get_db)):
     """
-    Calcula y devuelve las estadísticas principales para la barra de resumen.
+    Devuelve las estadísticas principales para la barra de resumen.
+    Se recalculan sólo cuando cambia la versión del tablero (transiciones e importaciones).
     """
+    return cache_tablero.obtener("stats", lambda: _calcular_stats(db))
+
+def _calcular_stats(db: Session) -> dict:
     # Cuenta cuántos trabajos hay en cada estado (excluyendo 'entregado al cliente')
     counts_por_estado = (
         db.query(models.Trabajo.estado_actual, func.count(models.Trabajo.id))
@@ -30,4 +32,28 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
 
     # Puedes añadir más métricas aquí, como alertas, etc.
 
-    return {"counts_por_estado": dict(counts_por_estado)}
\ No newline at end of file
+    return {"counts_por_estado": dict(counts_por_estado)}
+
+
+@router.get("/permanencia", response_model=schemas.EstadisticasPermanencia,
+            dependencies=[Depends(auth.get_principal_lectura)])
+def get_permanencia(
+    dimension: Literal["estado", "tecnico", "asesor_servicio", "tipo_pedido"] = "estado",
+    desde: Optional[datetime.date] = None,
+    hasta: Optional[datetime.date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Tiempo en cada estado (promedio y percentiles 50/90/95, en segundos) de los estados cerrados entre
+    `desde` y `hasta` (por defecto los últimos 90 días), por estado, técnico, asesor o tipo de pedido.
+    Sale del resumen que mantiene la tarea periódica (analitica.py), no del historial completo.
+    """
+    hasta = hasta or datetime.datetime.utcnow().date()
+    desde = desde or hasta - datetime.timedelta(days=90)
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' no puede ser posterior a 'hasta'.")
+    return {
+        "dimension": dimension, "desde": desde, "hasta": hasta,
+        "actualizado_hasta": analitica.marca_actual(db),
+        "grupos": analitica.consultar_permanencia(db, dimension, desde, hasta),
+    }
@@ -1,21 +1,111 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker, Session # <-- Importamos Session
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from typing import Optional
 import os
+import threading
+import time
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db/tallerdb")
 
-engine = create_engine(DATABASE_URL)
+# --- CONFIGURACIÓN DEL POOL ---
+# Cada proceso (cada worker de uvicorn y cada proceso del worker de Celery) tiene su propio pool:
+# el máximo de conexiones a Postgres es procesos x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30")) # Segundos esperando una conexión libre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Renueva conexiones más viejas que esto (segundos)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1" # Descarta conexiones cortadas antes de usarlas
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")) # 0 = sin límite (sólo Postgres)
 
-if "sqlite" in DATABASE_URL:
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
+
+class PoolMedido(QueuePool):
+    """QueuePool que además registra cuánto esperan las peticiones por una conexión libre."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.agotamientos = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._lock_metricas:
+                self.agotamientos += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._lock_metricas:
+                self.esperas += 1
+                self.espera_total += espera
+                self.espera_maxima = max(self.espera_maxima, espera)
+
+
+def crear_engine(
+    url: str = DATABASE_URL,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+) -> Engine:
+    """
+    Fábrica única de engines (API, worker de Celery, scripts). Los parámetros no indicados
+    se toman de las variables DB_* de arriba.
+    """
+    if url.startswith("sqlite"):
+        # SQLite (tests, desarrollo): sin pool configurable ni timeouts por sentencia
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    connect_args = {}
+    timeout = DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    if timeout:
+        connect_args["options"] = f"-c statement_timeout={timeout}"
+
+    return create_engine(
+        url,
+        poolclass=PoolMedido,
+        pool_size=DB_POOL_SIZE if pool_size is None else pool_size,
+        max_overflow=DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
     )
-else:
-    engine = create_engine(DATABASE_URL)
+
+
+def metricas_pool(engine: Engine) -> dict:
+    """Estado actual del pool para dimensionarlo (ver GET /metricas/pool)."""
+    pool = engine.pool
+    metricas = {"clase": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metricas.update({
+            "tamano": pool.size(),
+            "en_uso": pool.checkedout(),
+            "libres": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, PoolMedido):
+        with pool._lock_metricas:
+            metricas.update({
+                "esperas": pool.esperas,
+                "espera_promedio_ms": round(pool.espera_total / pool.esperas * 1000, 3) if pool.esperas else 0.0,
+                "espera_maxima_ms": round(pool.espera_maxima * 1000, 3),
+                "agotamientos": pool.agotamientos,
+            })
+    return metricas
+
+
+engine = crear_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -31,4 +121,4 @@ def get_db():
         yield db
     finally:
         db.close()
-# --- FIN DE LA FUNCIÓN AÑADIDA ---
\ No newline at end of file
+# --- FIN DE LA FUNCIÓN AÑADIDA ---
@@ -0,0 +1,207 @@
+# backend/eventos.py
+"""
+Flujo de cambios del tablero: cada transición, edición o importación confirmada publica un delta
+compacto que los clientes reciben por WebSocket (/eventos/ws) o SSE (/eventos/stream) en lugar de
+volver a pedir /trabajos/ y /dashboard/stats periódicamente.
+
+- Sin EVENTOS_REDIS_URL se usa un broker en memoria (un solo proceso, tests).
+- Con Redis, los eventos se publican en un canal pub/sub y cada proceso de la API los reparte
+  a sus conexiones locales; así también llegan los eventos publicados por el worker de Celery.
+"""
+import asyncio
+import contextlib
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+import auth, models
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+EVENTOS_REDIS_URL = os.getenv("EVENTOS_REDIS_URL", os.getenv("CACHE_REDIS_URL"))
+CANAL_EVENTOS = "taller:eventos"
+# Eventos pendientes por conexión; si un cliente lento lo supera se le pide resincronizar
+MAX_EVENTOS_PENDIENTES = 100
+# Comentario SSE periódico para que proxies no corten la conexión inactiva
+SSE_PING_SEGUNDOS = 15
+
+Evento = Dict[str, Any]
+
+
+def _fecha_iso(fecha: Optional[datetime.datetime]) -> Optional[str]:
+    return fecha.isoformat() if fecha else None
+
+
+def evento_trabajo(tipo: str, trabajo: models.Trabajo) -> Evento:
+    """Delta de un trabajo: lo justo para mover la tarjeta sin volver a pedir el listado."""
+    return {
+        "tipo": tipo,
+        "trabajo_id": trabajo.id,
+        "estado_actual": trabajo.estado_actual,
+        "tecnico_id": trabajo.tecnico_id,
+        "tecnico_nombre": trabajo.tecnico_asignado.nombre if trabajo.tecnico_asignado else None,
+        "fecha_llegada_taller": _fecha_iso(trabajo.fecha_llegada_taller),
+        "detenido_desde": _fecha_iso(trabajo.detenido_desde),
+        "emitido_en": datetime.datetime.utcnow().isoformat(),
+    }
+
+
+# --- Brokers ---
+
+class BrokerMemoria:
+    """Reparte los eventos a las suscripciones del proceso. `publicar` se puede llamar desde cualquier hilo."""
+
+    def __init__(self):
+        self._suscripciones: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
+
+    def _entregar(self, cola: asyncio.Queue, evento: Evento) -> None:
+        if cola.full():
+            # El cliente no da abasto: se descartan sus pendientes y se le pide recargar
+            while not cola.empty():
+                cola.get_nowait()
+            evento = {"tipo": "resincronizar"}
+        cola.put_nowait(evento)
+
+    def _entregar_local(self, evento: Evento) -> None:
+        with self._lock:
+            suscripciones = list(self._suscripciones.items())
+        for cola, loop in suscripciones:
+            try:
+                loop.call_soon_threadsafe(self._entregar, cola, evento)
+            except RuntimeError:
+                pass # El loop de esa conexión ya se cerró
+
+    def publicar(self, evento: Evento) -> None:
+        self._entregar_local(evento)
+
+    def _al_suscribir(self) -> None:
+        pass
+
+    @contextlib.asynccontextmanager
+    async def suscribir(self) -> AsyncIterator[asyncio.Queue]:
+        cola: asyncio.Queue = asyncio.Queue(maxsize=MAX_EVENTOS_PENDIENTES)
+        with self._lock:
+            self._suscripciones[cola] = asyncio.get_running_loop()
+        self._al_suscribir()
+        try:
+            yield cola
+        finally:
+            with self._lock:
+                self._suscripciones.pop(cola, None)
+
+
+class BrokerRedis(BrokerMemoria):
+    """Publica en Redis pub/sub; una tarea por proceso escucha el canal y reparte localmente."""
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        self._redis_url = redis_url
+        self._redis = None
+        self._escucha: Optional[asyncio.Task] = None
+
+    def publicar(self, evento: Evento) -> None:
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self._redis_url, socket_timeout=0.5)
+        self._redis.publish(CANAL_EVENTOS, json.dumps(evento))
+
+    def _al_suscribir(self) -> None:
+        if self._escucha is None or self._escucha.done():
+            self._escucha = asyncio.get_running_loop().create_task(self._escuchar())
+
+    async def _escuchar(self) -> None:
+        import redis.asyncio as redis_async
+
+        while True:
+            try:
+                cliente = redis_async.Redis.from_url(self._redis_url)
+                async with cliente.pubsub() as pubsub:
+                    await pubsub.subscribe(CANAL_EVENTOS)
+                    async for mensaje in pubsub.listen():
+                        if mensaje["type"] == "message":
+                            self._entregar_local(json.loads(mensaje["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Se perdió la suscripción a Redis ({e}), reintentando...")
+                self._entregar_local({"tipo": "resincronizar"})
+                await asyncio.sleep(1)
+
+
+broker = BrokerRedis(EVENTOS_REDIS_URL) if EVENTOS_REDIS_URL else BrokerMemoria()
+
+
+def publicar_evento(evento: Evento) -> None:
+    """Publica un evento ya confirmado en la BD. Un fallo del broker nunca hace fallar la petición."""
+    try:
+        broker.publicar(evento)
+    except Exception as e:
+        logger.warning(f"No se pudo publicar el evento {evento.get('tipo')}: {e}")
+
+
+# --- Endpoints ---
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+async def _autenticar_token(token: str, db: Session) -> models.User:
+    """
+    WebSocket y EventSource no permiten cabeceras propias: el token llega como query param.
+    La sesión se cierra apenas se valida para no retener una conexión del pool mientras dure el stream.
+    """
+    try:
+        return await run_in_threadpool(auth.get_current_user, token=token, db=db)
+    finally:
+        db.close()
+
+@router.websocket("/ws")
+async def eventos_websocket(websocket: WebSocket, token: str = Query(...), db: Session = Depends(get_db)):
+    try:
+        await _autenticar_token(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with broker.suscribir() as cola:
+        async def enviar():
+            while True:
+                await websocket.send_json(await cola.get())
+
+        envio = asyncio.create_task(enviar())
+        try:
+            # Lo que mande el cliente (keepalive) se ignora; sólo interesa detectar la desconexión
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except WebSocketDisconnect:
+            pass
+        finally:
+            envio.cancel()
+
+@router.get("/stream")
+async def eventos_sse(request: Request, token: str = Query(...), db: Session = Depends(get_db)):
+    await _autenticar_token(token, db)
+
+    async def generar():
+        async with broker.suscribir() as cola:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=SSE_PING_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+
+    return StreamingResponse(
+        generar(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
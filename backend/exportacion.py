@@ -0,0 +1,91 @@
+# backend/exportacion.py
+"""
+Exportación a CSV / XLSX de los trabajos filtrados (GET /trabajos/exportar).
+
+trabajos.py arma las consultas (mismos filtros y orden que el listado) con sólo las columnas
+exportadas; aquí se recorren con yield_per (cursor del lado del servidor en Postgres), sin entidades
+ORM ni historial, así la memoria no crece con la cantidad de trabajos:
+  - CSV: se envía por partes a medida que se leen las filas.
+  - XLSX: openpyxl en modo write-only vuelca las filas a disco; el libro se arma en un archivo temporal
+    y se envía por partes al terminar.
+Las columnas del pedido llevan los encabezados del export DBM (COLUMN_MAPPING), así el archivo se
+puede volver a cargar por /trabajos/importaciones/.
+"""
+import csv
+import datetime
+import io
+import os
+import tempfile
+from typing import Any, Iterable, Iterator, List
+
+from openpyxl import Workbook
+
+from importacion import COLUMN_MAPPING
+
+EXPORTACION_LOTE = int(os.getenv("EXPORTACION_LOTE", "2000"))
+_TAMANO_PARTE = 64 * 1024
+
+COLUMNAS_PEDIDO = list(COLUMN_MAPPING.values())
+ENCABEZADOS = [
+    "ID", *COLUMN_MAPPING.keys(),
+    "Estado", "Fecha llegada taller", "Técnico", "Días de estadía activa", "Horas detenido",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _fecha(valor: Any) -> Any:
+    # openpyxl no acepta fechas con zona horaria: todo se exporta en UTC sin zona
+    if isinstance(valor, datetime.datetime) and valor.tzinfo is not None:
+        return valor.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return valor
+
+
+def filas_exportadas(consultas: Iterable) -> Iterator[List[Any]]:
+    """
+    Recorre por lotes cada consulta, cuyas columnas son: id, COLUMNAS_PEDIDO, estado_actual,
+    fecha_llegada_taller, nombre del técnico, segundos de estadía activa y segundos detenido.
+    """
+    for consulta in consultas:
+        for fila in consulta.yield_per(EXPORTACION_LOTE):
+            *datos, segundos_estadia, segundos_detenido = fila
+            dias_estadia = int(segundos_estadia / 86400) if segundos_estadia and segundos_estadia > 0 else 0
+            yield [_fecha(valor) for valor in datos] + [dias_estadia, round((segundos_detenido or 0) / 3600, 2)]
+
+
+def _celda_csv(valor: Any) -> Any:
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(sep=" ", timespec="seconds")
+    return valor
+
+
+def generar_csv(filas: Iterable[List[Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff") # BOM: Excel abre el CSV en UTF-8 (tildes y ñ)
+    escritor.writerow(ENCABEZADOS)
+    for fila in filas:
+        escritor.writerow([_celda_csv(valor) for valor in fila])
+        if buffer.tell() >= _TAMANO_PARTE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def generar_xlsx(filas: Iterable[List[Any]]) -> Iterator[bytes]:
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Trabajos")
+    hoja.append(ENCABEZADOS)
+    for fila in filas:
+        hoja.append(fila)
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while parte := archivo.read(_TAMANO_PARTE):
+            yield parte
@@ -0,0 +1,24 @@
+# backend/funciones_sql.py
+from sqlalchemy import Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class epoch(FunctionElement):
+    """
+    Segundos desde 1970-01-01 de una fecha/hora, portable entre Postgres y SQLite (tests).
+    Permite operar con duraciones en SQL sin depender de `extract(epoch ...)`.
+    """
+    type = Float()
+    inherit_cache = True
+    name = "epoch"
+
+
+@compiles(epoch)
+def _epoch_default(element, compiler, **kw):
+    return "extract(epoch from %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(epoch, "sqlite")
+def _epoch_sqlite(element, compiler, **kw):
+    return "((julianday(%s) - 2440587.5) * 86400.0)" % compiler.process(element.clauses, **kw)
@@ -0,0 +1,459 @@
+# backend/importacion.py
+"""
+Motor de carga masiva de trabajos desde el Excel DBM.
+
+En lugar de un SELECT + INSERT/UPDATE por fila, cada lote de filas se resuelve con:
+  1. una consulta que trae los `pedido_dbm` ya existentes del lote,
+  2. un `INSERT ... ON CONFLICT (pedido_dbm) DO UPDATE` para los existentes,
+  3. un `INSERT ... ON CONFLICT DO NOTHING RETURNING id` para los nuevos,
+  4. un INSERT multi-fila con el historial inicial 'agendado' de los ids devueltos.
+"""
+import datetime
+import logging
+import os
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+from fastapi import HTTPException, status
+from openpyxl import load_workbook
+from pandas import DataFrame
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+import eventos, models
+from cache import cache_tablero
+
+logger = logging.getLogger(__name__)
+
+COLUMN_MAPPING = {
+    'Pedido DBM': 'pedido_dbm',
+    'Motivo de pedido': 'tipo_pedido',
+    'Fecha documento': 'fecha_creacion_pedido',
+    'Nombre consultor técnico': 'asesor_servicio',
+    'Matr.vehículo': 'patente',
+    'Sector': 'marca',
+    'Descripción del modelo de vehículo': 'modelo_vehiculo',
+    'Nº identificación vehículo': 'vin',
+    'Nombre del cliente': 'cliente_nombre',
+    'Descripción de tarea': 'detalle_pedido',
+    'Valor neto': 'total_pedido'
+}
+
+# Columnas que la carga escribe en `trabajos` (las normalizadas se calculan aquí: no hay eventos ORM en bulk)
+COLUMNAS_IMPORTABLES = list(COLUMN_MAPPING.values()) + ["patente_normalizada", "vin_normalizado"]
+
+TAMANO_LOTE = int(os.getenv("IMPORTACION_TAMANO_LOTE", "1000"))
+
+FilaImportacion = Tuple[int, Dict[str, Any]] # (fila del Excel, columnas del trabajo)
+
+# Se llama tras cada lote con los acumulados (creados, actualizados, fallidos)
+CallbackAvance = Callable[[int, int, int], None]
+
+# Cuántos mensajes de error por fila se conservan en una importación asíncrona
+MAX_ERRORES_GUARDADOS = 50
+
+# Filas iniciales donde se busca el encabezado 'Pedido DBM' (igual que buscar_fila_encabezado)
+FILAS_BUSQUEDA_ENCABEZADO = 10
+
+
+# --- Lectura y limpieza del Excel ---
+
+def buscar_fila_encabezado(df_temp: DataFrame) -> int:
+    for i, row in df_temp.head(10).iterrows():
+        if 'Pedido DBM' in row.values:
+            return i
+    return -1
+
+def validar_y_renombrar_columnas(df: DataFrame) -> DataFrame:
+    missing_cols = [col for col in COLUMN_MAPPING.keys() if col not in df.columns]
+    if missing_cols:
+        logger.error(f"Faltan columnas en el Excel: {missing_cols}")
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Faltan las siguientes columnas en el Excel: {', '.join(missing_cols)}")
+    
+    df.rename(columns=COLUMN_MAPPING, inplace=True)
+    return df
+
+def limpiar_dataframe(df: DataFrame) -> DataFrame:
+    date_columns = ['fecha_creacion_pedido']
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+            df[col] = df[col].apply(lambda x: x.to_pydatetime() if pd.notna(x) else None)
+    
+    df['pedido_dbm'] = pd.to_numeric(df['pedido_dbm'], errors='coerce')
+    if 'total_pedido' in df.columns:
+        df['total_pedido'] = pd.to_numeric(df['total_pedido'], errors='coerce')
+
+    df.dropna(subset=['pedido_dbm'], inplace=True)
+    df['pedido_dbm'] = df['pedido_dbm'].astype(int)
+    return df
+
+def leer_excel(origen: Union[str, BinaryIO]) -> DataFrame:
+    """Lee el export DBM (ruta o archivo en memoria), detecta el encabezado y devuelve el DataFrame limpio."""
+    try:
+        df_temp = pd.read_excel(origen, header=None, engine=None)
+        header_row_index = buscar_fila_encabezado(df_temp)
+        
+        if header_row_index == -1:
+            raise HTTPException(status_code=422, detail="No se pudo encontrar la fila de encabezado. Asegúrate que la columna 'Pedido DBM' exista.")
+
+        if hasattr(origen, "seek"):
+            origen.seek(0)
+        df = pd.read_excel(origen, header=header_row_index, engine=None)
+
+    except Exception as e:
+        logger.error(f"Error al leer o procesar el Excel: {e}", exc_info=True)
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No se pudo leer el archivo Excel: {e}")
+
+    df = validar_y_renombrar_columnas(df)
+    return limpiar_dataframe(df)
+
+
+# --- Carga masiva ---
+
+
+def _error_de_fila(numero_fila: int, pedido_dbm: Any, error: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=f"Error en la fila {numero_fila} del Excel (Pedido DBM: {pedido_dbm}). Detalle: {error}"
+    )
+
+
+def _valor_python(valor: Any) -> Any:
+    """Convierte escalares de numpy/pandas a tipos nativos que entienda el driver."""
+    if hasattr(valor, "item") and not isinstance(valor, (str, bytes)):
+        return valor.item()
+    return valor
+
+
+def _registrar_error(error: HTTPException, errores: Optional[List[str]]) -> None:
+    """Sin lista de errores (modo estricto) la fila fallida aborta la carga; con lista se anota y se sigue."""
+    if errores is None:
+        raise error
+    errores.append(error.detail)
+
+
+def preparar_filas(df: DataFrame, errores: Optional[List[str]] = None) -> List[FilaImportacion]:
+    """Extrae de un DataFrame ya limpio las columnas importables, con su número de fila en el Excel."""
+    columnas = [c for c in df.columns if c in COLUMN_MAPPING.values()]
+    filas = []
+    for index, registro in zip(df.index, df[columnas].to_dict("records")):
+        try:
+            datos = {k: _valor_python(v) for k, v in registro.items() if pd.notna(v)}
+            datos["pedido_dbm"] = str(datos["pedido_dbm"])
+            filas.append((index + 2, models.completar_normalizados(datos)))
+        except Exception as e:
+            logger.error(f"Error procesando fila {index + 2}: {e}", exc_info=True)
+            _registrar_error(_error_de_fila(index + 2, registro.get('pedido_dbm', 'N/A'), e), errores)
+    return filas
+
+
+# --- Lectura en streaming (memoria acotada) ---
+
+def _limpiar_fila(registro: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Equivalente por fila de limpiar_dataframe + preparar_filas. Devuelve None si la fila
+    no tiene un Pedido DBM numérico (limpiar_dataframe la descarta igual).
+    """
+    pedido = pd.to_numeric(registro.get("pedido_dbm"), errors="coerce")
+    if pd.isna(pedido):
+        return None
+
+    datos = {k: v for k, v in registro.items() if v is not None and not (isinstance(v, str) and not v.strip())}
+    datos["pedido_dbm"] = str(int(pedido))
+    if "fecha_creacion_pedido" in datos:
+        fecha = pd.to_datetime(datos["fecha_creacion_pedido"], errors="coerce")
+        if pd.isna(fecha):
+            del datos["fecha_creacion_pedido"]
+        else:
+            datos["fecha_creacion_pedido"] = fecha.to_pydatetime()
+    if "total_pedido" in datos:
+        total = pd.to_numeric(datos["total_pedido"], errors="coerce")
+        if pd.isna(total):
+            del datos["total_pedido"]
+        else:
+            datos["total_pedido"] = float(total)
+    return models.completar_normalizados(datos)
+
+
+def _iterar_filas_xlsx(ruta: str, errores: Optional[List[str]]) -> Iterator[FilaImportacion]:
+    try:
+        libro = load_workbook(ruta, read_only=True, data_only=True)
+    except Exception as e:
+        logger.error(f"Error al abrir el Excel: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No se pudo leer el archivo Excel: {e}")
+
+    try:
+        posiciones: Optional[Dict[str, int]] = None
+        for numero_fila, valores in enumerate(libro.active.iter_rows(values_only=True), start=1):
+            if posiciones is None:
+                if 'Pedido DBM' in valores:
+                    encabezado = [str(v).strip() if v is not None else None for v in valores]
+                    faltantes = [col for col in COLUMN_MAPPING if col not in encabezado]
+                    if faltantes:
+                        logger.error(f"Faltan columnas en el Excel: {faltantes}")
+                        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Faltan las siguientes columnas en el Excel: {', '.join(faltantes)}")
+                    posiciones = {destino: encabezado.index(origen) for origen, destino in COLUMN_MAPPING.items()}
+                elif numero_fila >= FILAS_BUSQUEDA_ENCABEZADO:
+                    break
+                continue
+
+            registro = {col: valores[i] if i < len(valores) else None for col, i in posiciones.items()}
+            try:
+                datos = _limpiar_fila(registro)
+            except Exception as e:
+                logger.error(f"Error procesando fila {numero_fila}: {e}", exc_info=True)
+                _registrar_error(_error_de_fila(numero_fila, registro.get('pedido_dbm', 'N/A'), e), errores)
+                continue
+            if datos is not None:
+                yield numero_fila, datos
+
+        if posiciones is None:
+            raise HTTPException(status_code=422, detail="No se pudo encontrar la fila de encabezado. Asegúrate que la columna 'Pedido DBM' exista.")
+    finally:
+        libro.close()
+
+
+def iterar_filas_excel(ruta: str, errores: Optional[List[str]] = None) -> Iterator[FilaImportacion]:
+    """
+    Recorre el export DBM desde disco fila por fila, entregando filas ya limpias y renombradas
+    (COLUMN_MAPPING) con su número de fila. Los .xlsx se leen con openpyxl en modo read-only, así la
+    memoria no depende del tamaño del archivo; los .xls (formato antiguo) pasan por pandas.
+    """
+    if ruta.lower().endswith(".xls"):
+        yield from preparar_filas(leer_excel(ruta), errores=errores)
+        return
+    yield from _iterar_filas_xlsx(ruta, errores)
+
+
+def _insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _sentencia_actualizar(db: Session, filas: List[Dict[str, Any]]):
+    """Upsert de trabajos existentes: solo pisa las columnas con valor en el Excel (COALESCE)."""
+    tabla = models.Trabajo.__table__
+    insert = _insert(db)
+    sentencia = insert(tabla).values(filas)
+    return sentencia.on_conflict_do_update(
+        index_elements=[tabla.c.pedido_dbm],
+        set_={
+            col: func.coalesce(getattr(sentencia.excluded, col), tabla.c[col])
+            for col in COLUMNAS_IMPORTABLES if col != "pedido_dbm"
+        }
+    )
+
+
+def _sentencia_insertar(db: Session, filas: List[Dict[str, Any]]):
+    tabla = models.Trabajo.__table__
+    insert = _insert(db)
+    return (
+        insert(tabla).values(filas)
+        .on_conflict_do_nothing(index_elements=[tabla.c.pedido_dbm])
+        .returning(tabla.c.id, tabla.c.pedido_dbm)
+    )
+
+
+def _fila_completa(datos: Dict[str, Any], nuevo: bool, ahora: datetime.datetime) -> Dict[str, Any]:
+    # Un INSERT multi-fila necesita las mismas claves en todas las filas
+    fila = {col: datos.get(col) for col in COLUMNAS_IMPORTABLES}
+    fila["estado_actual"] = "agendado"
+    if nuevo and fila["fecha_creacion_pedido"] is None:
+        fila["fecha_creacion_pedido"] = ahora
+    return fila
+
+
+def _unificar_duplicados(lote: List[FilaImportacion]) -> Dict[str, Tuple[int, Dict[str, Any], int]]:
+    """
+    Un mismo pedido repetido en el Excel se combina en orden (la última fila con valor gana).
+    Devuelve pedido -> (fila del Excel, datos combinados, repeticiones).
+    """
+    unificadas: Dict[str, Tuple[int, Dict[str, Any], int]] = {}
+    for numero_fila, datos in lote:
+        anterior = unificadas.get(datos["pedido_dbm"])
+        if anterior:
+            unificadas[datos["pedido_dbm"]] = (numero_fila, {**anterior[1], **datos}, anterior[2] + 1)
+        else:
+            unificadas[datos["pedido_dbm"]] = (numero_fila, datos, 1)
+    return unificadas
+
+
+def _insertar_historial_inicial(db: Session, trabajo_ids: List[int], ahora: datetime.datetime) -> None:
+    db.execute(models.HistorialDeEstado.__table__.insert().values(
+        [{"trabajo_id": id_, "estado": "agendado", "fecha_inicio": ahora} for id_ in trabajo_ids]
+    ))
+
+
+def _procesar_fila_a_fila(db: Session, unificadas, existentes: set, ahora: datetime.datetime,
+                          errores: Optional[List[str]]) -> Tuple[int, int, int]:
+    """
+    Camino lento tras fallar un lote: cada pedido en su propio savepoint, para identificar
+    la fila que falla (modo estricto) o saltarla y seguir (modo con lista de errores).
+    """
+    creados, actualizados, fallidos = 0, 0, 0
+    for pedido, (numero_fila, datos, repeticiones) in unificadas.items():
+        nuevo = pedido not in existentes
+        try:
+            with db.begin_nested():
+                insertados = []
+                if nuevo:
+                    insertados = db.execute(_sentencia_insertar(db, [_fila_completa(datos, True, ahora)])).all()
+                    if insertados:
+                        _insertar_historial_inicial(db, [insertados[0][0]], ahora)
+                if not insertados:
+                    db.execute(_sentencia_actualizar(db, [_fila_completa(datos, False, ahora)]))
+        except SQLAlchemyError as e:
+            _registrar_error(_error_de_fila(numero_fila, pedido, e), errores)
+            fallidos += repeticiones
+            continue
+        creados += len(insertados)
+        actualizados += repeticiones - len(insertados)
+    return creados, actualizados, fallidos
+
+
+def _procesar_lote(db: Session, lote: List[FilaImportacion], ahora: datetime.datetime,
+                   errores: Optional[List[str]]) -> Tuple[int, int, int]:
+    unificadas = _unificar_duplicados(lote)
+    # Los pedidos ya archivados (entregados hace tiempo, ver archivo.py) no se reabren ni se modifican;
+    # se cuentan como actualizados, igual que un pedido existente sin cambios
+    archivados = {
+        pedido for (pedido,) in
+        db.query(models.TrabajoArchivado.pedido_dbm).filter(models.TrabajoArchivado.pedido_dbm.in_(list(unificadas)))
+    }
+    for pedido in archivados:
+        del unificadas[pedido]
+    existentes = {
+        pedido for (pedido,) in
+        db.query(models.Trabajo.pedido_dbm).filter(models.Trabajo.pedido_dbm.in_(list(unificadas)))
+    }
+    a_actualizar = [_fila_completa(d, False, ahora) for p, (_, d, _r) in unificadas.items() if p in existentes]
+    a_insertar = [_fila_completa(d, True, ahora) for p, (_, d, _r) in unificadas.items() if p not in existentes]
+
+    punto = db.begin_nested()
+    try:
+        if a_actualizar:
+            db.execute(_sentencia_actualizar(db, a_actualizar))
+        insertados = db.execute(_sentencia_insertar(db, a_insertar)).all() if a_insertar else []
+
+        # Los que otro proceso insertó entre el SELECT y el INSERT se actualizan
+        pedidos_insertados = {pedido for _, pedido in insertados}
+        perdidos = [f for f in a_insertar if f["pedido_dbm"] not in pedidos_insertados]
+        if perdidos:
+            db.execute(_sentencia_actualizar(db, perdidos))
+
+        if insertados:
+            _insertar_historial_inicial(db, [id_ for id_, _ in insertados], ahora)
+        punto.commit()
+    except SQLAlchemyError as e:
+        punto.rollback()
+        logger.error(f"Error en lote de carga masiva, se reintenta fila por fila: {e}")
+        creados, actualizados, fallidos = _procesar_fila_a_fila(db, unificadas, existentes, ahora, errores)
+        return creados, len(lote) - creados - fallidos, fallidos
+
+    # Conteo equivalente al proceso fila por fila: cada repetición de un pedido cuenta como actualización
+    creados = len(insertados)
+    return creados, len(lote) - creados, 0
+
+
+def _en_lotes(filas: Iterable[FilaImportacion], tamano: int) -> Iterable[List[FilaImportacion]]:
+    lote: List[FilaImportacion] = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def upsert_trabajos(
+    db: Session,
+    filas: Iterable[FilaImportacion],
+    tamano_lote: int = TAMANO_LOTE,
+    errores: Optional[List[str]] = None,
+    al_avanzar: Optional[CallbackAvance] = None,
+) -> Tuple[int, int]:
+    """
+    Crea o actualiza trabajos por `pedido_dbm` en lotes. No hace commit (salvo que lo haga `al_avanzar`).
+    Devuelve (creados, actualizados). Si una fila falla lanza HTTPException 422 indicando fila y pedido,
+    salvo que se pase `errores`: entonces la fila se omite y su mensaje se agrega a la lista.
+    """
+    ahora = datetime.datetime.utcnow()
+    creados, actualizados, fallidos = 0, 0, 0
+    for lote in _en_lotes(filas, tamano_lote):
+        c, a, f = _procesar_lote(db, lote, ahora, errores)
+        creados += c
+        actualizados += a
+        fallidos += f
+        if al_avanzar:
+            al_avanzar(creados, actualizados, fallidos)
+    return creados, actualizados
+
+
+def ejecutar_importacion(db: Session, importacion_id: str) -> None:
+    """
+    Procesa una importación asíncrona registrada en `importaciones_excel` (la llama la tarea de Celery).
+    Lee el archivo en streaming y hace commit tras cada lote para que el progreso sea visible;
+    las filas con error se omiten y se cuentan.
+    """
+    importacion = db.get(models.ImportacionExcel, importacion_id)
+    if importacion is None:
+        logger.error(f"Importación {importacion_id} no encontrada")
+        return
+
+    importacion.estado = "procesando"
+    importacion.filas_leidas = 0
+    db.commit()
+
+    errores_lectura: List[str] = []
+    errores_carga: List[str] = []
+    leidas = 0
+
+    def contar_leidas(filas: Iterable[FilaImportacion]) -> Iterator[FilaImportacion]:
+        nonlocal leidas
+        for fila in filas:
+            leidas += 1
+            yield fila
+
+    def al_avanzar(creados: int, actualizados: int, fallidos: int) -> None:
+        importacion.filas_leidas = leidas + len(errores_lectura)
+        importacion.creados = creados
+        importacion.actualizados = actualizados
+        importacion.fallidos = len(errores_lectura) + fallidos
+        importacion.errores = (errores_lectura + errores_carga)[:MAX_ERRORES_GUARDADOS]
+        db.commit()
+        cache_tablero.incrementar_version()
+
+    try:
+        filas = contar_leidas(iterar_filas_excel(importacion.ruta_archivo, errores=errores_lectura))
+        creados, actualizados = upsert_trabajos(db, filas, errores=errores_carga, al_avanzar=al_avanzar)
+        importacion.filas_leidas = leidas + len(errores_lectura)
+        importacion.creados = creados
+        importacion.actualizados = actualizados
+        importacion.estado = "completado"
+        importacion.mensaje = "Archivo procesado exitosamente"
+    except HTTPException as e:
+        db.rollback()
+        importacion.estado = "error"
+        importacion.mensaje = str(e.detail)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error inesperado en la importación {importacion_id}: {e}", exc_info=True)
+        importacion.estado = "error"
+        importacion.mensaje = f"Error inesperado al procesar el archivo: {e}"
+    finally:
+        importacion.fecha_fin = datetime.datetime.utcnow()
+        db.commit()
+        eventos.publicar_evento({
+            "tipo": "importacion", "importacion_id": importacion.id, "estado": importacion.estado,
+            "creados": importacion.creados, "actualizados": importacion.actualizados,
+        })
+        if importacion.ruta_archivo and os.path.exists(importacion.ruta_archivo):
+            os.remove(importacion.ruta_archivo)
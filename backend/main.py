@@ -1,19 +1,38 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+
+import anyio
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine # Importamos engine
+from database import engine, metricas_pool # Importamos engine
 # 👇 IMPORTANTE: Importamos models pero NO lo usamos aquí directamente
 import models 
+import auth
 from auth import router as auth_router
 from trabajos import router as trabajos_router
 from tecnicos import router as tecnicos_router
 from dashboard import router as dashboard_router
+from eventos import router as eventos_router
+from alertas import router as alertas_router
+from condicional import ETagMiddleware
+from serializacion import CompresionMiddleware
 
 # --- 🛑 LÍNEA ELIMINADA O COMENTADA 🛑 ---
 # models.Base.metadata.create_all(bind=engine) 
 # La creación de tablas se maneja externamente (ej. con Alembic o en tests)
 # ------------------------------------------
 
-app = FastAPI(title="API Taller Dashboard", version="0.1.0")
+# Los endpoints y dependencias `def` (casi toda la API: usan SQLAlchemy síncrono) corren en el threadpool
+# de AnyIO, 40 hilos por defecto. THREADPOOL_TAMANO lo ajusta para que calce con el pool de conexiones de la BD.
+THREADPOOL_TAMANO = os.getenv("THREADPOOL_TAMANO")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if THREADPOOL_TAMANO:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = int(THREADPOOL_TAMANO)
+    yield
+
+app = FastAPI(title="API Taller Dashboard", version="0.1.0", lifespan=lifespan)
 
 # Configuración de CORS
 origins = [
@@ -28,24 +47,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# ETag de las lecturas condicionales (ver condicional.py)
+app.add_middleware(ETagMiddleware)
+
+# Compresión br/gzip de las respuestas JSON grandes (ver serializacion.py)
+app.add_middleware(CompresionMiddleware)
+
 # Incluir los routers
 app.include_router(auth_router)
 app.include_router(trabajos_router)
 app.include_router(tecnicos_router)
 app.include_router(dashboard_router)
+app.include_router(eventos_router)
+app.include_router(alertas_router)
 
 
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Bienvenido a la API del Taller Dashboard"}
 
-# Aquí podrías añadir eventos de startup/shutdown si los necesitas en el futuro
-# @app.on_event("startup")
-# async def startup_event():
-#     # Código a ejecutar al iniciar la app (si es necesario)
-#     pass
+@app.get("/metricas/pool", tags=["Root"], dependencies=[Depends(auth.get_current_admin_user)])
+def leer_metricas_pool():
+    """Conexiones en uso, overflow y espera por conexión del pool de este proceso."""
+    return metricas_pool(engine)
+
+# Aquí podrías añadir eventos de startup/shutdown si los necesitas en el futuro (ver `lifespan` arriba)
 
 # @app.on_event("shutdown")
 # async def shutdown_event():
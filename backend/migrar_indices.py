@@ -0,0 +1,53 @@
+# backend/migrar_indices.py
+"""
+Tarea única: lleva una base existente al esquema de índices declarado en models.py.
+Crea las tablas nuevas que falten (p. ej. alertas_permanencia, las del archivo de entregados, del
+resumen de permanencia o carga_tecnicos) y los índices declarados que aún no existan en ellas.
+La carga de técnicos se rellena con backfill_carga_tecnicos.py. En Postgres los índices se crean
+con CREATE INDEX CONCURRENTLY para no bloquear las escrituras del taller mientras se construyen.
+Los índices trigram los crea backfill_busqueda.py (requieren pg_trgm).
+Se puede volver a ejecutar sin problema.
+"""
+from sqlalchemy import inspect
+
+import models
+from database import Base, engine
+
+TABLAS = (
+    models.Trabajo.__table__, models.HistorialDeEstado.__table__, models.AlertaPermanencia.__table__,
+    models.TrabajoArchivado.__table__, models.HistorialArchivado.__table__,
+    models.ResumenPermanencia.__table__, models.MarcaAgregacion.__table__, models.CargaTecnico.__table__,
+)
+
+
+def crear_tablas_faltantes() -> None:
+    existentes = set(inspect(engine).get_table_names())
+    faltantes = [tabla for tabla in TABLAS if tabla.name not in existentes]
+    Base.metadata.create_all(bind=engine, tables=faltantes)
+    for tabla in faltantes:
+        print(f"Tabla '{tabla.name}' creada.")
+
+
+def crear_indices_faltantes() -> None:
+    inspector = inspect(engine)
+    es_postgres = engine.dialect.name == "postgresql"
+    for tabla in TABLAS:
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name in existentes or indice.name.endswith("_trgm"):
+                continue
+            if es_postgres:
+                indice.dialect_options["postgresql"]["concurrently"] = True
+            # CONCURRENTLY no puede ir dentro de una transacción
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                indice.create(bind=conn)
+            print(f"Índice '{indice.name}' creado.")
+
+
+if __name__ == "__main__":
+    print("--- Migrando índices ---")
+    crear_tablas_faltantes()
+    crear_indices_faltantes()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print("Estadísticas del planificador actualizadas.")
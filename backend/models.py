@@ -1,9 +1,27 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, Float, Index, DDL, JSON, Table, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import datetime
+import re
 from database import Base # Asegúrate de importar Base
 
+# --- Normalización de identificadores de vehículo ---
+# Patente y VIN se comparan sin mayúsculas/minúsculas, guiones ni espacios ("ab-12 cd" == "AB12CD")
+_NO_ALFANUMERICO = re.compile(r"[^0-9A-Z]")
+
+def normalizar_identificador(valor):
+    if valor is None:
+        return None
+    return _NO_ALFANUMERICO.sub("", str(valor).upper())
+
+def completar_normalizados(datos: dict) -> dict:
+    """Agrega patente/VIN normalizados a un dict de columnas (para inserciones masivas sin eventos ORM)."""
+    if "patente" in datos:
+        datos["patente_normalizada"] = normalizar_identificador(datos["patente"])
+    if "vin" in datos:
+        datos["vin_normalizado"] = normalizar_identificador(datos["vin"])
+    return datos
+
 # --- Modelo de Usuario ---
 class User(Base):
     __tablename__ = "users"
@@ -24,6 +42,14 @@ class Tecnico(Base):
     # Un técnico puede tener muchos trabajos. 'back_populates' conecta con 'tecnico_asignado' en Trabajo
     trabajos_asignados = relationship("Trabajo", back_populates="tecnico_asignado")
 
+# --- Carga de trabajo por técnico (carga.py) ---
+# Trabajos activos (no entregados) asignados a cada técnico, por estado. Se ajusta en cada transición.
+class CargaTecnico(Base):
+    __tablename__ = "carga_tecnicos"
+    tecnico_id = Column(Integer, ForeignKey("tecnicos.id"), primary_key=True)
+    estado = Column(String, primary_key=True)
+    cantidad = Column(Integer, nullable=False, default=0)
+
 # --- Modelo de Trabajo ---
 class Trabajo(Base):
     __tablename__ = "trabajos"
@@ -36,6 +62,8 @@ class Trabajo(Base):
     marca = Column(String)
     modelo_vehiculo = Column(String)
     vin = Column(String, index=True)
+    patente_normalizada = Column(String, index=True) # Mantenida por los eventos de abajo
+    vin_normalizado = Column(String, index=True)
     cliente_nombre = Column(String, index=True)
     detalle_pedido = Column(Text)
     total_pedido = Column(Float)
@@ -45,15 +73,46 @@ class Trabajo(Base):
     
     eta_fecha = Column(DateTime(timezone=True), nullable=True) # Para 'trabajo detenido'
     eta_motivo = Column(String, nullable=True) # Para 'trabajo detenido'
+
+    # Tiempo detenido mantenido en cada transición (evita sumar el historial en cada listado)
+    segundos_detenido_acumulados = Column(Float, nullable=False, default=0, server_default="0") # Detenciones ya cerradas
+    detenido_desde = Column(DateTime(timezone=True), nullable=True) # Inicio de la detención abierta, si la hay
     
     # --- 👇 RELACIÓN ACTUALIZADA ---
-    tecnico_id = Column(Integer, ForeignKey("tecnicos.id"), nullable=True)
+    tecnico_id = Column(Integer, ForeignKey("tecnicos.id"), nullable=True, index=True) # EXISTS al borrar un técnico
     # Conecta con 'trabajos_asignados' en Tecnico
     tecnico_asignado = relationship("Tecnico", back_populates="trabajos_asignados") 
 
     # Un trabajo tiene muchos historiales
     historial = relationship("HistorialDeEstado", back_populates="trabajo")
 
+    # Índices trigram (pg_trgm) para las búsquedas por subcadena ('%x%'); solo existen en Postgres.
+    # En SQLite (tests) la búsqueda usa la tabla FTS5 'trabajos_fts' definida más abajo.
+    # Los índices parciales sobre los trabajos activos sirven al listado por defecto (activos=True) y a
+    # /dashboard/stats; los entregados, que son la mayoría de la tabla, quedan fuera.
+    # tests/test_planes.py verifica con EXPLAIN que las consultas calientes los usan.
+    __table_args__ = (
+        Index("ix_trabajos_activos_fecha_creacion", "fecha_creacion_pedido", "id",
+              postgresql_where=estado_actual != "entregado al cliente",
+              sqlite_where=estado_actual != "entregado al cliente"),
+        Index("ix_trabajos_activos_id", "id",
+              postgresql_where=estado_actual != "entregado al cliente",
+              sqlite_where=estado_actual != "entregado al cliente"),
+        Index("ix_trabajos_estado_fecha_creacion", "estado_actual", "fecha_creacion_pedido", "id"),
+        Index("ix_trabajos_cliente_nombre_trgm", "cliente_nombre",
+              postgresql_using="gin", postgresql_ops={"cliente_nombre": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_trabajos_pedido_dbm_trgm", "pedido_dbm",
+              postgresql_using="gin", postgresql_ops={"pedido_dbm": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_trabajos_patente_normalizada_trgm", "patente_normalizada",
+              postgresql_using="gin", postgresql_ops={"patente_normalizada": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_trabajos_vin_normalizado_trgm", "vin_normalizado",
+              postgresql_using="gin", postgresql_ops={"vin_normalizado": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_trabajos_asesor_servicio_trgm", "asesor_servicio",
+              postgresql_using="gin", postgresql_ops={"asesor_servicio": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        # Los ids de trabajos archivados no se reutilizan (SQLite sin AUTOINCREMENT reusa el máximo)
+        {"sqlite_autoincrement": True},
+    )
+
 # --- Modelo de Historial de Estado ---
 class HistorialDeEstado(Base):
     __tablename__ = "historial_de_estados"
@@ -69,4 +128,171 @@ class HistorialDeEstado(Base):
     fecha_eta = Column(DateTime(timezone=True), nullable=True) # ETA específica de esta detención
 
     # Relación inversa
-    trabajo = relationship("Trabajo", back_populates="historial")
\ No newline at end of file
+    trabajo = relationship("Trabajo", back_populates="historial")
+
+    # - historial de un trabajo en orden (GET /trabajos/{id}/historial, selectinload del listado),
+    # - el estado abierto de un trabajo (cada transición),
+    # - estados abiertos por estado y antigüedad: la revisión de permanencia (alertas.py) sólo recorre
+    #   los que superaron el límite,
+    # - estados cerrados desde la última marca del resumen de permanencia (analitica.py).
+    __table_args__ = (
+        Index("ix_historial_trabajo_inicio", "trabajo_id", "fecha_inicio", "id"),
+        Index("ix_historial_abierto_trabajo", "trabajo_id",
+              postgresql_where=fecha_fin.is_(None), sqlite_where=fecha_fin.is_(None)),
+        Index("ix_historial_abiertos_estado_inicio", "estado", "fecha_inicio",
+              postgresql_where=fecha_fin.is_(None), sqlite_where=fecha_fin.is_(None)),
+        Index("ix_historial_cerrados_fin", "fecha_fin",
+              postgresql_where=fecha_fin.is_not(None), sqlite_where=fecha_fin.is_not(None)),
+    )
+
+
+# --- Modelo de Alerta de Permanencia ---
+# Una fila por estado (historial) que superó su límite de tiempo: se emite una sola vez y se
+# resuelve cuando el trabajo cambia de estado.
+class AlertaPermanencia(Base):
+    __tablename__ = "alertas_permanencia"
+    id = Column(Integer, primary_key=True, index=True)
+    trabajo_id = Column(Integer, ForeignKey("trabajos.id"), nullable=False)
+    historial_id = Column(Integer, ForeignKey("historial_de_estados.id"), nullable=False, unique=True)
+    estado = Column(String, nullable=False)
+    limite_horas = Column(Float, nullable=False)
+    fecha_inicio_estado = Column(DateTime(timezone=True), nullable=False)
+    fecha_limite = Column(DateTime(timezone=True), nullable=False) # Inicio + límite, o la ETA de la detención
+    fecha_alerta = Column(DateTime(timezone=True), nullable=False)
+    fecha_resuelta = Column(DateTime(timezone=True), nullable=True) # NULL mientras siga en el estado
+
+    trabajo = relationship("Trabajo")
+
+    __table_args__ = (
+        Index("ix_alertas_permanencia_abiertas", "trabajo_id",
+              postgresql_where=fecha_resuelta.is_(None), sqlite_where=fecha_resuelta.is_(None)),
+    )
+
+
+# --- Archivo de trabajos entregados ---
+# archivo.py mueve aquí los trabajos entregados hace más de ARCHIVO_DIAS, con su historial y el mismo id.
+# Así `trabajos` e `historial_de_estados` sólo guardan el trabajo en curso y los entregados recientes.
+# Las columnas de trabajos_archivados se copian de Trabajo para que no se desincronicen.
+class TrabajoArchivado(Base):
+    __table__ = Table(
+        "trabajos_archivados", Base.metadata,
+        *[columna._copy() for columna in Trabajo.__table__.columns],
+        Index("ix_trabajos_archivados_cliente_nombre_trgm", "cliente_nombre",
+              postgresql_using="gin", postgresql_ops={"cliente_nombre": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_trabajos_archivados_pedido_dbm_trgm", "pedido_dbm",
+              postgresql_using="gin", postgresql_ops={"pedido_dbm": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_trabajos_archivados_patente_normalizada_trgm", "patente_normalizada",
+              postgresql_using="gin", postgresql_ops={"patente_normalizada": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_trabajos_archivados_vin_normalizado_trgm", "vin_normalizado",
+              postgresql_using="gin", postgresql_ops={"vin_normalizado": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
+
+    # _copy() no copia la ForeignKey de tecnico_id: la relación declara el join
+    tecnico_asignado = relationship(
+        "Tecnico", primaryjoin="foreign(TrabajoArchivado.tecnico_id) == Tecnico.id", viewonly=True
+    )
+    historial = relationship("HistorialArchivado", back_populates="trabajo")
+
+
+class HistorialArchivado(Base):
+    __tablename__ = "historial_archivado"
+    id = Column(Integer, primary_key=True)
+    trabajo_id = Column(Integer, ForeignKey("trabajos_archivados.id"), nullable=False)
+    estado = Column(String, nullable=False)
+    fecha_inicio = Column(DateTime(timezone=True))
+    fecha_fin = Column(DateTime(timezone=True), nullable=True)
+    motivo_detencion = Column(String, nullable=True)
+    detalle_motivo = Column(String, nullable=True)
+    fecha_eta = Column(DateTime(timezone=True), nullable=True)
+
+    trabajo = relationship("TrabajoArchivado", back_populates="historial")
+
+    __table_args__ = (
+        Index("ix_historial_archivado_trabajo_inicio", "trabajo_id", "fecha_inicio", "id"),
+    )
+
+
+# --- Resumen de permanencia por estado (analitica.py) ---
+# Una fila por día de cierre, dimensión (estado, tecnico, asesor_servicio, tipo_pedido), valor de la
+# dimensión, estado y cubeta de duración. Lo mantiene una tarea de Celery a partir de los historiales
+# cerrados después de la marca guardada en marcas_agregacion.
+class ResumenPermanencia(Base):
+    __tablename__ = "resumen_permanencia"
+    id = Column(Integer, primary_key=True)
+    dia = Column(Date, nullable=False) # Día (UTC) en que se cerró el estado
+    dimension = Column(String, nullable=False)
+    valor = Column(String, nullable=False, default="") # '' en la dimensión 'estado' y para valores vacíos
+    estado = Column(String, nullable=False)
+    cubeta = Column(Integer, nullable=False) # Índice en analitica.CUBETAS_SEGUNDOS
+    cantidad = Column(Integer, nullable=False, default=0)
+    suma_segundos = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ux_resumen_permanencia_clave", "dimension", "dia", "valor", "estado", "cubeta", unique=True),
+    )
+
+
+class MarcaAgregacion(Base):
+    __tablename__ = "marcas_agregacion"
+    nombre = Column(String, primary_key=True)
+    hasta = Column(DateTime(timezone=True), nullable=False) # Todo lo cerrado hasta aquí ya está agregado
+
+
+# --- Modelo de Importación de Excel (carga asíncrona en el worker de Celery) ---
+class ImportacionExcel(Base):
+    __tablename__ = "importaciones_excel"
+    id = Column(String, primary_key=True) # uuid4 en hex, se entrega al cliente para consultar el progreso
+    nombre_archivo = Column(String)
+    ruta_archivo = Column(String) # Copia del archivo subido, se borra al terminar
+    estado = Column(String, default="pendiente", index=True) # pendiente | procesando | completado | error
+    filas_leidas = Column(Integer, default=0)
+    creados = Column(Integer, default=0)
+    actualizados = Column(Integer, default=0)
+    fallidos = Column(Integer, default=0)
+    errores = Column(JSON, nullable=True) # Primeros mensajes de error por fila
+    mensaje = Column(Text, nullable=True)
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_fin = Column(DateTime(timezone=True), nullable=True)
+
+@event.listens_for(Trabajo, "before_insert")
+@event.listens_for(Trabajo, "before_update")
+def _normalizar_identificadores(mapper, connection, target):
+    target.patente_normalizada = normalizar_identificador(target.patente)
+    target.vin_normalizado = normalizar_identificador(target.vin)
+
+
+# --- Búsqueda por subcadena ---
+# Postgres: extensión pg_trgm (requerida por los índices gin_trgm_ops de Trabajo).
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+# SQLite: índice FTS5 con tokenizer trigram sobre las columnas buscables, sincronizado con triggers.
+# Cada tabla de trabajos (vigentes y archivados) tiene el suyo: '<tabla>_fts'.
+COLUMNAS_FTS = "cliente_nombre, pedido_dbm, patente_normalizada, vin_normalizado"
+
+def _ddl_fts_sqlite(tabla: str) -> list:
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_fts USING fts5({COLUMNAS_FTS}, "
+        f"content='{tabla}', content_rowid='id', tokenize='trigram')",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts(rowid, {COLUMNAS_FTS})
+            VALUES (new.id, new.cliente_nombre, new.pedido_dbm, new.patente_normalizada, new.vin_normalizado);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ad AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts({tabla}_fts, rowid, {COLUMNAS_FTS})
+            VALUES ('delete', old.id, old.cliente_nombre, old.pedido_dbm, old.patente_normalizada, old.vin_normalizado);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_au AFTER UPDATE ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts({tabla}_fts, rowid, {COLUMNAS_FTS})
+            VALUES ('delete', old.id, old.cliente_nombre, old.pedido_dbm, old.patente_normalizada, old.vin_normalizado);
+            INSERT INTO {tabla}_fts(rowid, {COLUMNAS_FTS})
+            VALUES (new.id, new.cliente_nombre, new.pedido_dbm, new.patente_normalizada, new.vin_normalizado);
+        END""",
+    ]
+
+for _tabla in (Trabajo.__table__, TrabajoArchivado.__table__):
+    for _sentencia in _ddl_fts_sqlite(_tabla.name):
+        event.listen(_tabla, "after_create", DDL(_sentencia).execute_if(dialect="sqlite"))
@@ -0,0 +1,127 @@
+# backend/paginacion.py
+import base64
+import datetime
+import json
+import logging
+import os
+from typing import Any, Hashable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Los totales "cacheados" se reutilizan durante este tiempo para el mismo set de filtros
+TOTALES_CACHE_TTL = float(os.getenv("TOTALES_CACHE_TTL", "30"))
+_totales_cache = TTLCache(ttl_segundos=TOTALES_CACHE_TTL)
+
+
+# --- Cursores opacos (keyset) ---
+
+def _serializar_valor(valor: Any) -> Any:
+    if isinstance(valor, datetime.datetime):
+        return {"dt": valor.isoformat()}
+    return valor
+
+def _deserializar_valor(valor: Any) -> Any:
+    if isinstance(valor, dict) and "dt" in valor:
+        return datetime.datetime.fromisoformat(valor["dt"])
+    return valor
+
+def codificar_cursor(sort_by: str, sort_order: str, valor: Any, ultimo_id: int) -> str:
+    """Codifica la posición (valor de orden, id) de la última fila entregada."""
+    payload = {"s": sort_by, "o": sort_order, "v": _serializar_valor(valor), "id": ultimo_id}
+    crudo = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, int]:
+    """
+    Decodifica un cursor generado por `codificar_cursor`.
+    Rechaza cursores corruptos o generados para otro ordenamiento.
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        valor, ultimo_id = _deserializar_valor(payload["v"]), int(payload["id"])
+        mismo_orden = payload["s"] == sort_by and payload["o"] == sort_order
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación inválido.")
+    if not mismo_orden:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cursor no corresponde al ordenamiento solicitado."
+        )
+    return valor, ultimo_id
+
+
+# --- Ordenamiento y filtro keyset ---
+# Los NULL se tratan como el valor más grande (igual que el default de Postgres):
+# ASC -> NULLS LAST, DESC -> NULLS FIRST. Así un índice b-tree simple sirve en ambos sentidos.
+
+def orden_keyset(columna, columna_id, descendente: bool) -> list:
+    if columna is columna_id:
+        return [columna_id.desc() if descendente else columna_id.asc()]
+    if descendente:
+        return [columna.desc().nullsfirst(), columna_id.desc()]
+    return [columna.asc().nullslast(), columna_id.asc()]
+
+def filtro_keyset(columna, columna_id, descendente: bool, valor: Any, ultimo_id: int):
+    """Condición que selecciona las filas posteriores a (valor, ultimo_id) en el orden dado."""
+    if columna is columna_id:
+        return columna_id < ultimo_id if descendente else columna_id > ultimo_id
+
+    if descendente:
+        if valor is None:
+            return or_(and_(columna.is_(None), columna_id < ultimo_id), columna.isnot(None))
+        return or_(columna < valor, and_(columna == valor, columna_id < ultimo_id))
+
+    if valor is None:
+        return and_(columna.is_(None), columna_id > ultimo_id)
+    return or_(columna > valor, and_(columna == valor, columna_id > ultimo_id), columna.is_(None))
+
+
+# --- Totales ---
+
+def _estimar_total(db: Session, query_conteo: Query) -> Optional[int]:
+    """Usa la estimación de filas del planificador de Postgres (EXPLAIN), sin ejecutar la consulta."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compilada = query_conteo.statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compilada), compilada.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def calcular_total(db: Session, query_conteo: Query, modo: str, clave_cache: Hashable) -> Tuple[Optional[int], bool]:
+    """
+    Devuelve (total, es_exacto) según el modo pedido:
+    'exact' cuenta siempre, 'cached' reutiliza el conteo del mismo set de filtros,
+    'estimated' usa el planificador (cae a conteo exacto fuera de Postgres) y 'none' no cuenta.
+    """
+    if modo == "none":
+        return None, False
+
+    if modo == "cached":
+        total = _totales_cache.get(clave_cache)
+        if total is not None:
+            return total, True
+
+    if modo == "estimated":
+        try:
+            estimado = _estimar_total(db, query_conteo)
+        except Exception as e:
+            logger.warning(f"No se pudo estimar el total con EXPLAIN, se usa conteo exacto: {e}")
+            estimado = None
+        if estimado is not None:
+            return estimado, False
+
+    total = query_conteo.scalar() or 0
+    if modo == "cached":
+        _totales_cache.set(clave_cache, total)
+    return total, True
@@ -1,8 +1,8 @@
 # schemas.py
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import AliasPath, BaseModel, ConfigDict, Field
 import datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 
 # --- ESQUEMAS DE TECNICO (CORRECTOS) ---
 class TecnicoBase(BaseModel):
@@ -16,6 +16,13 @@ class Tecnico(TecnicoBase):
     id: int
     model_config = ConfigDict(from_attributes=True)
 
+class CargaTecnico(BaseModel):
+    tecnico_id: int
+    nombre: Optional[str] = None
+    activos: int # Trabajos no entregados asignados
+    detenidos: int # De ellos, en 'trabajo detenido'
+    por_estado: Dict[str, int]
+
 # --- ESQUEMAS EXISTENTES (CON CORRECCIÓN) ---
 
 class HistorialBase(BaseModel):
@@ -50,6 +57,7 @@ class Trabajo(TrabajoBase):
     id: int
     estado_actual: str
     dias_de_estadia_activa: Optional[int] = 0
+    tiempo_detenido_segundos: Optional[int] = 0
     historial: List[Historial] = []
     # --- ✨ CORRECCIÓN AQUÍ ---
     # El nombre debe coincidir con el atributo de la relación en models.py
@@ -63,6 +71,24 @@ class TrabajoUpdateEstado(BaseModel):
     detalle_motivo: Optional[str] = None
     fecha_eta: Optional[datetime.datetime] = None
     tecnico_id: Optional[int] = None # <-- Esto está correcto
+
+class TransicionLote(TrabajoUpdateEstado):
+    trabajo_id: int
+
+class TransicionesLote(BaseModel):
+    transiciones: List[TransicionLote]
+    atomico: bool = False # True: si alguna transición no es válida no se aplica ninguna
+
+class ResultadoTransicion(BaseModel):
+    trabajo_id: int
+    aplicado: bool
+    estado_actual: Optional[str] = None
+    error: Optional[str] = None
+
+class TransicionesLoteRespuesta(BaseModel):
+    aplicados: int
+    rechazados: int
+    resultados: List[ResultadoTransicion]
     
 # ... (el resto del archivo es correcto) ...
 
@@ -72,15 +98,60 @@ class TrabajoUpdate(BaseModel):
 
 class PaginatedTrabajos(BaseModel):
     items: List[Trabajo]
-    total: int
+    total: Optional[int] = None # None cuando se pide total_mode=none
+    total_exacto: bool = True # False si el total es una estimación del planificador
+    next_cursor: Optional[str] = None # Cursor opaco para pedir la página siguiente por keyset
     model_config = ConfigDict(from_attributes=True)
 
+class ValorFaceta(BaseModel):
+    valor: str
+    cantidad: int
+
+class TecnicoFaceta(BaseModel):
+    tecnico_id: int
+    nombre: Optional[str] = None
+    cantidad: int
+
+class Facetas(BaseModel):
+    asesor_servicio: List[ValorFaceta]
+    marca: List[ValorFaceta]
+    tipo_pedido: List[ValorFaceta]
+    estado_actual: List[ValorFaceta]
+    tecnico: List[TecnicoFaceta]
+
 class UploadResponse(BaseModel):
     mensaje: str
     creados: int
     actualizados: int
     model_config = ConfigDict(from_attributes=True)
 
+class ImportacionEstado(BaseModel):
+    id: str
+    estado: str # pendiente | procesando | completado | error
+    nombre_archivo: Optional[str] = None
+    filas_leidas: Optional[int] = 0
+    creados: Optional[int] = 0
+    actualizados: Optional[int] = 0
+    fallidos: Optional[int] = 0
+    errores: Optional[List[str]] = None
+    mensaje: Optional[str] = None
+    fecha_creacion: Optional[datetime.datetime] = None
+    fecha_fin: Optional[datetime.datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+# --- ESQUEMA DE ALERTAS DE PERMANENCIA ---
+class AlertaPermanencia(BaseModel):
+    id: int
+    trabajo_id: int
+    patente: Optional[str] = Field(None, validation_alias=AliasPath("trabajo", "patente"))
+    estado: str
+    limite_horas: float
+    fecha_inicio_estado: datetime.datetime
+    fecha_limite: datetime.datetime
+    fecha_alerta: datetime.datetime
+    fecha_resuelta: Optional[datetime.datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
 class UserBase(BaseModel):
     username: str
     email: str
@@ -106,4 +177,24 @@ class TokenData(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
-    user: User # Incluimos los datos del usuario en la respuesta del token
\ No newline at end of file
+    user: User # Incluimos los datos del usuario en la respuesta del token
+
+
+# --- Analítica de permanencia (analitica.py) ---
+
+class PermanenciaGrupo(BaseModel):
+    valor: str # id del técnico, asesor o tipo de pedido ('' en la dimensión 'estado' o si no tiene)
+    nombre: Optional[str] = None # Nombre del técnico
+    estado: str
+    cantidad: int
+    promedio_segundos: float
+    p50_segundos: float
+    p90_segundos: float
+    p95_segundos: float
+
+class EstadisticasPermanencia(BaseModel):
+    dimension: str
+    desde: datetime.date
+    hasta: datetime.date
+    actualizado_hasta: Optional[datetime.datetime] = None # Cierres posteriores aún no agregados
+    grupos: List[PermanenciaGrupo]
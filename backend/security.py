@@ -1,9 +1,14 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
-from typing import Optional 
+from typing import Callable, Optional, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import multiprocessing
+import threading
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 # 👇 Importaciones necesarias para authenticate_user
@@ -19,7 +24,21 @@ SECRET_KEY = os.getenv("SECRET_KEY", "una-clave-secreta-muy-larga-y-dificil-de-a
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Costo de bcrypt; si se cambia, los hashes existentes se actualizan en el siguiente login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# --- POOL DE HASHING ---
+# bcrypt es CPU puro: corre en un pool de procesos acotado para no ocupar los hilos que atienden
+# lecturas del tablero. Si hay más de HASH_MAX_PENDIENTES operaciones en curso o en cola se
+# responde 503 con Retry-After en lugar de acumular logins. HASH_POOL_WORKERS=0 usa un solo hilo (dev).
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDIENTES = int(os.getenv("HASH_MAX_PENDIENTES", str(max(HASH_POOL_WORKERS, 1) * 8)))
+HASH_RETRY_AFTER_SEGUNDOS = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+_pendientes = 0
 
 # 👇 CORRECCIÓN: Apunta a /token, la ruta definida en auth.py
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token") 
@@ -27,13 +46,55 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 # --- FUNCIONES DE UTILIDAD ---
 
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn': el pool se crea con el servidor ya corriendo hilos y un fork podría heredar locks tomados
+            _pool = (
+                ProcessPoolExecutor(max_workers=HASH_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+                if HASH_POOL_WORKERS > 0 else ThreadPoolExecutor(max_workers=1)
+            )
+        return _pool
+
+def _liberar_cupo(_futuro: Future) -> None:
+    global _pendientes
+    with _pool_lock:
+        _pendientes -= 1
+
+def _enviar_al_pool(funcion: Callable, *args) -> Future:
+    """Encola una operación de hashing respetando el límite de admisión."""
+    global _pendientes
+    with _pool_lock:
+        if _pendientes >= HASH_MAX_PENDIENTES:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Demasiados inicios de sesión simultáneos, intenta nuevamente en unos segundos.",
+                headers={"Retry-After": str(HASH_RETRY_AFTER_SEGUNDOS)},
+            )
+        _pendientes += 1
+    try:
+        futuro = _obtener_pool().submit(funcion, *args)
+    except Exception:
+        _liberar_cupo(None)
+        raise
+    futuro.add_done_callback(_liberar_cupo)
+    return futuro
+
+# Se ejecutan dentro del pool (deben ser funciones de módulo para poder enviarse a otro proceso)
+def _verificar_y_actualizar(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _hashear(password: str) -> str:
+    return pwd_context.hash(password)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si una contraseña en texto plano coincide con una hasheada."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _enviar_al_pool(_verificar_y_actualizar, plain_password, hashed_password).result()[0]
 
 def get_password_hash(password: str) -> str:
     """Genera el hash de una contraseña."""
-    return pwd_context.hash(password)
+    return _enviar_al_pool(_hashear, password).result()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crea un nuevo token de acceso JWT."""
@@ -58,4 +119,37 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
         return None # Usuario no encontrado
     if not verify_password(password, user.hashed_password):
         return None # Contraseña incorrecta
-    return user # Usuario y contraseña válidos
\ No newline at end of file
+    return user # Usuario y contraseña válidos
+
+def _buscar_para_login(db: Session, username: str) -> Optional[models.User]:
+    user = crud.get_user_by_username(db, username=username)
+    if user:
+        # Se devuelve la conexión al pool mientras se espera a bcrypt: con muchos logins simultáneos
+        # retenerla agotaría el pool de conexiones
+        db.expunge(user)
+        db.commit() # Sólo hubo lecturas: cierra la transacción y libera la conexión
+    return user
+
+def _guardar_rehash(db: Session, user_id: int, nuevo_hash: str) -> None:
+    db.query(models.User).filter(models.User.id == user_id).update({"hashed_password": nuevo_hash})
+    db.commit()
+
+async def autenticar_usuario(db: Session, username: str, password: str) -> Optional[models.User]:
+    """
+    Versión para el endpoint /token: espera a bcrypt sin ocupar un hilo del servidor y, si el hash
+    se generó con otro costo (BCRYPT_ROUNDS), lo reemplaza por uno nuevo con la misma contraseña.
+    Las consultas corren en el threadpool para no bloquear el event loop.
+    """
+    user = await run_in_threadpool(_buscar_para_login, db, username)
+    if not user:
+        return None # Usuario no encontrado
+
+    valido, nuevo_hash = await asyncio.wrap_future(
+        _enviar_al_pool(_verificar_y_actualizar, password, user.hashed_password)
+    )
+    if not valido:
+        return None # Contraseña incorrecta
+    if nuevo_hash:
+        await run_in_threadpool(_guardar_rehash, db, user.id, nuevo_hash)
+        user.hashed_password = nuevo_hash
+    return user
@@ -0,0 +1,176 @@
+# backend/serializacion.py
+"""
+Serialización rápida del listado de trabajos (GET /trabajos/).
+
+Con response_model, FastAPI valida cada Trabajo -> Historial -> Técnico contra los esquemas y recién
+después lo serializa. Los datos del listado salen de nuestras propias consultas, así que aquí se arma
+el JSON directo desde las filas (mismos campos y mismo orden que schemas.Trabajo) y se codifica con
+orjson. Sin orjson instalado se usa json de la biblioteca estándar.
+
+También incluye la compresión de respuestas JSON grandes (br si está instalado `brotli`, si no gzip),
+negociada con Accept-Encoding.
+"""
+import datetime
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.responses import Response
+
+import schemas
+
+try:
+    import orjson
+except ImportError:  # Opcional: sólo acelera la codificación
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él se comprime con gzip
+    brotli = None
+
+# 0 vuelve al camino con validación de response_model (para comparar o ante una duda con los datos)
+SERIALIZACION_RAPIDA = os.getenv("SERIALIZACION_RAPIDA", "1") == "1"
+# Respuestas JSON más chicas que esto se envían sin comprimir
+COMPRESION_MINIMO_BYTES = int(os.getenv("COMPRESION_MINIMO_BYTES", "1024"))
+COMPRESION_NIVEL_GZIP = 6
+COMPRESION_NIVEL_BROTLI = 4
+
+
+# --- Armado directo desde las filas ---
+
+def _campos(esquema, excluir: Tuple[str, ...] = ()) -> List[Tuple[str, Any]]:
+    """(nombre, valor por defecto) de cada campo del esquema, en su orden."""
+    return [
+        (nombre, None if campo.is_required() else campo.get_default(call_default_factory=True))
+        for nombre, campo in esquema.model_fields.items() if nombre not in excluir
+    ]
+
+
+_CAMPOS_TECNICO = _campos(schemas.Tecnico)
+_CAMPOS_HISTORIAL = _campos(schemas.Historial)
+_CAMPOS_TRABAJO = _campos(schemas.Trabajo)
+
+
+def _a_dict(objeto, campos: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    return {nombre: getattr(objeto, nombre, defecto) for nombre, defecto in campos}
+
+
+def trabajo_a_dict(trabajo) -> Dict[str, Any]:
+    """Equivalente a schemas.Trabajo.model_validate(trabajo).model_dump(), sin validar."""
+    item = {}
+    for nombre, defecto in _CAMPOS_TRABAJO:
+        if nombre == "historial":
+            item[nombre] = [_a_dict(h, _CAMPOS_HISTORIAL) for h in trabajo.historial]
+        elif nombre == "tecnico_asignado":
+            tecnico = trabajo.tecnico_asignado
+            item[nombre] = _a_dict(tecnico, _CAMPOS_TECNICO) if tecnico is not None else None
+        else:
+            item[nombre] = getattr(trabajo, nombre, defecto)
+    return item
+
+
+# --- Codificación ---
+
+def _por_defecto(valor: Any) -> Any:
+    if isinstance(valor, datetime.datetime):
+        texto = valor.isoformat()
+        # Igual que pydantic y orjson (OPT_UTC_Z): UTC como 'Z'
+        return texto[:-6] + "Z" if texto.endswith("+00:00") else texto
+    if isinstance(valor, datetime.date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def dumps(contenido: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(contenido, default=_por_defecto, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RespuestaJSONRapida(Response):
+    """JSONResponse que codifica con `dumps` (orjson); el contenido ya debe estar armado y ser confiable."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# --- Compresión negociada ---
+
+def _codificaciones_aceptadas(accept_encoding: str) -> set:
+    aceptadas = set()
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        if parametros.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceptadas.add(nombre.strip())
+    return aceptadas
+
+
+def elegir_codificacion(accept_encoding: Optional[str]) -> Optional[str]:
+    aceptadas = _codificaciones_aceptadas(accept_encoding or "")
+    if brotli is not None and "br" in aceptadas:
+        return "br"
+    if "gzip" in aceptadas:
+        return "gzip"
+    return None
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=COMPRESION_NIVEL_BROTLI)
+    return gzip.compress(cuerpo, compresslevel=COMPRESION_NIVEL_GZIP)
+
+
+class CompresionMiddleware:
+    """
+    Comprime las respuestas application/json de al menos COMPRESION_MINIMO_BYTES. El resto (SSE,
+    archivos, respuestas chicas) pasa sin tocar ni acumular.
+    """
+
+    def __init__(self, app, minimo_bytes: int = COMPRESION_MINIMO_BYTES):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cabeceras = dict(scope.get("headers", []))
+        codificacion = elegir_codificacion(cabeceras.get(b"accept-encoding", b"").decode("latin-1"))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Optional[dict] = None
+        partes: List[bytes] = []
+
+        async def enviar(mensaje):
+            nonlocal inicio
+            if mensaje["type"] == "http.response.start":
+                respuesta = dict(mensaje.get("headers", []))
+                es_json = respuesta.get(b"content-type", b"").startswith(b"application/json")
+                if es_json and b"content-encoding" not in respuesta:
+                    inicio = mensaje  # Se retiene hasta tener el cuerpo completo
+                    return
+                await send(mensaje)
+                return
+            if mensaje["type"] != "http.response.body" or inicio is None:
+                await send(mensaje)
+                return
+
+            partes.append(mensaje.get("body", b""))
+            if mensaje.get("more_body", False):
+                return
+            cuerpo = b"".join(partes)
+            cabeceras_respuesta = [(k, v) for k, v in inicio.get("headers", []) if k != b"content-length"]
+            if len(cuerpo) >= self.minimo_bytes:
+                cuerpo = comprimir(cuerpo, codificacion)
+                cabeceras_respuesta += [(b"content-encoding", codificacion.encode()), (b"vary", b"Accept-Encoding")]
+            cabeceras_respuesta.append((b"content-length", str(len(cuerpo)).encode()))
+            await send({**inicio, "headers": cabeceras_respuesta})
+            await send({"type": "http.response.body", "body": cuerpo})
+
+        await self.app(scope, receive, enviar)
@@ -1,23 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from typing import List
 
-import crud, models, schemas, auth 
+import carga, crud, models, schemas, auth 
+from cache import cache_tablero, cache_tecnicos
+from condicional import etag_condicional
 from database import get_db 
 
 router = APIRouter(prefix="/tecnicos", tags=["Técnicos"])
 
 # --- Endpoints ---
 
-@router.get("/", response_model=List[schemas.Tecnico])
+@router.get("/", response_model=List[schemas.Tecnico], dependencies=[Depends(etag_condicional(cache_tecnicos))])
 def get_all_tecnicos(
     db: Session = Depends(get_db),
     # 👇 Añadimos autenticación a esta ruta también
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: schemas.User = Depends(auth.get_principal_lectura)
 ):
     """Obtiene todos los técnicos."""
     return crud.get_tecnicos(db)
 
+@router.get("/carga", response_model=List[schemas.CargaTecnico],
+            dependencies=[Depends(etag_condicional(cache_tablero, cache_tecnicos))])
+def get_carga_tecnicos(
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(auth.get_principal_lectura)
+):
+    """
+    Trabajos activos de cada técnico por estado y cuántos tiene detenidos.
+    Sale de los contadores que mantienen las transiciones (ver carga.py), en dos consultas.
+    """
+    return carga.leer_carga(db)
+
 @router.post("/", response_model=schemas.Tecnico, status_code=status.HTTP_201_CREATED)
 def create_new_tecnico(
     tecnico: schemas.TecnicoCreate, 
@@ -42,9 +57,12 @@ def delete_existing_tecnico(
     if db_tecnico is None:
         raise HTTPException(status_code=404, detail="Técnico no encontrado")
     
-    # --- 👇 ESTA LÍNEA AHORA FUNCIONARÁ ---
-    # (Gracias a los cambios en models.py)
-    if db_tecnico.trabajos_asignados: 
+    # EXISTS sobre el índice de tecnico_id (vigentes y archivados), sin cargar trabajos_asignados
+    asignado = db.query(
+        exists().where(models.Trabajo.tecnico_id == tecnico_id)
+        | exists().where(models.TrabajoArchivado.tecnico_id == tecnico_id)
+    ).scalar()
+    if asignado:
          raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="No se puede eliminar un técnico que está asignado a trabajos."
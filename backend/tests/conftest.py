@@ -7,6 +7,10 @@ from sqlalchemy.orm import sessionmaker, Session
 from alembic.config import Config
 from alembic import command
 
+# La app y el worker leen esta configuración al importarse
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ["CELERY_TASK_ALWAYS_EAGER"] = "1" # Las tareas de Celery corren en el mismo proceso, sin Redis
+
 # --- IMPORTANTE: Estas son las importaciones correctas ---
 from main import app 
 from database import Base, get_db
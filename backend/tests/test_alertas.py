@@ -0,0 +1,81 @@
+import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+import alertas, celery_worker, models
+from tests.utils import crear_trabajos, mover
+
+
+def test_alerta_se_emite_una_vez_y_se_resuelve_al_cambiar_de_estado(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    atrasado, reciente = (t.id for t in crear_trabajos(db_session, 2, prefijo="ALR"))
+    mover(db_session, atrasado, "espera de trabajo")
+    mover(db_session, reciente, "espera de trabajo")
+    db_session.query(models.HistorialDeEstado).filter(
+        models.HistorialDeEstado.trabajo_id == atrasado, models.HistorialDeEstado.fecha_fin == None
+    ).update({"fecha_inicio": datetime.datetime.utcnow() - datetime.timedelta(hours=3)})
+    db_session.commit()
+
+    nuevas = alertas.detectar_alertas(db_session)
+    assert [(a.trabajo_id, a.estado) for a in nuevas] == [(atrasado, "espera de trabajo")]
+    assert alertas.detectar_alertas(db_session) == [] # La misma infracción no se vuelve a emitir
+
+    abiertas = client.get("/alertas/", headers=admin_token_headers).json()
+    assert [a["trabajo_id"] for a in abiertas] == [atrasado]
+
+    mover(db_session, atrasado, "en lavado")
+    assert client.get("/alertas/", headers=admin_token_headers).json() == []
+    alerta = db_session.query(models.AlertaPermanencia).filter_by(trabajo_id=atrasado).one()
+    assert alerta.fecha_resuelta is not None
+
+
+def test_transicion_programa_el_plazo_y_se_ignora_al_salir_del_estado(db_session: Session, monkeypatch):
+    programadas = []
+    monkeypatch.setattr(celery_worker.vencer_plazo_permanencia, "apply_async",
+                        lambda args, eta, **kwargs: programadas.append((args[0], eta)))
+    trabajo_id = crear_trabajos(db_session, 1, prefijo="PLZ")[0].id
+    tecnico = models.Tecnico(nombre="Plazo")
+    db_session.add(tecnico)
+    db_session.commit()
+
+    mover(db_session, trabajo_id, "espera de trabajo")
+    mover(db_session, trabajo_id, "en trabajo", tecnico_id=tecnico.id)
+    eta = datetime.datetime.utcnow() + datetime.timedelta(hours=5)
+    mover(db_session, trabajo_id, "trabajo detenido", motivo_detencion="repuestos", fecha_eta=eta)
+
+    historiales = {h.estado: h for h in db_session.query(models.HistorialDeEstado).filter_by(trabajo_id=trabajo_id)}
+    espera, detenido = historiales["espera de trabajo"], historiales["trabajo detenido"]
+    assert [h for h, _ in programadas] == [espera.id, detenido.id] # 'en trabajo' no se monitorea
+    assert programadas[0][1].replace(tzinfo=None) == espera.fecha_inicio + datetime.timedelta(hours=2)
+    assert programadas[1][1].replace(tzinfo=None) == eta
+
+    # Al vencer: el estado 'espera de trabajo' ya se cerró, la detención sigue abierta
+    despues = eta + datetime.timedelta(seconds=1)
+    assert alertas.detectar_alertas(db_session, despues, historial_id=espera.id) == []
+    [alerta] = alertas.detectar_alertas(db_session, despues, historial_id=detenido.id)
+    assert (alerta.estado, alerta.limite_horas) == ("trabajo detenido", 5.0)
+
+
+def test_transiciones_en_lote_programan_los_plazos_con_un_envio(client: TestClient, admin_token_headers: dict[str, str], db_session: Session, monkeypatch):
+    envios, programadas = [], []
+    repartir = celery_worker.repartir_plazos_permanencia
+    monkeypatch.setattr(repartir, "apply_async", lambda args, **kwargs: envios.append(args[0]))
+    monkeypatch.setattr(celery_worker.vencer_plazo_permanencia, "apply_async",
+                        lambda args, eta, **kwargs: programadas.append((args[0], eta)))
+    ids = [t.id for t in crear_trabajos(db_session, 3, prefijo="PLZL")]
+
+    lote = [{"trabajo_id": trabajo_id, "nuevo_estado": "espera de trabajo"} for trabajo_id in ids]
+    respuesta = client.post("/trabajos/transiciones/", json={"transiciones": lote}, headers=admin_token_headers)
+    assert respuesta.status_code == 200, respuesta.text
+
+    # Un solo envío al broker por petición; el worker reparte un plazo por historial
+    [plazos] = envios
+    assert programadas == []
+    repartir(plazos)
+    historiales = dict(
+        db_session.query(models.HistorialDeEstado.id, models.HistorialDeEstado.fecha_inicio)
+        .filter(models.HistorialDeEstado.trabajo_id.in_(ids), models.HistorialDeEstado.estado == "espera de trabajo")
+    )
+    assert sorted(h for h, _ in programadas) == sorted(historiales)
+    for historial_id, eta in programadas:
+        assert eta.replace(tzinfo=None) == historiales[historial_id] + datetime.timedelta(hours=2)
@@ -0,0 +1,61 @@
+import datetime
+
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import analitica, models
+
+
+def _estado_cerrado(db_session: Session, trabajo: models.Trabajo, estado: str, fin: datetime.datetime, horas: float) -> None:
+    db_session.add(models.HistorialDeEstado(
+        trabajo_id=trabajo.id, estado=estado, fecha_inicio=fin - datetime.timedelta(hours=horas), fecha_fin=fin
+    ))
+    db_session.commit()
+
+
+def test_resumen_de_permanencia_es_incremental(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    tecnico = models.Tecnico(nombre="Tecnico Permanencia")
+    db_session.add(tecnico)
+    db_session.commit()
+    trabajo = models.Trabajo(pedido_dbm="PERM1", asesor_servicio="Asesor P", tipo_pedido="Mantención", tecnico_id=tecnico.id)
+    db_session.add(trabajo)
+    db_session.commit()
+
+    tecnico_id = tecnico.id # El cliente cierra la sesión: después de una petición las instancias quedan separadas
+
+    ahora = datetime.datetime.utcnow()
+
+    def minutos(n: float) -> datetime.datetime:
+        return ahora + datetime.timedelta(minutes=n)
+
+    _estado_cerrado(db_session, trabajo, "en trabajo", ahora - datetime.timedelta(hours=5), horas=1)
+    _estado_cerrado(db_session, trabajo, "en trabajo", ahora - datetime.timedelta(hours=4), horas=3)
+    assert analitica.actualizar_resumen(db_session, ahora) == 2
+    # Sin cierres nuevos no se vuelve a sumar la misma ventana; la marca queda en ahora + 5 min - margen
+    assert analitica.actualizar_resumen(db_session, minutos(5)) == 0
+
+    # El cierre de hace 1 minuto queda dentro del margen: recién lo suma la ejecución siguiente
+    margen = analitica.ANALITICA_MARGEN_SEGUNDOS / 60
+    _estado_cerrado(db_session, trabajo, "en trabajo", minutos(6), horas=2)
+    _estado_cerrado(db_session, trabajo, "en trabajo", minutos(9), horas=2)
+    assert analitica.actualizar_resumen(db_session, minutos(10)) == 1
+    assert analitica.actualizar_resumen(db_session, minutos(9 + margen + 1)) == 1
+    assert analitica.actualizar_resumen(db_session, minutos(30)) == 0
+
+    respuesta = client.get("/dashboard/permanencia", params={"dimension": "tecnico"}, headers=admin_token_headers)
+    assert respuesta.status_code == 200, respuesta.text
+    grupo = next(g for g in respuesta.json()["grupos"] if g["valor"] == str(tecnico_id))
+    assert grupo["nombre"] == "Tecnico Permanencia"
+    assert grupo["cantidad"] == 4
+    assert abs(grupo["promedio_segundos"] - 2 * 3600) < 1
+    assert 3600 <= grupo["p50_segundos"] <= 4 * 3600
+
+    por_asesor = client.get("/dashboard/permanencia", params={"dimension": "asesor_servicio"}, headers=admin_token_headers).json()
+    assert [g["cantidad"] for g in por_asesor["grupos"] if g["valor"] == "Asesor P"] == [4]
+
+
+def test_percentil_interpola_dentro_de_la_cubeta():
+    conteos = [0] * len(analitica.CUBETAS_SEGUNDOS)
+    conteos[4] = 10  # cubeta [1 h, 2 h)
+    assert analitica._percentil(conteos, 10, 0.5) == 1.5 * 3600
+    assert analitica._percentil(conteos, 10, 1.0) == 2 * 3600
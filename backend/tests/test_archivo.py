@@ -0,0 +1,69 @@
+import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+import archivo, models
+from tests.utils import excel_dbm, subir_excel
+
+
+def _entregado(db_session: Session, pedido: str, patente: str, hace_dias: int) -> int:
+    entrega = datetime.datetime.utcnow() - datetime.timedelta(days=hace_dias)
+    trabajo = models.Trabajo(
+        pedido_dbm=pedido, patente=patente, estado_actual="entregado al cliente",
+        fecha_creacion_pedido=entrega - datetime.timedelta(days=3),
+    )
+    db_session.add(trabajo)
+    db_session.flush()
+    db_session.add_all([
+        models.HistorialDeEstado(trabajo_id=trabajo.id, estado="agendado",
+                                 fecha_inicio=entrega - datetime.timedelta(days=3), fecha_fin=entrega),
+        models.HistorialDeEstado(trabajo_id=trabajo.id, estado="entregado al cliente", fecha_inicio=entrega),
+    ])
+    db_session.commit()
+    return trabajo.id
+
+
+def test_archivo_mueve_entregados_antiguos_y_se_sigue_consultando(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    antiguo = _entregado(db_session, "ARC1", "AR-CH-01", hace_dias=60)
+    reciente = _entregado(db_session, "ARC2", "AR-CH-02", hace_dias=2)
+
+    assert archivo.archivar_entregados(db_session, dias=30) == 1
+    assert db_session.get(models.Trabajo, antiguo) is None
+    assert db_session.query(models.HistorialDeEstado).filter_by(trabajo_id=antiguo).count() == 0
+    assert db_session.get(models.TrabajoArchivado, antiguo).pedido_dbm == "ARC1"
+    assert db_session.get(models.Trabajo, reciente) is not None
+
+    # El historial de entregados mezcla ambas tablas, con un total y un orden únicos
+    params = {"activos": False, "search": "ARC", "sort_by": "fecha_creacion_pedido", "sort_order": "desc", "limit": 1}
+    primera = client.get("/trabajos/", params=params, headers=admin_token_headers).json()
+    assert primera["total"] == 2
+    segunda = client.get("/trabajos/", params={**params, "cursor": primera["next_cursor"]}, headers=admin_token_headers).json()
+    assert [t["id"] for t in primera["items"] + segunda["items"]] == [reciente, antiguo]
+    assert segunda["next_cursor"] is None
+    # Sin cursor (salto de página u orden derivado) la mezcla también se pagina en SQL
+    esperado = {"fecha_creacion_pedido": [reciente, antiguo], "dias_de_estadia_activa": [antiguo, reciente]}
+    for orden, ids in esperado.items():
+        paginas = [
+            client.get("/trabajos/", params={**params, "sort_by": orden, "page": page}, headers=admin_token_headers).json()
+            for page in (1, 2, 3)
+        ]
+        assert [t["id"] for pagina in paginas for t in pagina["items"]] == ids
+
+    por_patente = client.get("/trabajos/", params={"patente": "arch01"}, headers=admin_token_headers).json()
+    assert [t["id"] for t in por_patente["items"]] == [antiguo]
+
+    historial = client.get(f"/trabajos/{antiguo}/historial", headers=admin_token_headers).json()
+    assert [h["estado"] for h in historial] == ["agendado", "entregado al cliente"]
+
+
+def test_carga_de_excel_no_reabre_un_pedido_archivado(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    antiguo = _entregado(db_session, "7001", "AR-CH-03", hace_dias=90)
+    archivo.archivar_entregados(db_session, dias=30)
+
+    respuesta = subir_excel(client, admin_token_headers, excel_dbm([{"Pedido DBM": 7001, "Nombre del cliente": "Otra vez"}]))
+
+    assert respuesta.status_code == 201, respuesta.text
+    assert respuesta.json()["creados"] == 0
+    assert db_session.query(models.Trabajo).filter_by(pedido_dbm="7001").count() == 0
+    assert db_session.get(models.TrabajoArchivado, antiguo).estado_actual == "entregado al cliente"
@@ -0,0 +1,69 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import auth, models, security
+from cache import cache_usuarios
+
+
+def test_principal_cacheado_hasta_cambio_de_rol(client: TestClient, admin_token_headers: dict[str, str], db_session: Session, db_engine, test_user_admin: models.User):
+    consultas_usuarios = []
+    def contar(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            consultas_usuarios.append(statement)
+
+    assert client.get("/users/me/", headers=admin_token_headers).json()["role"] == "admin"
+    event.listen(db_engine, "before_cursor_execute", contar)
+    try:
+        assert client.get("/users/me/", headers=admin_token_headers).json()["role"] == "admin"
+        assert consultas_usuarios == []
+
+        # Un cambio de rol invalida la caché (como en create_admin.py)
+        db_session.query(models.User).filter_by(id=test_user_admin.id).update({"role": "user"})
+        db_session.commit()
+        cache_usuarios.incrementar_version()
+        assert client.get("/users/me/", headers=admin_token_headers).json()["role"] == "user"
+        assert len(consultas_usuarios) == 1
+    finally:
+        event.remove(db_engine, "before_cursor_execute", contar)
+
+
+def test_lectura_con_claims_firmados_no_consulta_usuarios(client: TestClient, admin_token_headers: dict[str, str], db_engine, monkeypatch):
+    monkeypatch.setattr(auth, "CONFIAR_CLAIMS_LECTURA", True)
+    monkeypatch.setattr(auth, "USAR_CACHE_PRINCIPAL", False)
+    consultas_usuarios = []
+    def contar(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            consultas_usuarios.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", contar)
+    try:
+        assert client.get("/trabajos/", headers=admin_token_headers).status_code == 200
+        assert consultas_usuarios == []
+        # Los endpoints de escritura siguen validando contra la BD
+        client.patch("/trabajos/999999", json={}, headers=admin_token_headers)
+        assert len(consultas_usuarios) == 1
+    finally:
+        event.remove(db_engine, "before_cursor_execute", contar)
+
+
+def test_login_rehashea_si_cambia_el_costo(client: TestClient, db_session: Session, test_user_admin: models.User):
+    from passlib.context import CryptContext
+
+    costo_anterior = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    test_user_admin.hashed_password = costo_anterior.hash("testpassword")
+    db_session.commit()
+
+    respuesta = client.post("/token", data={"username": "testadmin", "password": "testpassword"})
+    assert respuesta.status_code == 200
+
+    hashed = db_session.query(models.User.hashed_password).filter_by(username="testadmin").scalar()
+    assert f"$2b${security.BCRYPT_ROUNDS:02d}$" in hashed
+    assert security.verify_password("testpassword", hashed)
+
+
+def test_login_saturado_responde_503(client: TestClient, test_user_admin: models.User, monkeypatch):
+    monkeypatch.setattr(security, "HASH_MAX_PENDIENTES", 0)
+    respuesta = client.post("/token", data={"username": "testadmin", "password": "testpassword"})
+    assert respuesta.status_code == 503
+    assert respuesta.headers["Retry-After"] == str(security.HASH_RETRY_AFTER_SEGUNDOS)
@@ -0,0 +1,66 @@
+import types
+
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import condicional, models
+from cache import CacheVersionada
+from tests.utils import crear_trabajos, mover
+
+
+def test_listado_responde_304_hasta_que_cambia_el_tablero(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    trabajo_id = crear_trabajos(db_session, 2, prefijo="ETG")[0].id
+    params = {"search": "ETG", "limit": 5}
+
+    primera = client.get("/trabajos/", params=params, headers=admin_token_headers)
+    etag = primera.headers["etag"]
+    assert primera.status_code == 200 and etag.startswith('W/"')
+
+    repetida = client.get("/trabajos/", params=params, headers={**admin_token_headers, "If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["etag"] == etag
+
+    # Otros parámetros, otro validador
+    otra = client.get("/trabajos/", params={**params, "limit": 1}, headers={**admin_token_headers, "If-None-Match": etag})
+    assert otra.status_code == 200
+
+    mover(db_session, trabajo_id, "espera de trabajo")
+    cambiada = client.get("/trabajos/", params=params, headers={**admin_token_headers, "If-None-Match": etag})
+    assert cambiada.status_code == 200
+    assert cambiada.headers["etag"] != etag
+
+
+def test_tecnicos_y_proyeccion_llevan_etag_y_se_autentica_antes(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    etag = client.get("/tecnicos/", headers=admin_token_headers).headers["etag"]
+    assert client.get("/tecnicos/", headers={**admin_token_headers, "If-None-Match": etag}).status_code == 304
+    assert client.get("/tecnicos/", headers={"If-None-Match": etag}).status_code == 401
+
+    tecnico = models.Tecnico(nombre="Tecnico ETag")
+    db_session.add(tecnico)
+    db_session.commit()
+    assert client.delete(f"/tecnicos/{tecnico.id}", headers=admin_token_headers).status_code == 204
+    assert client.get("/tecnicos/", headers={**admin_token_headers, "If-None-Match": etag}).status_code == 200
+
+    # La versión reducida se devuelve como JSONResponse y también lleva el validador
+    proyectada = client.get("/trabajos/", params={"fields": "patente"}, headers=admin_token_headers)
+    assert proyectada.status_code == 200 and "etag" in proyectada.headers
+
+
+def test_listado_cambia_de_etag_con_el_tiempo_aunque_la_cache_sea_compartida(client: TestClient, admin_token_headers: dict[str, str], db_session: Session, monkeypatch):
+    # Como con Redis: la versión no caduca sola; sólo el período de vigencia mueve el validador
+    monkeypatch.setattr(CacheVersionada, "compartida", property(lambda self: True))
+    ahora = [1_000_000.0 * condicional.ETAG_VIGENCIA_SEGUNDOS]
+    monkeypatch.setattr(condicional, "time", types.SimpleNamespace(time=lambda: ahora[0]))
+    crear_trabajos(db_session, 1, prefijo="ETV")
+
+    def etags():
+        return [client.get(ruta, headers=admin_token_headers).headers["etag"] for ruta in ("/trabajos/", "/tecnicos/")]
+
+    listado, tecnicos = etags()
+    ahora[0] += condicional.ETAG_VIGENCIA_SEGUNDOS - 1
+    assert etags() == [listado, tecnicos]
+    # Sin escrituras: los días de estadía y el tiempo detenido del listado siguen avanzando
+    ahora[0] += 1
+    nuevo_listado, mismos_tecnicos = etags()
+    assert nuevo_listado != listado and mismos_tecnicos == tecnicos
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import models
+from cache import cache_tablero
+from tests.utils import crear_trabajos, mover
+
+
+class RedisFalso:
+    """Lo mínimo de redis.Redis que usa CacheVersionada."""
+
+    def __init__(self):
+        self.datos = {}
+
+    def get(self, clave):
+        return self.datos.get(clave)
+
+    def set(self, clave, valor, ex=None):
+        self.datos[clave] = valor.encode() if isinstance(valor, str) else valor
+
+    def incr(self, clave):
+        self.datos[clave] = int(self.datos.get(clave, 0)) + 1
+        return self.datos[clave]
+
+
+@pytest.fixture(params=["memoria", "redis"])
+def backend_cache(request):
+    cache_tablero.usar_redis(RedisFalso() if request.param == "redis" else None)
+    yield request.param
+    cache_tablero.usar_redis(None)
+
+
+def test_stats_se_cachean_hasta_un_cambio_del_tablero(client: TestClient, admin_token_headers: dict[str, str], db_session: Session, backend_cache):
+    trabajo_id = crear_trabajos(db_session, 2, prefijo="STA")[0].id
+    cache_tablero.incrementar_version()
+
+    def stats():
+        return client.get("/dashboard/stats", headers=admin_token_headers).json()["counts_por_estado"]
+
+    assert stats().get("agendado") == 2
+
+    # Un cambio directo en la BD (sin transición) no se ve: se sirve la caché
+    db_session.add(models.Trabajo(pedido_dbm="STA-X", estado_actual="agendado"))
+    db_session.commit()
+    assert stats().get("agendado") == 2
+
+    # La transición incrementa la versión y fuerza el recálculo
+    mover(db_session, trabajo_id, "espera de trabajo")
+    assert stats() == {"agendado": 2, "espera de trabajo": 1}
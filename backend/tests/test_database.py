@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.testclient import TestClient
+
+from database import PoolMedido, metricas_pool
+
+
+def test_pool_medido_reporta_uso_y_agotamiento(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=PoolMedido, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    with engine.connect() as conexion:
+        conexion.execute(text("select 1"))
+        assert metricas_pool(engine)["en_uso"] == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    metricas = metricas_pool(engine)
+    assert (metricas["en_uso"], metricas["esperas"], metricas["agotamientos"]) == (0, 2, 1)
+    assert metricas["espera_maxima_ms"] >= 50
+    engine.dispose()
+
+
+def test_metricas_pool_requiere_admin(client: TestClient, admin_token_headers: dict[str, str]):
+    assert client.get("/metricas/pool").status_code == 401
+    respuesta = client.get("/metricas/pool", headers=admin_token_headers)
+    assert respuesta.status_code == 200
+    assert "clase" in respuesta.json()
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from tests.utils import crear_trabajos
+
+
+def test_websocket_recibe_delta_de_la_transicion(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    trabajo_id = crear_trabajos(db_session, 1, prefijo="EVT")[0].id
+    token = admin_token_headers["Authorization"].split()[1]
+
+    with client.websocket_connect(f"/eventos/ws?token={token}") as ws:
+        respuesta = client.patch(f"/trabajos/{trabajo_id}/estado", json={"nuevo_estado": "espera de trabajo"}, headers=admin_token_headers)
+        assert respuesta.status_code == 200
+        evento = ws.receive_json()
+
+    assert evento["tipo"] == "estado"
+    assert (evento["trabajo_id"], evento["estado_actual"]) == (trabajo_id, "espera de trabajo")
+
+
+def test_websocket_rechaza_token_invalido(client: TestClient):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/eventos/ws?token=invalido") as ws:
+            ws.receive_json()
@@ -0,0 +1,40 @@
+import csv
+import io
+
+from openpyxl import load_workbook
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import exportacion
+from tests.utils import crear_trabajos, mover
+
+
+def test_exportacion_csv_respeta_los_filtros_del_listado(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    trabajos = crear_trabajos(db_session, 3, prefijo="EXP")
+    mover(db_session, trabajos[0].id, "espera de trabajo")
+    params = {"search": "EXP", "sort_by": "fecha_creacion_pedido", "sort_order": "asc"}
+
+    respuesta = client.get("/trabajos/exportar", params=params, headers=admin_token_headers)
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.headers["content-type"].startswith("text/csv")
+    assert 'filename="trabajos_' in respuesta.headers["content-disposition"]
+    filas = list(csv.reader(io.StringIO(respuesta.content.decode("utf-8-sig"))))
+    assert filas[0] == exportacion.ENCABEZADOS
+    assert [fila[1] for fila in filas[1:]] == ["EXP0", "EXP1", "EXP2"]
+    assert filas[1][exportacion.ENCABEZADOS.index("Estado")] == "espera de trabajo"
+
+    solo_espera = client.get("/trabajos/exportar", params={**params, "estado_actual": "espera de trabajo"}, headers=admin_token_headers)
+    assert len(solo_espera.content.decode("utf-8-sig").strip().splitlines()) == 2
+
+
+def test_exportacion_xlsx(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    crear_trabajos(db_session, 2, prefijo="XLS")
+
+    respuesta = client.get("/trabajos/exportar", params={"search": "XLS", "formato": "xlsx"}, headers=admin_token_headers)
+
+    assert respuesta.status_code == 200, respuesta.text
+    hoja = load_workbook(io.BytesIO(respuesta.content), read_only=True).active
+    filas = list(hoja.values)
+    assert list(filas[0]) == exportacion.ENCABEZADOS
+    assert sorted(fila[1] for fila in filas[1:]) == ["XLS0", "XLS1"]
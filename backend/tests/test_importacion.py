@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import models
+from tests.utils import excel_dbm, subir_excel
+
+
+def test_carga_masiva_crea_actualiza_y_registra_historial(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    db_session.add(models.Trabajo(pedido_dbm="5001", cliente_nombre="Cliente Original", marca="Volkswagen"))
+    db_session.commit()
+
+    contenido = excel_dbm([
+        {"Pedido DBM": 5001, "Nombre del cliente": "Cliente Actualizado", "Matr.vehículo": "ab-12-cd"},
+        {"Pedido DBM": 5002, "Nombre del cliente": "Cliente Nuevo", "Valor neto": 15000, "Fecha documento": "2024-03-01"},
+        {"Pedido DBM": 5003, "Nombre del cliente": "Otro Nuevo"},
+        {"Pedido DBM": 5003, "Sector": "Audi"},
+        {"Pedido DBM": None, "Nombre del cliente": "Fila sin pedido, se descarta"},
+    ])
+    respuesta = subir_excel(client, admin_token_headers, contenido)
+
+    assert respuesta.status_code == 201, respuesta.text
+    assert respuesta.json()["creados"] == 2
+    assert respuesta.json()["actualizados"] == 2
+
+    existente = db_session.query(models.Trabajo).filter_by(pedido_dbm="5001").one()
+    assert existente.cliente_nombre == "Cliente Actualizado"
+    assert existente.marca == "Volkswagen" # Las celdas vacías no pisan datos
+    assert existente.patente_normalizada == "AB12CD"
+
+    duplicado = db_session.query(models.Trabajo).filter_by(pedido_dbm="5003").one()
+    assert (duplicado.cliente_nombre, duplicado.marca) == ("Otro Nuevo", "Audi")
+
+    nuevo = db_session.query(models.Trabajo).filter_by(pedido_dbm="5002").one()
+    assert nuevo.estado_actual == "agendado"
+    assert nuevo.total_pedido == 15000
+    assert [h.estado for h in nuevo.historial] == ["agendado"]
+
+
+def test_importacion_asincrona_reporta_progreso(client: TestClient, admin_token_headers: dict[str, str], db_session: Session, monkeypatch, tmp_path):
+    import celery_worker, trabajos
+
+    # El worker (en modo eager) usa la misma sesión de prueba y un directorio temporal
+    monkeypatch.setattr(celery_worker, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(trabajos, "IMPORTACIONES_DIR", str(tmp_path))
+
+    contenido = excel_dbm([{"Pedido DBM": 6000 + i, "Nombre del cliente": f"Cliente {i}"} for i in range(5)])
+    archivos = {"file": ("export.xlsx", contenido, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    respuesta = client.post("/trabajos/importaciones/", files=archivos, headers=admin_token_headers)
+    assert respuesta.status_code == 202, respuesta.text
+    importacion_id = respuesta.json()["id"]
+
+    estado = client.get(f"/trabajos/importaciones/{importacion_id}", headers=admin_token_headers).json()
+    assert estado["estado"] == "completado"
+    assert (estado["filas_leidas"], estado["creados"], estado["actualizados"], estado["fallidos"]) == (5, 5, 0, 0)
+    assert list(tmp_path.iterdir()) == [] # El archivo temporal se elimina al terminar
+
+
+def test_lectura_en_streaming_equivale_a_la_de_pandas(tmp_path):
+    import importacion
+    from fastapi import HTTPException
+
+    ruta = tmp_path / "export.xlsx"
+    ruta.write_bytes(excel_dbm([
+        {"Pedido DBM": 7001, "Nombre del cliente": "Ana", "Fecha documento": "2024-05-02", "Valor neto": "1500"},
+        {"Pedido DBM": "no numérico", "Nombre del cliente": "Se descarta"},
+        {"Pedido DBM": 7002, "Matr.vehículo": "zz-99 xx", "Valor neto": "abc"},
+    ]))
+
+    en_streaming = list(importacion.iterar_filas_excel(str(ruta)))
+    con_pandas = importacion.preparar_filas(importacion.leer_excel(str(ruta)))
+    assert [datos for _, datos in en_streaming] == [datos for _, datos in con_pandas]
+    # En streaming se informa la fila real del Excel (título + encabezado incluidos)
+    assert [numero for numero, _ in en_streaming] == [3, 5]
+
+    sin_encabezado = tmp_path / "otro.xlsx"
+    pd.DataFrame({"Columna": [1, 2]}).to_excel(sin_encabezado, index=False)
+    with pytest.raises(HTTPException) as exc:
+        list(importacion.iterar_filas_excel(str(sin_encabezado)))
+    assert exc.value.status_code == 422
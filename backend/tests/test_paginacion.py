@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+import models, paginacion
+
+
+def test_cursor_ida_y_vuelta_con_fecha():
+    fecha = datetime.datetime(2024, 5, 1, 10, 30)
+    cursor = paginacion.codificar_cursor("fecha_creacion_pedido", "desc", fecha, 42)
+    assert paginacion.decodificar_cursor(cursor, "fecha_creacion_pedido", "desc") == (fecha, 42)
+
+
+def test_cursor_de_otro_orden_es_rechazado():
+    cursor = paginacion.codificar_cursor("id", "desc", 10, 10)
+    with pytest.raises(HTTPException) as exc:
+        paginacion.decodificar_cursor(cursor, "id", "asc")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        paginacion.decodificar_cursor("no-es-un-cursor", "id", "desc")
+
+
+@pytest.mark.parametrize("descendente", [True, False])
+def test_keyset_recorre_todas_las_filas_sin_repetir(db_session: Session, descendente: bool):
+    """Con fechas repetidas y nulas, recorrer por cursor debe entregar cada trabajo una sola vez."""
+    base = datetime.datetime(2024, 1, 1)
+    fechas = [base, base, None, base + datetime.timedelta(days=1), None, base - datetime.timedelta(days=3)]
+    trabajos = [models.Trabajo(pedido_dbm=f"KS{i}", fecha_creacion_pedido=fecha) for i, fecha in enumerate(fechas)]
+    db_session.add_all(trabajos)
+    db_session.flush()
+    # El default func.now() reemplaza los None al insertar; los dejamos nulos explícitamente
+    for trabajo, fecha in zip(trabajos, fechas):
+        if fecha is None:
+            db_session.query(models.Trabajo).filter(models.Trabajo.id == trabajo.id).update({"fecha_creacion_pedido": None})
+    db_session.expire_all()
+
+    columna, columna_id = models.Trabajo.fecha_creacion_pedido, models.Trabajo.id
+    orden = paginacion.orden_keyset(columna, columna_id, descendente)
+    vistos, valor, ultimo_id = [], None, None
+    for _ in range(len(fechas) + 1):
+        query = db_session.query(models.Trabajo).filter(models.Trabajo.pedido_dbm.like("KS%"))
+        if ultimo_id is not None:
+            query = query.filter(paginacion.filtro_keyset(columna, columna_id, descendente, valor, ultimo_id))
+        pagina = query.order_by(*orden).limit(2).all()
+        if not pagina:
+            break
+        vistos.extend(t.id for t in pagina)
+        valor, ultimo_id = pagina[-1].fecha_creacion_pedido, pagina[-1].id
+
+    esperado = [t.id for t in db_session.query(models.Trabajo).filter(models.Trabajo.pedido_dbm.like("KS%")).order_by(*orden)]
+    assert vistos == esperado
+    assert len(set(vistos)) == len(fechas)
@@ -0,0 +1,145 @@
+"""
+Regresión de planes de ejecución: puebla un taller sintético grande, ejecuta cada consulta caliente
+(listado, stats, transición, revisión de alertas, historial) capturando el SQL real que emite la app,
+y corre EXPLAIN sobre cada sentencia.
+
+- SQLite (siempre): falla si alguna tabla caliente se recorre entera ("SCAN tabla" sin índice)
+  o si el ORDER BY necesita ordenar en memoria.
+- Postgres (con PLANES_POSTGRES_URL apuntando a una base desechable): falla ante un Seq Scan sobre
+  una tabla caliente o si el costo estimado supera PRESUPUESTO_COSTO.
+"""
+import datetime
+import json
+import os
+import re
+from typing import Callable, List, Tuple
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import alertas, dashboard, database, models, schemas, trabajos
+from benchmarks.datos_sinteticos import poblar_taller
+
+PLANES_TRABAJOS = int(os.getenv("PLANES_TRABAJOS", "10000"))
+TABLAS_CALIENTES = {"trabajos", "historial_de_estados", "alertas_permanencia"}
+# Costo total estimado máximo por sentencia en Postgres (unidades del planificador, con PLANES_TRABAJOS=10000)
+PRESUPUESTO_COSTO = {
+    "listado": 2_000, "listado_por_fecha": 2_000, "listado_por_estado": 500, "stats": 1_500, "transicion": 100,
+    "alertas": 1_500, "historial": 100,
+}
+
+
+@pytest.fixture(scope="module", params=["sqlite", "postgres"])
+def taller(request, tmp_path_factory):
+    if request.param == "postgres":
+        url = os.getenv("PLANES_POSTGRES_URL")
+        if not url:
+            pytest.skip("PLANES_POSTGRES_URL no está definida")
+    else:
+        url = f"sqlite:///{tmp_path_factory.mktemp('planes') / 'planes.db'}"
+
+    engine = database.crear_engine(url)
+    database.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    poblar_taller(db, PLANES_TRABAJOS)
+    yield engine, db
+    db.close()
+    engine.dispose()
+
+
+def _listado(db, **kwargs):
+    parametros = dict(
+        page=1, limit=15, sort_by="id", sort_order="desc", search=None, asesor_servicio=None, estado_actual=None,
+        fecha_desde=None, fecha_hasta=None, activos=True, patente=None, dias_estadia_min=None,
+        dias_estadia_max=None, horas_detenido_min=None, cursor=None, total_mode="exact", fields=None,
+        include=None, current_user=None,
+    )
+    parametros.update(kwargs)
+    return trabajos.leer_trabajos_paginados(db=db, **parametros)
+
+
+def _transicion(db):
+    trabajo_id = db.query(models.Trabajo.id).filter(models.Trabajo.estado_actual == "agendado").first()[0]
+    estado = schemas.TrabajoUpdateEstado(nuevo_estado="espera de trabajo")
+    return trabajos.actualizar_estado_trabajo(trabajo_id, estado, db=db, current_user=None)
+
+
+def _historial(db):
+    trabajo_id = db.query(models.Trabajo.id).filter(models.Trabajo.estado_actual == "listo para entrega").first()[0]
+    return trabajos.leer_historial_trabajo(trabajo_id, db=db, current_user=None)
+
+
+CONSULTAS_CALIENTES = {
+    "listado": lambda db: _listado(db),
+    "listado_por_fecha": lambda db: _listado(db, sort_by="fecha_creacion_pedido", total_mode="none"),
+    "listado_por_estado": lambda db: _listado(db, estado_actual="en trabajo", sort_by="fecha_creacion_pedido"),
+    "stats": dashboard._calcular_stats,
+    "transicion": _transicion,
+    "alertas": lambda db: alertas.detectar_alertas(db, datetime.datetime.utcnow()),
+    "historial": _historial,
+}
+
+
+def _capturar(engine, funcion: Callable) -> List[Tuple[str, object]]:
+    sentencias = []
+
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if not executemany and re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)\b", sentencia, re.IGNORECASE):
+            sentencias.append((sentencia, parametros))
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        funcion()
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+    return sentencias
+
+
+def _problemas_sqlite(conn, sentencia, parametros) -> List[str]:
+    problemas = []
+    for *_, detalle in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sentencia}", parametros):
+        escaneo = re.fullmatch(r"SCAN (\w+)(?: AS \w+)?", detalle)
+        if escaneo and escaneo.group(1) in TABLAS_CALIENTES:
+            problemas.append(f"recorre la tabla completa: {detalle}")
+        if "USE TEMP B-TREE FOR ORDER BY" in detalle:
+            problemas.append(f"ordena en memoria: {detalle}")
+    return problemas
+
+
+def _nodos(plan: dict):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+def _problemas_postgres(conn, sentencia, parametros, presupuesto: float) -> List[str]:
+    resultado = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sentencia}", parametros).scalar()
+    plan = (json.loads(resultado) if isinstance(resultado, str) else resultado)[0]["Plan"]
+    problemas = [
+        f"Seq Scan sobre {nodo['Relation Name']}"
+        for nodo in _nodos(plan)
+        if nodo["Node Type"] == "Seq Scan" and nodo.get("Relation Name") in TABLAS_CALIENTES
+    ]
+    if plan["Total Cost"] > presupuesto:
+        problemas.append(f"costo estimado {plan['Total Cost']} > {presupuesto}")
+    return problemas
+
+
+@pytest.mark.parametrize("nombre", list(CONSULTAS_CALIENTES))
+def test_consulta_caliente_usa_indices(taller, nombre, monkeypatch):
+    engine, db = taller
+    monkeypatch.setattr(trabajos, "programar_plazo_permanencia", lambda historial: None)
+
+    sentencias = _capturar(engine, lambda: CONSULTAS_CALIENTES[nombre](db))
+    assert sentencias, "no se capturó ninguna consulta"
+
+    problemas = []
+    with engine.connect() as conn:
+        for sentencia, parametros in sentencias:
+            if engine.dialect.name == "postgresql":
+                encontrados = _problemas_postgres(conn, sentencia, parametros, PRESUPUESTO_COSTO[nombre])
+            else:
+                encontrados = _problemas_sqlite(conn, sentencia, parametros)
+            problemas.extend(f"{e}\n    en: {' '.join(sentencia.split())[:160]}" for e in encontrados)
+    assert not problemas, "\n".join(problemas)
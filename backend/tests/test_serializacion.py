@@ -0,0 +1,48 @@
+import gzip
+
+import pytest
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import serializacion
+from tests.utils import crear_trabajos, mover
+
+
+def test_serializacion_rapida_coincide_con_response_model(client: TestClient, admin_token_headers: dict[str, str], db_session: Session, monkeypatch: pytest.MonkeyPatch):
+    for trabajo in crear_trabajos(db_session, 4, prefijo="SER"):
+        mover(db_session, trabajo.id, "espera de trabajo")
+    params = {"search": "SER", "limit": 10}
+
+    rapida = client.get("/trabajos/", params=params, headers=admin_token_headers)
+    monkeypatch.setattr(serializacion, "SERIALIZACION_RAPIDA", False)
+    validada = client.get("/trabajos/", params=params, headers=admin_token_headers)
+
+    assert rapida.status_code == validada.status_code == 200
+    assert rapida.json() == validada.json()
+    assert [len(t["historial"]) for t in rapida.json()["items"]] == [1, 1, 1, 1]
+
+
+def test_respuestas_json_grandes_se_comprimen_segun_accept_encoding(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    crear_trabajos(db_session, 30, prefijo="GZ")
+    params = {"search": "GZ", "limit": 30}
+
+    comprimida = client.get("/trabajos/", params=params, headers={**admin_token_headers, "Accept-Encoding": "gzip"})
+    assert comprimida.headers["content-encoding"] == "gzip"
+    assert len(comprimida.json()["items"]) == 30
+
+    sin_comprimir = client.get("/trabajos/", params=params, headers={**admin_token_headers, "Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in sin_comprimir.headers
+    assert sin_comprimir.json() == comprimida.json()
+
+    # Las respuestas chicas no se comprimen
+    chica = client.get("/trabajos/", params={**params, "limit": 1, "fields": "patente"},
+                       headers={**admin_token_headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in chica.headers
+
+
+def test_elegir_codificacion():
+    assert serializacion.elegir_codificacion(None) is None
+    assert serializacion.elegir_codificacion("identity") is None
+    assert serializacion.elegir_codificacion("deflate, gzip;q=0.5") == "gzip"
+    assert serializacion.elegir_codificacion("gzip;q=0") is None
+    assert gzip.decompress(serializacion.comprimir(b"{}", "gzip")) == b"{}"
@@ -1,5 +1,10 @@
+from sqlalchemy.orm import Session
 from starlette.testclient import TestClient
 
+import models
+from tests.utils import crear_trabajos, mover
+
+
 def test_crear_tecnico_como_admin(client: TestClient, admin_token_headers: dict[str, str]):
     """
     Prueba que un admin PUEDE crear un técnico.
@@ -50,4 +55,33 @@ def test_listar_tecnicos(client: TestClient, admin_token_headers: dict[str, str]
     assert len(data) > 0  # No debe estar vacía
     
     # Verificamos que los datos creados están en la lista
-    assert any(item["nombre_completo"] == "Ana Gomez" for item in data)
\ No newline at end of file
+    assert any(item["nombre_completo"] == "Ana Gomez" for item in data)
+
+def test_carga_de_tecnicos_sigue_las_transiciones_y_bloquea_el_borrado(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    tecnico = models.Tecnico(nombre="Tecnico Carga")
+    db_session.add(tecnico)
+    db_session.commit()
+    uno, dos = crear_trabajos(db_session, 2, prefijo="CARGA")
+    for trabajo in (uno, dos):
+        mover(db_session, trabajo.id, "espera de trabajo")
+        mover(db_session, trabajo.id, "en trabajo", tecnico_id=tecnico.id)
+    mover(db_session, dos.id, "trabajo detenido", motivo_detencion="Repuestos")
+    # El cliente cierra la sesión tras cada petición: después sólo se usan los ids
+    tecnico_id, uno_id = tecnico.id, uno.id
+
+    def carga_del_tecnico():
+        filas = client.get("/tecnicos/carga", headers=admin_token_headers).json()
+        return next(f for f in filas if f["tecnico_id"] == tecnico_id)
+
+    carga = carga_del_tecnico()
+    assert (carga["activos"], carga["detenidos"]) == (2, 1)
+    assert carga["por_estado"] == {"en trabajo": 1, "trabajo detenido": 1}
+
+    # Con trabajos asignados no se puede borrar (EXISTS sobre tecnico_id)
+    assert client.delete(f"/tecnicos/{tecnico_id}", headers=admin_token_headers).status_code == 400
+
+    for estado in ("control de calidad", "listo para entrega", "entregado al cliente"):
+        mover(db_session, uno_id, estado)
+    carga = carga_del_tecnico()
+    assert (carga["activos"], carga["detenidos"]) == (1, 1)
+    assert carga["por_estado"] == {"trabajo detenido": 1}
@@ -0,0 +1,178 @@
+import datetime
+
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import models
+from backfill_tiempo_detenido import rellenar
+from tests.utils import crear_trabajos, mover
+
+
+def test_listado_por_cursor_recorre_todo_sin_repetir(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    crear_trabajos(db_session, 7, prefijo="CUR")
+    params = {"limit": 3, "sort_by": "fecha_creacion_pedido", "sort_order": "asc", "search": "CUR"}
+
+    primera = client.get("/trabajos/", params=params, headers=admin_token_headers).json()
+    assert primera["total"] == 7
+    vistos = [t["pedido_dbm"] for t in primera["items"]]
+    cursor = primera["next_cursor"]
+    while cursor:
+        pagina = client.get("/trabajos/", params={**params, "cursor": cursor, "total_mode": "none"}, headers=admin_token_headers).json()
+        assert pagina["total"] is None
+        vistos += [t["pedido_dbm"] for t in pagina["items"]]
+        cursor = pagina["next_cursor"]
+
+    assert vistos == [f"CUR{i}" for i in range(7)]
+
+
+def test_tiempo_detenido_se_mantiene_en_las_transiciones(db_session: Session):
+    trabajo = crear_trabajos(db_session, 1, prefijo="DET")[0]
+    tecnico = models.Tecnico(nombre="Tecnico Detenciones")
+    db_session.add(tecnico)
+    db_session.commit()
+
+    mover(db_session, trabajo.id, "espera de trabajo")
+    mover(db_session, trabajo.id, "en trabajo", tecnico_id=tecnico.id)
+    trabajo = mover(db_session, trabajo.id, "trabajo detenido", motivo_detencion="Repuestos")
+    assert trabajo.detenido_desde is not None
+
+    # Simulamos que la detención empezó hace 2 horas
+    hace_dos_horas = datetime.datetime.utcnow() - datetime.timedelta(hours=2)
+    trabajo.detenido_desde = hace_dos_horas
+    db_session.query(models.HistorialDeEstado).filter(
+        models.HistorialDeEstado.trabajo_id == trabajo.id, models.HistorialDeEstado.fecha_fin == None
+    ).update({"fecha_inicio": hace_dos_horas})
+    db_session.commit()
+
+    trabajo = mover(db_session, trabajo.id, "en trabajo", tecnico_id=tecnico.id)
+    assert trabajo.detenido_desde is None
+    assert abs(trabajo.segundos_detenido_acumulados - 7200) < 60
+
+    # El backfill desde el historial llega al mismo valor
+    trabajo.segundos_detenido_acumulados = 0
+    db_session.commit()
+    rellenar(db_session)
+    db_session.refresh(trabajo)
+    assert abs(trabajo.segundos_detenido_acumulados - 7200) < 60
+
+
+def test_orden_y_filtro_por_dias_de_estadia(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    crear_trabajos(db_session, 4, prefijo="EST")
+    params = {"search": "EST", "sort_by": "dias_de_estadia_activa", "sort_order": "desc"}
+
+    data = client.get("/trabajos/", params=params, headers=admin_token_headers).json()
+    dias = [t["dias_de_estadia_activa"] for t in data["items"]]
+    assert dias == sorted(dias, reverse=True)
+    assert dias[0] == 4
+
+    data = client.get("/trabajos/", params={**params, "dias_estadia_min": 4}, headers=admin_token_headers).json()
+    assert data["total"] == 1
+    assert data["items"][0]["pedido_dbm"] == "EST0"
+
+
+def test_consultas_por_pagina_constantes_y_proyeccion(client: TestClient, admin_token_headers: dict[str, str], db_session: Session, db_engine):
+    from sqlalchemy import event
+
+    lista = crear_trabajos(db_session, 6, prefijo="N1")
+    for trabajo in lista:
+        mover(db_session, trabajo.id, "espera de trabajo")
+
+    # Primera petición fuera de la medición: carga el usuario autenticado en la caché de principales
+    client.get("/trabajos/", params={"search": "N1", "limit": 1}, headers=admin_token_headers)
+
+    consultas = []
+    def contar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", contar)
+    try:
+        conteos = []
+        for limit in (2, 6):
+            consultas.clear()
+            respuesta = client.get("/trabajos/", params={"search": "N1", "limit": limit}, headers=admin_token_headers)
+            assert len(respuesta.json()["items"]) == limit
+            conteos.append(len(consultas))
+        assert conteos[0] == conteos[1]
+
+        respuesta = client.get(
+            "/trabajos/", params={"search": "N1", "fields": "pedido_dbm,patente", "include": "tecnico_asignado"},
+            headers=admin_token_headers
+        )
+    finally:
+        event.remove(db_engine, "before_cursor_execute", contar)
+
+    item = respuesta.json()["items"][0]
+    assert set(item) == {"id", "estado_actual", "pedido_dbm", "patente", "tecnico_asignado"}
+    assert client.get("/trabajos/", params={"fields": "no_existe"}, headers=admin_token_headers).status_code == 400
+
+
+def test_busqueda_normaliza_patente_y_vin_y_ordena_por_relevancia(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    db_session.add_all([
+        models.Trabajo(pedido_dbm="BUS1", patente="ab-12 cd", vin="9bw-zzz 377", cliente_nombre="Rosa Tapia"),
+        models.Trabajo(pedido_dbm="BUS2", patente="XY-99-ZZ", cliente_nombre="Tapia Transportes Tapiadora"),
+    ])
+    db_session.commit()
+
+    def buscar(**params):
+        respuesta = client.get("/trabajos/", params=params, headers=admin_token_headers)
+        assert respuesta.status_code == 200
+        return [t["pedido_dbm"] for t in respuesta.json()["items"]]
+
+    assert buscar(search="AB12CD") == ["BUS1"]
+    assert buscar(search="9BWZZZ") == ["BUS1"]
+    assert buscar(patente="Ab 12") == ["BUS1"]
+    assert set(buscar(search="tapia")) == {"BUS1", "BUS2"}
+    assert buscar(search="tapia", sort_by="relevancia", sort_order="desc")[0] == "BUS2"
+
+
+def test_transiciones_en_lote_validan_por_item_y_se_aplican_juntas(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    primero, segundo, tercero = crear_trabajos(db_session, 3, prefijo="LOT")
+    tecnico = models.Tecnico(nombre="Tecnico Lote")
+    db_session.add(tecnico)
+    db_session.commit()
+    for trabajo in (primero, segundo):
+        mover(db_session, trabajo.id, "espera de trabajo")
+    lote = [
+        {"trabajo_id": primero.id, "nuevo_estado": "en trabajo", "tecnico_id": tecnico.id},
+        {"trabajo_id": segundo.id, "nuevo_estado": "en lavado"},
+        {"trabajo_id": tercero.id, "nuevo_estado": "en trabajo", "tecnico_id": tecnico.id},  # agendado: no permitido
+        {"trabajo_id": 999999, "nuevo_estado": "espera de trabajo"},
+    ]
+
+    atomico = client.post("/trabajos/transiciones/", json={"transiciones": lote, "atomico": True}, headers=admin_token_headers)
+    assert atomico.status_code == 200, atomico.text
+    assert atomico.json()["aplicados"] == 0
+    db_session.expire_all()
+    assert db_session.get(models.Trabajo, primero.id).estado_actual == "espera de trabajo"
+
+    respuesta = client.post("/trabajos/transiciones/", json={"transiciones": lote}, headers=admin_token_headers).json()
+    assert (respuesta["aplicados"], respuesta["rechazados"]) == (2, 2)
+    assert [r["aplicado"] for r in respuesta["resultados"]] == [True, True, False, False]
+    assert respuesta["resultados"][2]["error"] == "Transición no permitida de 'agendado' a 'en trabajo'"
+    assert respuesta["resultados"][2]["estado_actual"] == "agendado"
+
+    db_session.expire_all()
+    assert db_session.get(models.Trabajo, primero.id).tecnico_id == tecnico.id
+    for trabajo, estados in ((primero, ["espera de trabajo", "en trabajo"]), (segundo, ["espera de trabajo", "en lavado"])):
+        historial = client.get(f"/trabajos/{trabajo.id}/historial", headers=admin_token_headers).json()
+        assert [h["estado"] for h in historial] == estados
+        assert historial[0]["fecha_fin"] is not None and historial[1]["fecha_fin"] is None
+
+
+def test_facetas_cuentan_dentro_de_los_filtros_y_se_invalidan_con_las_transiciones(client: TestClient, admin_token_headers: dict[str, str], db_session: Session):
+    trabajos_faceta = crear_trabajos(db_session, 3, prefijo="FAC")
+    for trabajo, asesor, marca in zip(trabajos_faceta, ["Asesor Uno", "Asesor Uno", "Asesor Dos"], ["Marca A", "Marca B", "Marca A"]):
+        trabajo.asesor_servicio, trabajo.marca = asesor, marca
+    db_session.commit()
+    primero_id = trabajos_faceta[0].id # El cliente cierra la sesión tras cada petición
+    params = {"search": "FAC", "asesor_servicio": "Asesor Uno"}
+
+    facetas = client.get("/trabajos/facetas", params=params, headers=admin_token_headers).json()
+    # La faceta del filtro aplicado muestra también las alternativas; las demás quedan acotadas
+    assert {f["valor"]: f["cantidad"] for f in facetas["asesor_servicio"]} == {"Asesor Uno": 2, "Asesor Dos": 1}
+    assert {f["valor"]: f["cantidad"] for f in facetas["marca"]} == {"Marca A": 1, "Marca B": 1}
+    assert facetas["estado_actual"] == [{"valor": "agendado", "cantidad": 2}]
+
+    mover(db_session, primero_id, "espera de trabajo")
+    facetas = client.get("/trabajos/facetas", params=params, headers=admin_token_headers).json()
+    assert {f["valor"]: f["cantidad"] for f in facetas["estado_actual"]} == {"agendado": 1, "espera de trabajo": 1}
@@ -0,0 +1,42 @@
+# backend/tests/utils.py
+"""Datos y acciones compartidos por los módulos de prueba (los fixtures viven en conftest.py)."""
+import datetime
+import io
+
+import pandas as pd
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+import models, schemas, trabajos
+from importacion import COLUMN_MAPPING
+
+
+def crear_trabajos(db_session: Session, cantidad: int, prefijo: str = "T") -> list[models.Trabajo]:
+    base = datetime.datetime.utcnow() - datetime.timedelta(days=cantidad)
+    lista = [
+        models.Trabajo(pedido_dbm=f"{prefijo}{i}", fecha_creacion_pedido=base + datetime.timedelta(days=i), estado_actual="agendado")
+        for i in range(cantidad)
+    ]
+    db_session.add_all(lista)
+    db_session.commit()
+    return lista
+
+
+def mover(db_session: Session, trabajo_id: int, nuevo_estado: str, **extra) -> models.Trabajo:
+    estado_update = schemas.TrabajoUpdateEstado(nuevo_estado=nuevo_estado, **extra)
+    return trabajos.actualizar_estado_trabajo(trabajo_id, estado_update, db=db_session, current_user=None)
+
+
+def excel_dbm(filas: list[dict]) -> bytes:
+    """Genera un Excel con el formato del export DBM (una fila de título antes del encabezado)."""
+    df = pd.DataFrame([{col: fila.get(col) for col in COLUMN_MAPPING} for fila in filas])
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        pd.DataFrame([["Export DBM"]]).to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=1)
+    return buffer.getvalue()
+
+
+def subir_excel(client: TestClient, headers: dict[str, str], contenido: bytes):
+    archivos = {"file": ("export.xlsx", contenido, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    return client.post("/trabajos/upload-excel/", files=archivos, headers=headers)
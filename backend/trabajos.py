@@ -1,15 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Body, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func, inspect, select
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import or_, func, select, case, update, literal, union_all
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional, Dict, Any, Tuple
-import models, schemas, auth
+from typing import List, Optional, Dict, Any, Tuple, Literal
+import models, schemas, auth, paginacion, busqueda, importacion, eventos, alertas, serializacion, carga, exportacion
+from importacion import COLUMN_MAPPING
+from funciones_sql import epoch
+from cache import cache_tablero, cache_tecnicos
+from condicional import ETAG_VIGENCIA_SEGUNDOS, etag_condicional
+from celery_worker import procesar_importacion_excel, programar_plazo_permanencia, programar_plazos_permanencia
 # 👇 CORRECCIÓN AQUÍ: Importamos get_db
 from database import SessionLocal, get_db
 import datetime
 import pandas as pd
 from pandas import DataFrame 
 import io
+import json
+import os
+import uuid
+import tempfile
+import calendar
 import logging
 
 # ... (el resto del archivo trabajos.py se mantiene exactamente igual que en el Paso 6) ...
@@ -27,26 +40,173 @@ VALID_TRANSITIONS = {
     "listo para entrega": ["entregado al cliente"], "entregado al cliente": []
 }
 
-COLUMN_MAPPING = {
-    'Pedido DBM': 'pedido_dbm',
-    'Motivo de pedido': 'tipo_pedido',
-    'Fecha documento': 'fecha_creacion_pedido',
-    'Nombre consultor técnico': 'asesor_servicio',
-    'Matr.vehículo': 'patente',
-    'Sector': 'marca',
-    'Descripción del modelo de vehículo': 'modelo_vehiculo',
-    'Nº identificación vehículo': 'vin',
-    'Nombre del cliente': 'cliente_nombre',
-    'Descripción de tarea': 'detalle_pedido',
-    'Valor neto': 'total_pedido'
-}
 
 router = APIRouter(prefix="/trabajos", tags=["Trabajos"])
 
 # get_db() ya está importado, por lo que las siguientes funciones 
 # que usan Depends(get_db) deberían funcionar.
 
-@router.get("/", response_model=schemas.PaginatedTrabajos)
+# Claves de orden calculadas (no son columnas reales de Trabajo)
+CLAVES_ORDEN_DERIVADAS = ("dias_de_estadia_activa", "tiempo_detenido_segundos", "relevancia")
+
+def _a_utc_naive(fecha: datetime.datetime) -> datetime.datetime:
+    if fecha.tzinfo is not None:
+        return fecha.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return fecha
+
+def _expr_segundos_detenido(ahora_epoch: float, modelo=models.Trabajo):
+    """Segundos detenido: detenciones cerradas (acumuladas) + la detención abierta, si la hay."""
+    return modelo.segundos_detenido_acumulados + case(
+        (modelo.detenido_desde.isnot(None), ahora_epoch - epoch(modelo.detenido_desde)),
+        else_=0
+    )
+
+def _expr_segundos_estadia_activa(ahora_epoch: float, modelo=models.Trabajo):
+    """Segundos en el taller descontando el tiempo detenido (NULL si no hay fecha de inicio)."""
+    inicio = func.coalesce(modelo.fecha_llegada_taller, modelo.fecha_creacion_pedido)
+    return ahora_epoch - epoch(inicio) - _expr_segundos_detenido(ahora_epoch, modelo)
+
+def _filtros_trabajos(
+    db: Session,
+    ahora_epoch: float,
+    search: Optional[str],
+    asesor_servicio: Optional[str],
+    estado_actual: Optional[str],
+    fecha_desde: Optional[datetime.date],
+    fecha_hasta: Optional[datetime.date],
+    activos: bool,
+    patente: Optional[str],
+    dias_estadia_min: Optional[int] = None,
+    dias_estadia_max: Optional[int] = None,
+    horas_detenido_min: Optional[float] = None,
+    modelo=models.Trabajo,
+) -> list:
+    """Construye la lista de condiciones WHERE comunes al listado (y a su conteo) sobre `modelo`."""
+    if patente:
+        return [busqueda.filtro_patente(patente, modelo)]
+
+    filtros = []
+    if activos:
+        filtros.append(modelo.estado_actual != 'entregado al cliente')
+    else:
+        filtros.append(modelo.estado_actual == 'entregado al cliente')
+
+    if search:
+        filtros.append(busqueda.filtro_busqueda(db, search, modelo))
+    if asesor_servicio:
+        filtros.append(modelo.asesor_servicio.ilike(f"%{asesor_servicio}%"))
+    if estado_actual:
+        filtros.append(modelo.estado_actual == estado_actual)
+    if fecha_desde:
+        filtros.append(modelo.fecha_creacion_pedido >= fecha_desde)
+    if fecha_hasta:
+        filtros.append(modelo.fecha_creacion_pedido < fecha_hasta + datetime.timedelta(days=1))
+    if dias_estadia_min is not None:
+        filtros.append(_expr_segundos_estadia_activa(ahora_epoch, modelo) >= dias_estadia_min * 86400)
+    if dias_estadia_max is not None:
+        filtros.append(_expr_segundos_estadia_activa(ahora_epoch, modelo) < (dias_estadia_max + 1) * 86400)
+    if horas_detenido_min is not None:
+        filtros.append(_expr_segundos_detenido(ahora_epoch, modelo) >= horas_detenido_min * 3600)
+    return filtros
+
+def _normalizar_orden(sort_by: Optional[str], sort_order: str, search: Optional[str], patente: Optional[str]) -> Tuple[str, str]:
+    """Clave y sentido de orden válidos para el listado y la exportación."""
+    # Con filtro por patente se mantiene el orden histórico: más recientes primero
+    if patente:
+        sort_by, sort_order = "fecha_creacion_pedido", "desc"
+    if sort_by not in models.Trabajo.__table__.columns and sort_by not in CLAVES_ORDEN_DERIVADAS:
+        sort_by = "id"
+    if sort_by == "relevancia" and not search:
+        sort_by = "id"
+    return sort_by, "desc" if sort_order.lower() == "desc" else "asc"
+
+def _columna_orden(db: Session, sort_by: str, search: Optional[str], modelo, expr_estadia, expr_detenido):
+    if sort_by == "dias_de_estadia_activa":
+        return expr_estadia
+    if sort_by == "tiempo_detenido_segundos":
+        return expr_detenido
+    if sort_by == "relevancia":
+        return busqueda.expr_relevancia(db, search, modelo)
+    return getattr(modelo, sort_by)
+
+# --- Carga anticipada y proyección de campos ---
+RELACIONES_INCLUIBLES = ("historial", "tecnico_asignado")
+CAMPOS_PROYECTABLES = tuple(c for c in schemas.Trabajo.model_fields if c not in RELACIONES_INCLUIBLES)
+CAMPOS_SIEMPRE_INCLUIDOS = ("id", "estado_actual")
+
+def _opciones_carga(relaciones=RELACIONES_INCLUIBLES, modelo=models.Trabajo) -> list:
+    """Estrategias de carga explícitas: evita un lazy load por fila al serializar."""
+    opciones = []
+    if "historial" in relaciones:
+        opciones.append(selectinload(modelo.historial))
+    if "tecnico_asignado" in relaciones:
+        opciones.append(joinedload(modelo.tecnico_asignado))
+    return opciones
+
+def _pagina_mezclada(db: Session, fuentes: list, selecciones: list, sort_by: str, descendente: bool,
+                     offset: int, limit: int, ahora_epoch: float, relaciones) -> list:
+    """
+    Página del listado sobre varias tablas: UNION ALL de (tabla, id, clave de orden) ordenado y paginado
+    en SQL con el mismo criterio que paginacion.orden_keyset, y carga completa sólo de las filas ganadoras
+    (más una, para saber si hay página siguiente).
+    """
+    union = union_all(*selecciones).subquery()
+    columna = union.c.id if sort_by == "id" else union.c.valor_orden
+    ganadores = db.execute(
+        select(union.c.fuente, union.c.id)
+        .order_by(*paginacion.orden_keyset(columna, union.c.id, descendente))
+        .offset(offset)
+        .limit(limit + 1)
+    ).all()
+
+    ids_por_fuente: Dict[int, List[int]] = {}
+    for fuente, trabajo_id in ganadores:
+        ids_por_fuente.setdefault(fuente, []).append(trabajo_id)
+    cargadas = {}
+    for fuente, ids in ids_por_fuente.items():
+        modelo = fuentes[fuente]
+        query = db.query(
+            modelo,
+            _expr_segundos_detenido(ahora_epoch, modelo).label("tiempo_detenido_segundos"),
+            _expr_segundos_estadia_activa(ahora_epoch, modelo).label("segundos_estadia_activa"),
+        ).options(*_opciones_carga(relaciones, modelo)).filter(modelo.id.in_(ids))
+        cargadas.update({(fuente, fila[0].id): fila for fila in query})
+    return [cargadas[(fuente, trabajo_id)] for fuente, trabajo_id in ganadores]
+
+def _parsear_lista(valor: Optional[str], permitidos: tuple, parametro: str) -> Optional[List[str]]:
+    if valor is None:
+        return None
+    elementos = [v.strip() for v in valor.split(",") if v.strip()]
+    invalidos = [v for v in elementos if v not in permitidos]
+    if invalidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Valores no válidos en '{parametro}': {', '.join(invalidos)}"
+        )
+    return elementos
+
+def _cargar_trabajo_completo(db: Session, trabajo_id: int) -> models.Trabajo:
+    """Recarga un trabajo con historial y técnico en 2 consultas (en lugar de refresh + lazy loads)."""
+    return (
+        db.query(models.Trabajo)
+        .options(*_opciones_carga())
+        .populate_existing()
+        .filter(models.Trabajo.id == trabajo_id)
+        .one()
+    )
+
+def _proyectar_trabajo(trabajo: models.Trabajo, campos: List[str], relaciones: List[str]) -> Dict[str, Any]:
+    item = {campo: getattr(trabajo, campo, None) for campo in campos}
+    if "historial" in relaciones:
+        historial = sorted(trabajo.historial, key=lambda h: h.fecha_inicio)
+        item["historial"] = [schemas.Historial.model_validate(h).model_dump() for h in historial]
+    if "tecnico_asignado" in relaciones:
+        tecnico = trabajo.tecnico_asignado
+        item["tecnico_asignado"] = schemas.Tecnico.model_validate(tecnico).model_dump() if tecnico else None
+    return item
+
+@router.get("/", response_model=schemas.PaginatedTrabajos,
+            dependencies=[Depends(etag_condicional(cache_tablero, cache_tecnicos, vigencia_segundos=ETAG_VIGENCIA_SEGUNDOS))])
 def leer_trabajos_paginados(
     db: Session = Depends(get_db), # <- Ahora get_db está definido
     page: int = 1,
@@ -60,91 +220,134 @@ def leer_trabajos_paginados(
     fecha_hasta: Optional[datetime.date] = Query(None),
     activos: bool = True,
     patente: Optional[str] = None,
-    current_user: schemas.User = Depends(auth.get_current_active_user) # Usa la dependencia correcta
+    dias_estadia_min: Optional[int] = None,
+    dias_estadia_max: Optional[int] = None,
+    horas_detenido_min: Optional[float] = None,
+    cursor: Optional[str] = None,
+    total_mode: Literal["exact", "cached", "estimated", "none"] = "exact",
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    current_user: schemas.User = Depends(auth.get_principal_lectura)
 ):
+    """
+    Lista trabajos paginados. Con `cursor` (el `next_cursor` de la respuesta anterior) la página
+    se obtiene por keyset sobre (sort_by, id) y `page` se ignora, por lo que la página N cuesta lo mismo que la 1.
+    `total_mode` controla el conteo: exact, cached (por set de filtros), estimated (planificador) o none.
+    `sort_by` acepta columnas de Trabajo y además `dias_de_estadia_activa` y `tiempo_detenido_segundos`
+    (estas dos solo con paginación por `page`, ya que su valor cambia con el tiempo).
+    Con `search`, `sort_by=relevancia` ordena por similitud con el término buscado.
+    `fields` (lista separada por comas) e `include` (historial, tecnico_asignado) devuelven una versión
+    reducida de cada trabajo; sin ellos se devuelve el trabajo completo.
+    Con `activos=False` o `patente` se incluyen también los trabajos archivados (ver archivo.py).
+    Con SERIALIZACION_RAPIDA (por defecto) el JSON se arma directo desde las filas (ver serializacion.py).
+    """
     try:
-        tiempo_detenido_subquery = (
-            select(
-                func.sum(
-                    func.extract(
-                        "epoch",
-                        func.coalesce(models.HistorialDeEstado.fecha_fin, func.now()) - models.HistorialDeEstado.fecha_inicio
-                    )
+        campos = _parsear_lista(fields, CAMPOS_PROYECTABLES, "fields")
+        relaciones = _parsear_lista(include, RELACIONES_INCLUIBLES, "include")
+        proyectado = campos is not None or relaciones is not None
+        if proyectado:
+            campos = list(dict.fromkeys([*CAMPOS_SIEMPRE_INCLUIDOS, *(campos or CAMPOS_PROYECTABLES)]))
+            relaciones = relaciones or []
+        else:
+            relaciones = list(RELACIONES_INCLUIBLES)
+
+        ahora = datetime.datetime.utcnow()
+        ahora_epoch = calendar.timegm(ahora.timetuple()) + ahora.microsecond / 1e6
+
+        sort_by, sort_order = _normalizar_orden(sort_by, sort_order, search, patente)
+        descendente = sort_order == "desc"
+        orden_derivado = sort_by in CLAVES_ORDEN_DERIVADAS
+
+        if cursor:
+            if orden_derivado:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La paginación por cursor no está disponible al ordenar por '{sort_by}'."
                 )
-            )
-            .where(
-                models.HistorialDeEstado.trabajo_id == models.Trabajo.id,
-                models.HistorialDeEstado.estado == 'trabajo detenido'
-            )
-            .correlate(models.Trabajo) 
-            .as_scalar()
+            valor_cursor, id_cursor = paginacion.decodificar_cursor(cursor, sort_by, sort_order)
+
+        # Los entregados antiguos viven en trabajos_archivados (archivo.py): el listado de entregados y la
+        # búsqueda por patente consultan las dos tablas, unidas y paginadas en SQL (_pagina_mezclada)
+        fuentes = [models.Trabajo] if activos and not patente else [models.Trabajo, models.TrabajoArchivado]
+        mezclar = len(fuentes) > 1
+        clave_cache = (
+            search, asesor_servicio, estado_actual, fecha_desde, fecha_hasta, activos, patente,
+            dias_estadia_min, dias_estadia_max, horas_detenido_min
         )
 
-        query = db.query(
-            models.Trabajo,
-            func.coalesce(tiempo_detenido_subquery, 0).label("tiempo_detenido_segundos")
-        )
+        filas, total_records, total_exacto = [], 0, True
+        selecciones = []
+        for indice, modelo in enumerate(fuentes):
+            expr_detenido = _expr_segundos_detenido(ahora_epoch, modelo)
+            expr_estadia = _expr_segundos_estadia_activa(ahora_epoch, modelo)
+            columna_a_ordenar = _columna_orden(db, sort_by, search, modelo, expr_estadia, expr_detenido)
 
-        if patente:
-            query = query.filter(models.Trabajo.patente.ilike(f"%{patente}%")).order_by(models.Trabajo.fecha_creacion_pedido.desc())
-        else:
-            if activos:
-                query = query.filter(models.Trabajo.estado_actual != 'entregado al cliente')
-            else:
-                query = query.filter(models.Trabajo.estado_actual == 'entregado al cliente')
-
-            if search:
-                query = query.filter(or_(
-                    models.Trabajo.cliente_nombre.ilike(f"%{search}%"),
-                    models.Trabajo.patente.ilike(f"%{search}%"),
-                    models.Trabajo.pedido_dbm.ilike(f"%{search}%")
-                ))
-            
-            if asesor_servicio:
-                query = query.filter(models.Trabajo.asesor_servicio.ilike(f"%{asesor_servicio}%"))
-            if estado_actual:
-                query = query.filter(models.Trabajo.estado_actual == estado_actual)
-            if fecha_desde:
-                query = query.filter(models.Trabajo.fecha_creacion_pedido >= fecha_desde)
-            if fecha_hasta:
-                query = query.filter(models.Trabajo.fecha_creacion_pedido < fecha_hasta + datetime.timedelta(days=1))
-
-        total_records = query.count()
-
-        if sort_by and hasattr(models.Trabajo, sort_by):
-            columna_a_ordenar = getattr(models.Trabajo, sort_by)
-            if sort_order.lower() == "desc":
-                query = query.order_by(columna_a_ordenar.desc())
-            else:
-                query = query.order_by(columna_a_ordenar.asc())
-        
-        offset = (page - 1) * limit
-        items_con_tiempo = query.offset(offset).limit(limit).all()
-        
-        items = [] 
-        for trabajo, tiempo_detenido_segundos in items_con_tiempo:
-            try:
-                fecha_inicio_conteo = trabajo.fecha_llegada_taller or trabajo.fecha_creacion_pedido
-                if not fecha_inicio_conteo:
-                    trabajo.dias_de_estadia_activa = 0
-                    items.append(trabajo)
-                    continue
-
-                if hasattr(fecha_inicio_conteo, 'tzinfo') and fecha_inicio_conteo.tzinfo is not None:
-                    fecha_inicio_conteo = fecha_inicio_conteo.replace(tzinfo=None)
-
-                tiempo_total_segundos = (datetime.datetime.utcnow() - fecha_inicio_conteo).total_seconds()
-                tiempo_activo_segundos = tiempo_total_segundos - tiempo_detenido_segundos
-                trabajo.dias_de_estadia_activa = int(tiempo_activo_segundos / (24 * 3600)) if tiempo_activo_segundos > 0 else 0
-            
-            except Exception as e:
-                logger.error(f"Error calculando días de estadía para trabajo ID {trabajo.id}: {e}")
-                trabajo.dias_de_estadia_activa = -1
-            
-            items.append(trabajo) 
-
-        return {"items": items, "total": total_records}
+            filtros = _filtros_trabajos(
+                db, ahora_epoch, search, asesor_servicio, estado_actual, fecha_desde, fecha_hasta, activos, patente,
+                dias_estadia_min, dias_estadia_max, horas_detenido_min, modelo=modelo
+            )
+
+            query_conteo = db.query(func.count(modelo.id)).filter(*filtros)
+            total, exacto = paginacion.calcular_total(db, query_conteo, total_mode, (modelo.__table__.name, *clave_cache))
+            total_records = None if total is None or total_records is None else total_records + total
+            total_exacto = total_exacto and exacto
 
+            if cursor:
+                filtros.append(paginacion.filtro_keyset(columna_a_ordenar, modelo.id, descendente, valor_cursor, id_cursor))
+
+            if mezclar:
+                selecciones.append(
+                    select(literal(indice).label("fuente"), modelo.id.label("id"), columna_a_ordenar.label("valor_orden"))
+                    .where(*filtros)
+                )
+                continue
+
+            # Columnas mantenidas en Trabajo: ya no hay subconsulta correlacionada por fila
+            query = (
+                db.query(modelo, expr_detenido.label("tiempo_detenido_segundos"), expr_estadia.label("segundos_estadia_activa"))
+                .options(*_opciones_carga(relaciones, modelo))
+                .filter(*filtros)
+                .order_by(*paginacion.orden_keyset(columna_a_ordenar, modelo.id, descendente))
+            )
+            if not cursor:
+                query = query.offset((page - 1) * limit)
+            # Pedimos una fila extra para saber si existe una página siguiente
+            filas = query.limit(limit + 1).all()
+
+        if mezclar:
+            offset = 0 if cursor else (page - 1) * limit
+            filas = _pagina_mezclada(db, fuentes, selecciones, sort_by, descendente, offset, limit, ahora_epoch, relaciones)
+        hay_siguiente = len(filas) > limit
+        filas = filas[:limit]
+
+        next_cursor = None
+        if hay_siguiente and filas and not orden_derivado:
+            ultimo = filas[-1][0]
+            next_cursor = paginacion.codificar_cursor(sort_by, sort_order, getattr(ultimo, sort_by), ultimo.id)
+
+        items = []
+        for trabajo, tiempo_detenido_segundos, segundos_estadia_activa in filas:
+            trabajo.tiempo_detenido_segundos = int(tiempo_detenido_segundos or 0)
+            if segundos_estadia_activa is None or segundos_estadia_activa <= 0:
+                trabajo.dias_de_estadia_activa = 0
+            else:
+                trabajo.dias_de_estadia_activa = int(segundos_estadia_activa / (24 * 3600))
+            items.append(trabajo)
+
+        respuesta = {"items": items, "total": total_records, "total_exacto": total_exacto, "next_cursor": next_cursor}
+        if proyectado:
+            respuesta["items"] = [_proyectar_trabajo(t, campos, relaciones) for t in items]
+            if serializacion.SERIALIZACION_RAPIDA:
+                return serializacion.RespuestaJSONRapida(respuesta)
+            return JSONResponse(content=jsonable_encoder(respuesta))
+        if serializacion.SERIALIZACION_RAPIDA:
+            # Filas de nuestras propias consultas: se omite la validación de response_model
+            respuesta["items"] = [serializacion.trabajo_a_dict(t) for t in items]
+            return serializacion.RespuestaJSONRapida(respuesta)
+        return respuesta
+
+    except HTTPException:
+        raise
     except SQLAlchemyError as e:
         logger.error(f"Error de base de datos en leer_trabajos_paginados: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error de base de datos al consultar trabajos.")
@@ -153,6 +356,138 @@ def leer_trabajos_paginados(
         raise HTTPException(status_code=500, detail="Ocurrió un error inesperado en el servidor al listar los trabajos.")
 
 
+# --- Facetas de los filtros ---
+# Faceta -> columna de Trabajo. Cada faceta se cuenta sin su propio filtro, así el panel muestra las
+# alternativas al valor ya elegido.
+FACETAS = {
+    "asesor_servicio": "asesor_servicio", "marca": "marca", "tipo_pedido": "tipo_pedido",
+    "estado_actual": "estado_actual", "tecnico": "tecnico_id",
+}
+FACETAS_MAXIMO = int(os.getenv("FACETAS_MAXIMO", "100")) # Valores por faceta, los más frecuentes
+
+def _calcular_facetas(db: Session, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    ahora = datetime.datetime.utcnow()
+    ahora_epoch = calendar.timegm(ahora.timetuple()) + ahora.microsecond / 1e6
+    activos, patente = parametros["activos"], parametros["patente"]
+    conteos: Dict[str, Dict[Any, int]] = {faceta: {} for faceta in FACETAS}
+    for modelo in ([models.Trabajo] if activos and not patente else [models.Trabajo, models.TrabajoArchivado]):
+        for faceta, nombre_columna in FACETAS.items():
+            sin_filtro_propio = {**parametros, faceta: None} if faceta in parametros else parametros
+            filtros = _filtros_trabajos(db, ahora_epoch, modelo=modelo, **sin_filtro_propio)
+            columna = getattr(modelo, nombre_columna)
+            for valor, cantidad in (
+                db.query(columna, func.count()).filter(*filtros, columna.is_not(None)).group_by(columna)
+            ):
+                conteos[faceta][valor] = conteos[faceta].get(valor, 0) + cantidad
+
+    def mas_frecuentes(faceta: str) -> List[Tuple[Any, int]]:
+        return sorted(conteos[faceta].items(), key=lambda par: (-par[1], str(par[0])))[:FACETAS_MAXIMO]
+
+    resultado = {
+        faceta: [{"valor": valor, "cantidad": cantidad} for valor, cantidad in mas_frecuentes(faceta) if valor != ""]
+        for faceta in FACETAS if faceta != "tecnico"
+    }
+    tecnicos = mas_frecuentes("tecnico")
+    nombres = dict(
+        db.query(models.Tecnico.id, models.Tecnico.nombre).filter(models.Tecnico.id.in_([t for t, _ in tecnicos]))
+    ) if tecnicos else {}
+    resultado["tecnico"] = [
+        {"tecnico_id": tecnico_id, "nombre": nombres.get(tecnico_id), "cantidad": cantidad}
+        for tecnico_id, cantidad in tecnicos
+    ]
+    return resultado
+
+@router.get("/facetas", response_model=schemas.Facetas,
+            dependencies=[Depends(etag_condicional(cache_tablero, cache_tecnicos, vigencia_segundos=ETAG_VIGENCIA_SEGUNDOS))])
+def leer_facetas(
+    db: Session = Depends(get_db),
+    search: Optional[str] = None,
+    asesor_servicio: Optional[str] = None,
+    estado_actual: Optional[str] = Query(None),
+    fecha_desde: Optional[datetime.date] = Query(None),
+    fecha_hasta: Optional[datetime.date] = Query(None),
+    activos: bool = True,
+    patente: Optional[str] = None,
+    dias_estadia_min: Optional[int] = None,
+    dias_estadia_max: Optional[int] = None,
+    horas_detenido_min: Optional[float] = None,
+    current_user: schemas.User = Depends(auth.get_principal_lectura)
+):
+    """
+    Valores distintos de asesor, marca, tipo de pedido, estado y técnico, con cuántos trabajos tiene cada
+    uno dentro de los filtros de GET /trabajos/ (para los desplegables del panel de filtros).
+    Se guardan en la caché del tablero, que invalidan las transiciones y las importaciones. Los filtros por
+    días de estadía o tiempo detenido cambian sin escrituras: el ETag caduca con ETAG_VIGENCIA_SEGUNDOS.
+    """
+    parametros = dict(
+        search=search, asesor_servicio=asesor_servicio, estado_actual=estado_actual, fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta, activos=activos, patente=patente, dias_estadia_min=dias_estadia_min,
+        dias_estadia_max=dias_estadia_max, horas_detenido_min=horas_detenido_min,
+    )
+    clave = "facetas:" + json.dumps(parametros, default=str, sort_keys=True)
+    return cache_tablero.obtener(clave, lambda: _calcular_facetas(db, parametros))
+
+@router.get("/exportar")
+def exportar_trabajos(
+    formato: Literal["csv", "xlsx"] = "csv",
+    db: Session = Depends(get_db),
+    sort_by: Optional[str] = "id",
+    sort_order: str = "desc",
+    search: Optional[str] = None,
+    asesor_servicio: Optional[str] = None,
+    estado_actual: Optional[str] = Query(None),
+    fecha_desde: Optional[datetime.date] = Query(None),
+    fecha_hasta: Optional[datetime.date] = Query(None),
+    activos: bool = True,
+    patente: Optional[str] = None,
+    dias_estadia_min: Optional[int] = None,
+    dias_estadia_max: Optional[int] = None,
+    horas_detenido_min: Optional[float] = None,
+    current_user: schemas.User = Depends(auth.get_principal_lectura)
+):
+    """
+    Descarga en CSV o XLSX todos los trabajos que cumplen los filtros de GET /trabajos/ (sin paginar),
+    con su estadía activa y tiempo detenido. Las filas se leen y envían por lotes (ver exportacion.py).
+    Con `activos=False` o `patente` se exportan primero los vigentes y luego los archivados.
+    """
+    sort_by, sort_order = _normalizar_orden(sort_by, sort_order, search, patente)
+    ahora = datetime.datetime.utcnow()
+    ahora_epoch = calendar.timegm(ahora.timetuple()) + ahora.microsecond / 1e6
+
+    consultas = []
+    for modelo in ([models.Trabajo] if activos and not patente else [models.Trabajo, models.TrabajoArchivado]):
+        expr_detenido = _expr_segundos_detenido(ahora_epoch, modelo)
+        expr_estadia = _expr_segundos_estadia_activa(ahora_epoch, modelo)
+        columna_a_ordenar = _columna_orden(db, sort_by, search, modelo, expr_estadia, expr_detenido)
+        filtros = _filtros_trabajos(
+            db, ahora_epoch, search, asesor_servicio, estado_actual, fecha_desde, fecha_hasta, activos, patente,
+            dias_estadia_min, dias_estadia_max, horas_detenido_min, modelo=modelo
+        )
+        consultas.append(
+            db.query(
+                modelo.id, *[getattr(modelo, c) for c in exportacion.COLUMNAS_PEDIDO],
+                modelo.estado_actual, modelo.fecha_llegada_taller, models.Tecnico.nombre, expr_estadia, expr_detenido,
+            )
+            .outerjoin(models.Tecnico, models.Tecnico.id == modelo.tecnico_id)
+            .filter(*filtros)
+            .order_by(*paginacion.orden_keyset(columna_a_ordenar, modelo.id, sort_order == "desc"))
+        )
+
+    generar = exportacion.generar_xlsx if formato == "xlsx" else exportacion.generar_csv
+
+    def contenido():
+        # Las consultas se ejecutan al recorrer la respuesta; la sesión se libera al terminar
+        try:
+            yield from generar(exportacion.filas_exportadas(consultas))
+        finally:
+            db.close()
+
+    nombre = f"trabajos_{ahora:%Y%m%d_%H%M}.{formato}"
+    return StreamingResponse(
+        contenido(), media_type=exportacion.MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
 @router.patch("/{trabajo_id}", response_model=schemas.Trabajo)
 def actualizar_trabajo(
     trabajo_id: int, 
@@ -169,9 +504,59 @@ def actualizar_trabajo(
         setattr(trabajo_db, key, value)
     
     db.commit()
-    db.refresh(trabajo_db)
+    cache_tablero.incrementar_version() # El listado la usa como validador (ETag)
+    trabajo_db = _cargar_trabajo_completo(db, trabajo_id)
+    eventos.publicar_evento(eventos.evento_trabajo("actualizacion", trabajo_db))
     return trabajo_db
 
+def _cerrar_detencion(trabajo_db: models.Trabajo, historial: models.HistorialDeEstado, fin: datetime.datetime) -> None:
+    """Suma la detención que se cierra al acumulado del trabajo y limpia la detención abierta."""
+    inicio = trabajo_db.detenido_desde or historial.fecha_inicio
+    segundos = (fin - _a_utc_naive(inicio)).total_seconds() if inicio else 0
+    trabajo_db.segundos_detenido_acumulados = (trabajo_db.segundos_detenido_acumulados or 0) + max(segundos, 0)
+    trabajo_db.detenido_desde = None
+
+def _error_transicion(estado_actual: str, estado_update: schemas.TrabajoUpdateEstado) -> Optional[str]:
+    """Motivo por el que la transición no es válida, o None si lo es (sin consultar la BD)."""
+    nuevo_estado = estado_update.nuevo_estado
+    if estado_actual in VALID_TRANSITIONS and nuevo_estado not in VALID_TRANSITIONS[estado_actual]:
+        return f"Transición no permitida de '{estado_actual}' a '{nuevo_estado}'"
+    if nuevo_estado == "trabajo detenido" and not estado_update.motivo_detencion:
+        return "Se requiere un motivo para detener el trabajo."
+    if nuevo_estado == "en trabajo" and not estado_update.tecnico_id:
+        return "Se requiere asignar un técnico para pasar el trabajo a 'en trabajo'."
+    return None
+
+def _aplicar_transicion(
+    trabajo_db: models.Trabajo,
+    historial_anterior: Optional[models.HistorialDeEstado],
+    estado_update: schemas.TrabajoUpdateEstado,
+    ahora: datetime.datetime,
+    deltas_carga: Dict[carga.Clave, int],
+) -> models.HistorialDeEstado:
+    """
+    Aplica en memoria una transición ya validada y devuelve el historial nuevo (sin agregarlo a la sesión).
+    El cambio de carga del técnico se acumula en `deltas_carga`; aplicarlo (carga.aplicar), cerrar
+    `historial_anterior` y resolver sus alertas queda a cargo del llamador.
+    """
+    antes = (trabajo_db.tecnico_id, trabajo_db.estado_actual)
+    if estado_update.tecnico_id:
+        trabajo_db.tecnico_id = estado_update.tecnico_id
+    if historial_anterior:
+        if historial_anterior.estado == 'agendado' and not trabajo_db.fecha_llegada_taller:
+            trabajo_db.fecha_llegada_taller = ahora
+        if historial_anterior.estado == 'trabajo detenido':
+            _cerrar_detencion(trabajo_db, historial_anterior, ahora)
+    if estado_update.nuevo_estado == 'trabajo detenido':
+        trabajo_db.detenido_desde = ahora
+    trabajo_db.estado_actual = estado_update.nuevo_estado
+    carga.registrar_cambio(deltas_carga, antes, (trabajo_db.tecnico_id, trabajo_db.estado_actual))
+    return models.HistorialDeEstado(
+        trabajo_id=trabajo_db.id, estado=estado_update.nuevo_estado, fecha_inicio=ahora,
+        motivo_detencion=estado_update.motivo_detencion, detalle_motivo=estado_update.detalle_motivo,
+        fecha_eta=estado_update.fecha_eta
+    )
+
 @router.patch("/{trabajo_id}/estado", response_model=schemas.Trabajo)
 def actualizar_estado_trabajo(
     trabajo_id: int, 
@@ -182,121 +567,190 @@ def actualizar_estado_trabajo(
     trabajo_db = db.query(models.Trabajo).filter(models.Trabajo.id == trabajo_id).first()
     if not trabajo_db: raise HTTPException(status_code=404, detail="Trabajo no encontrado")
     
-    estado_actual = trabajo_db.estado_actual
-    nuevo_estado = estado_update.nuevo_estado
-
-    if estado_actual in VALID_TRANSITIONS and nuevo_estado not in VALID_TRANSITIONS[estado_actual]:
-        raise HTTPException(status_code=400, detail=f"Transición no permitida de '{estado_actual}' a '{nuevo_estado}'")
-    if nuevo_estado == "trabajo detenido" and not estado_update.motivo_detencion:
-        raise HTTPException(status_code=400, detail="Se requiere un motivo para detener el trabajo.")
-    if nuevo_estado == "en trabajo" and not estado_update.tecnico_id:
-        raise HTTPException(status_code=400, detail="Se requiere asignar un técnico para pasar el trabajo a 'en trabajo'.")
-
+    error = _error_transicion(trabajo_db.estado_actual, estado_update)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
     if estado_update.tecnico_id:
         tecnico = db.query(models.Tecnico).filter(models.Tecnico.id == estado_update.tecnico_id).first()
         if not tecnico:
             raise HTTPException(status_code=404, detail="Técnico no encontrado.")
-        trabajo_db.tecnico_id = estado_update.tecnico_id
         
+    ahora = datetime.datetime.utcnow()
     historial_anterior = db.query(models.HistorialDeEstado).filter(
         models.HistorialDeEstado.trabajo_id == trabajo_id, models.HistorialDeEstado.fecha_fin == None
     ).first()
+    deltas_carga: Dict[carga.Clave, int] = {}
+    nuevo_historial = _aplicar_transicion(trabajo_db, historial_anterior, estado_update, ahora, deltas_carga)
+    carga.aplicar(db, deltas_carga)
     if historial_anterior:
-        historial_anterior.fecha_fin = datetime.datetime.utcnow()
-        if historial_anterior.estado == 'agendado' and not trabajo_db.fecha_llegada_taller:
-            trabajo_db.fecha_llegada_taller = datetime.datetime.utcnow()
-            
-    nuevo_historial = models.HistorialDeEstado(
-        trabajo_id=trabajo_id, estado=nuevo_estado, motivo_detencion=estado_update.motivo_detencion,
-        detalle_motivo=estado_update.detalle_motivo, fecha_eta=estado_update.fecha_eta
-    )
+        historial_anterior.fecha_fin = ahora
+        if historial_anterior.estado in alertas.ESTADOS_A_MONITOREAR:
+            alertas.resolver_alertas_trabajo(db, trabajo_id, ahora)
     db.add(nuevo_historial)
-    trabajo_db.estado_actual = nuevo_estado
     
     db.commit()
-    db.refresh(trabajo_db)
+    cache_tablero.incrementar_version()
+    programar_plazo_permanencia(nuevo_historial)
+    trabajo_db = _cargar_trabajo_completo(db, trabajo_id)
+    eventos.publicar_evento(eventos.evento_trabajo("estado", trabajo_db))
     return trabajo_db
 
-@router.get("/{trabajo_id}/historial", response_model=List[schemas.Historial])
+# Máximo de transiciones por petición en /trabajos/transiciones/
+TRANSICIONES_LOTE_MAXIMO = int(os.getenv("TRANSICIONES_LOTE_MAXIMO", "200"))
+
+@router.post("/transiciones/", response_model=schemas.TransicionesLoteRespuesta)
+def actualizar_estados_lote(
+    lote: schemas.TransicionesLote = Body(...),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(auth.get_current_active_user)
+):
+    """
+    Varias transiciones (p. ej. mover un grupo de tarjetas del Kanban) en una sola transacción.
+    Cada una se valida como en PATCH /trabajos/{id}/estado, pero trabajos, técnicos e historiales
+    abiertos se leen con una consulta por tabla, los historiales se cierran con un único UPDATE y la
+    carga de los técnicos se ajusta con un único upsert.
+    Las no válidas se informan en `resultados` y el resto se aplica; con `atomico` no se aplica ninguna.
+    """
+    if len(lote.transiciones) > TRANSICIONES_LOTE_MAXIMO:
+        raise HTTPException(
+            status_code=400, detail=f"Se admiten hasta {TRANSICIONES_LOTE_MAXIMO} transiciones por petición."
+        )
+    H = models.HistorialDeEstado
+    trabajos_db = {
+        t.id: t for t in
+        db.query(models.Trabajo).filter(models.Trabajo.id.in_({t.trabajo_id for t in lote.transiciones}))
+    }
+    tecnicos = {
+        tecnico_id for (tecnico_id,) in
+        db.query(models.Tecnico.id).filter(models.Tecnico.id.in_({t.tecnico_id for t in lote.transiciones if t.tecnico_id}))
+    }
+
+    errores: Dict[int, str] = {}
+    vistos = set()
+    for i, transicion in enumerate(lote.transiciones):
+        trabajo_db = trabajos_db.get(transicion.trabajo_id)
+        if transicion.trabajo_id in vistos:
+            errores[i] = "El trabajo aparece más de una vez en el lote."
+        elif trabajo_db is None:
+            errores[i] = "Trabajo no encontrado"
+        elif error := _error_transicion(trabajo_db.estado_actual, transicion):
+            errores[i] = error
+        elif transicion.tecnico_id and transicion.tecnico_id not in tecnicos:
+            errores[i] = "Técnico no encontrado."
+        vistos.add(transicion.trabajo_id)
+    if lote.atomico and errores:
+        for i in range(len(lote.transiciones)):
+            errores.setdefault(i, "No se aplicó: el lote tiene transiciones no válidas.")
+
+    # Se arma antes del commit, que expira los trabajos leídos
+    resultados = []
+    for i, transicion in enumerate(lote.transiciones):
+        trabajo_db = trabajos_db.get(transicion.trabajo_id)
+        resultados.append(schemas.ResultadoTransicion(
+            trabajo_id=transicion.trabajo_id, aplicado=i not in errores, error=errores.get(i),
+            estado_actual=(
+                transicion.nuevo_estado if i not in errores
+                else trabajo_db.estado_actual if trabajo_db is not None else None
+            ),
+        ))
+
+    validas = [t for i, t in enumerate(lote.transiciones) if i not in errores]
+    nuevos_historiales = []
+    if validas:
+        ahora = datetime.datetime.utcnow()
+        ids_validos = [t.trabajo_id for t in validas]
+        anteriores = {h.trabajo_id: h for h in db.query(H).filter(H.trabajo_id.in_(ids_validos), H.fecha_fin.is_(None))}
+        deltas_carga: Dict[carga.Clave, int] = {}
+        for transicion in validas:
+            nuevos_historiales.append(_aplicar_transicion(
+                trabajos_db[transicion.trabajo_id], anteriores.get(transicion.trabajo_id), transicion, ahora,
+                deltas_carga,
+            ))
+        carga.aplicar(db, deltas_carga)
+        if anteriores:
+            db.execute(update(H).where(H.id.in_([h.id for h in anteriores.values()])).values(fecha_fin=ahora))
+        con_alertas = [h.trabajo_id for h in anteriores.values() if h.estado in alertas.ESTADOS_A_MONITOREAR]
+        if con_alertas:
+            alertas.resolver_alertas_trabajos(db, con_alertas, ahora)
+        db.add_all(nuevos_historiales)
+        try:
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error aplicando transiciones en lote: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail="Error interno al aplicar las transiciones.")
+
+        cache_tablero.incrementar_version()
+        programar_plazos_permanencia(nuevos_historiales)
+        for trabajo_db in (
+            db.query(models.Trabajo).options(joinedload(models.Trabajo.tecnico_asignado))
+            .populate_existing().filter(models.Trabajo.id.in_(ids_validos))
+        ):
+            eventos.publicar_evento(eventos.evento_trabajo("estado", trabajo_db))
+
+    return schemas.TransicionesLoteRespuesta(
+        aplicados=len(validas), rechazados=len(errores), resultados=resultados
+    )
+
+@router.get("/{trabajo_id}/historial", response_model=List[schemas.Historial],
+            dependencies=[Depends(etag_condicional(cache_tablero))])
 def leer_historial_trabajo(
     trabajo_id: int, 
     db: Session = Depends(get_db), # <- Ahora get_db está definido
-    current_user: schemas.User = Depends(auth.get_current_active_user)
+    current_user: schemas.User = Depends(auth.get_principal_lectura)
 ):
-    trabajo = db.query(models.Trabajo).filter(models.Trabajo.id == trabajo_id).first()
-    if not trabajo:
-        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
-    # Aseguramos que historial sea una lista antes de ordenar
-    historial = trabajo.historial if trabajo.historial else []
-    return sorted(historial, key=lambda x: x.fecha_inicio)
+    # Una sola consulta ordenada en BBDD; solo si viene vacía se busca en el archivo (el id se conserva
+    # al archivar) y se comprueba que el trabajo exista
+    for modelo_historial, modelo_trabajo in (
+        (models.HistorialDeEstado, models.Trabajo), (models.HistorialArchivado, models.TrabajoArchivado)
+    ):
+        historial = (
+            db.query(modelo_historial)
+            .filter(modelo_historial.trabajo_id == trabajo_id)
+            .order_by(modelo_historial.fecha_inicio, modelo_historial.id)
+            .all()
+        )
+        if historial or db.query(modelo_trabajo.id).filter(modelo_trabajo.id == trabajo_id).first():
+            return historial
+    raise HTTPException(status_code=404, detail="Trabajo no encontrado")
 
 
 # --- Funciones auxiliares de carga de Excel ---
-# ... (Estas funciones _buscar_fila_encabezado, _validar_y_renombrar_columnas, etc. se mantienen igual) ...
-
-def _buscar_fila_encabezado(df_temp: DataFrame) -> int:
-    for i, row in df_temp.head(10).iterrows():
-        if 'Pedido DBM' in row.values:
-            return i
-    return -1
-
-def _validar_y_renombrar_columnas(df: DataFrame) -> DataFrame:
-    missing_cols = [col for col in COLUMN_MAPPING.keys() if col not in df.columns]
-    if missing_cols:
-        logger.error(f"Faltan columnas en el Excel: {missing_cols}")
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Faltan las siguientes columnas en el Excel: {', '.join(missing_cols)}")
-    
-    df.rename(columns=COLUMN_MAPPING, inplace=True)
-    return df
-
-def _limpiar_dataframe(df: DataFrame) -> DataFrame:
-    date_columns = ['fecha_creacion_pedido']
-    for col in date_columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-            df[col] = df[col].apply(lambda x: x.to_pydatetime() if pd.notna(x) else None)
-    
-    df['pedido_dbm'] = pd.to_numeric(df['pedido_dbm'], errors='coerce')
-    if 'total_pedido' in df.columns:
-        df['total_pedido'] = pd.to_numeric(df['total_pedido'], errors='coerce')
+# La lectura y carga masiva viven en importacion.py (también las usa el worker de Celery)
 
-    df.dropna(subset=['pedido_dbm'], inplace=True)
-    df['pedido_dbm'] = df['pedido_dbm'].astype(int)
-    return df
+_buscar_fila_encabezado = importacion.buscar_fila_encabezado
+_validar_y_renombrar_columnas = importacion.validar_y_renombrar_columnas
+_limpiar_dataframe = importacion.limpiar_dataframe
 
 def _procesar_filas_dataframe(db: Session, df: DataFrame) -> Tuple[int, int]:
-    trabajos_creados, trabajos_actualizados = 0, 0
-    db_model_columns = {c.name for c in inspect(models.Trabajo).c}
+    # Carga set-based por lotes (ver importacion.py); conserva el detalle de error por fila
+    return importacion.upsert_trabajos(db, importacion.preparar_filas(df))
 
-    for index, row in df.iterrows():
-        try:
-            pedido_dbm_str = str(row['pedido_dbm'])
-            datos_trabajo = {key: value for key, value in row.items() if key in db_model_columns and pd.notna(value)}
-            
-            trabajo_existente = db.query(models.Trabajo).filter(models.Trabajo.pedido_dbm == pedido_dbm_str).first()
-            
-            if trabajo_existente:
-                for key, value in datos_trabajo.items():
-                    setattr(trabajo_existente, key, value)
-                trabajos_actualizados += 1
-            else:
-                nuevo_trabajo = models.Trabajo(**datos_trabajo, estado_actual="agendado")
-                db.add(nuevo_trabajo)
-                db.flush() 
-                historial_inicial = models.HistorialDeEstado(trabajo_id=nuevo_trabajo.id, estado="agendado")
-                db.add(historial_inicial)
-                trabajos_creados += 1
+# Ruta principal de carga de Excel
+async def _guardar_archivo_subido(file: UploadFile, destino) -> None:
+    while bloque := await file.read(1024 * 1024):
+        destino.write(bloque)
+
+def _importar_archivo(db: Session, ruta_archivo: str) -> Tuple[int, int]:
+    try:
+        trabajos_creados, trabajos_actualizados = importacion.upsert_trabajos(db, importacion.iterar_filas_excel(ruta_archivo))
+        db.commit()
+        cache_tablero.incrementar_version()
+        eventos.publicar_evento({"tipo": "importacion", "creados": trabajos_creados, "actualizados": trabajos_actualizados})
         
-        except Exception as e:
-            logger.error(f"Error procesando fila {index + 2}: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, 
-                detail=f"Error en la fila {index + 2} del Excel (Pedido DBM: {row.get('pedido_dbm', 'N/A')}). Detalle: {e}"
-            )
-            
+    except (SQLAlchemyError, HTTPException) as e:
+        db.rollback()
+        logger.error(f"Error al procesar las filas del Excel y guardar en BBDD: {e}", exc_info=True)
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=f"Error de base de datos durante el procesamiento: {e}")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error inesperado al procesar filas: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error inesperado al procesar filas: {e}")
+
     return trabajos_creados, trabajos_actualizados
 
-# Ruta principal de carga de Excel
 @router.post("/upload-excel/", response_model=schemas.UploadResponse, status_code=status.HTTP_201_CREATED)
 async def cargar_trabajos_desde_excel(
     file: UploadFile = File(...), 
@@ -306,39 +760,73 @@ async def cargar_trabajos_desde_excel(
     if not file.filename.lower().endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Formato de archivo inválido. Se requiere .xlsx o .xls")
     
-    contenido_bytes = await file.read()
-    
+    # El archivo se vuelca a disco por bloques y se lee en streaming: la memoria no crece con el tamaño del Excel
+    extension = os.path.splitext(file.filename)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as destino:
+        ruta_archivo = destino.name
+        await _guardar_archivo_subido(file, destino)
+
     try:
-        df_temp = pd.read_excel(io.BytesIO(contenido_bytes), header=None, engine=None)
-        header_row_index = _buscar_fila_encabezado(df_temp)
-        
-        if header_row_index == -1:
-            raise HTTPException(status_code=422, detail="No se pudo encontrar la fila de encabezado. Asegúrate que la columna 'Pedido DBM' exista.")
+        # La carga es trabajo síncrono de BD: va al threadpool para no bloquear el event loop
+        trabajos_creados, trabajos_actualizados = await run_in_threadpool(_importar_archivo, db, ruta_archivo)
+    finally:
+        os.remove(ruta_archivo)
 
-        df = pd.read_excel(io.BytesIO(contenido_bytes), header=header_row_index, engine=None)
+    return {"mensaje": "Archivo procesado exitosamente", "creados": trabajos_creados, "actualizados": trabajos_actualizados}
 
-    except Exception as e:
-        logger.error(f"Error al leer o procesar el Excel: {e}", exc_info=True)
-        if isinstance(e, HTTPException):
-            raise e
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No se pudo leer el archivo Excel: {e}")
 
-    df = _validar_y_renombrar_columnas(df)
-    df = _limpiar_dataframe(df)
+# --- Importación asíncrona (worker de Celery) ---
+IMPORTACIONES_DIR = os.getenv("IMPORTACIONES_DIR", os.path.join(tempfile.gettempdir(), "taller_importaciones"))
+
+@router.post("/importaciones/", response_model=schemas.ImportacionEstado, status_code=status.HTTP_202_ACCEPTED)
+async def crear_importacion_excel(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(auth.get_current_admin_user)
+):
+    """
+    Guarda el Excel y encola su procesamiento en el worker. Responde de inmediato con el id de la
+    importación; el progreso se consulta en GET /trabajos/importaciones/{id}.
+    """
+    if not file.filename.lower().endswith(('.xlsx', '.xls')):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Formato de archivo inválido. Se requiere .xlsx o .xls")
+
+    importacion_id = uuid.uuid4().hex
+    os.makedirs(IMPORTACIONES_DIR, exist_ok=True)
+    extension = os.path.splitext(file.filename)[1].lower()
+    ruta_archivo = os.path.join(IMPORTACIONES_DIR, f"{importacion_id}{extension}")
+    with open(ruta_archivo, "wb") as destino:
+        await _guardar_archivo_subido(file, destino)
+
+    return await run_in_threadpool(_registrar_importacion, db, importacion_id, file.filename, ruta_archivo, current_user.id)
+
+def _registrar_importacion(db: Session, importacion_id: str, nombre_archivo: str, ruta_archivo: str, usuario_id: int) -> models.ImportacionExcel:
+    importacion_db = models.ImportacionExcel(
+        id=importacion_id, nombre_archivo=nombre_archivo, ruta_archivo=ruta_archivo,
+        estado="pendiente", usuario_id=usuario_id
+    )
+    db.add(importacion_db)
+    db.commit()
 
     try:
-        trabajos_creados, trabajos_actualizados = _procesar_filas_dataframe(db, df)
-        db.commit()
-        
-    except (SQLAlchemyError, HTTPException) as e:
-        db.rollback()
-        logger.error(f"Error al procesar las filas del DataFrame y guardar en BBDD: {e}", exc_info=True)
-        if isinstance(e, HTTPException):
-            raise e
-        raise HTTPException(status_code=500, detail=f"Error de base de datos durante el procesamiento: {e}")
+        procesar_importacion_excel.delay(importacion_id)
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error inesperado al procesar filas: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error inesperado al procesar filas: {e}")
+        logger.error(f"No se pudo encolar la importación {importacion_id}: {e}", exc_info=True)
+        importacion_db.estado = "error"
+        importacion_db.mensaje = "No se pudo encolar el procesamiento del archivo."
+        db.commit()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=importacion_db.mensaje)
 
-    return {"mensaje": "Archivo procesado exitosamente", "creados": trabajos_creados, "actualizados": trabajos_actualizados}
\ No newline at end of file
+    # Se relee: con CELERY_TASK_ALWAYS_EAGER la tarea ya pudo haber avanzado
+    return db.get(models.ImportacionExcel, importacion_id, populate_existing=True)
+
+@router.get("/importaciones/{importacion_id}", response_model=schemas.ImportacionEstado)
+def leer_importacion_excel(
+    importacion_id: str,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(auth.get_current_admin_user)
+):
+    importacion_db = db.get(models.ImportacionExcel, importacion_id)
+    if not importacion_db:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return importacion_db
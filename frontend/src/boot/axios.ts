@@ -1,5 +1,5 @@
 import { boot } from 'quasar/wrappers';
-import axios, { AxiosInstance, InternalAxiosRequestConfig } from 'axios';
+import axios, { AxiosInstance, AxiosResponse, InternalAxiosRequestConfig } from 'axios';
 import { Notify } from 'quasar';
 import { useAuthStore } from 'stores/auth'; // Importamos el store de Auth
 
@@ -8,6 +8,24 @@ const api: AxiosInstance = axios.create({
   baseURL: '/api',
 });
 
+// GET condicionales: se guarda el último ETag y cuerpo de cada URL (con sus parámetros) y se envía
+// If-None-Match; si el backend responde 304 se entrega el cuerpo guardado como una respuesta 200.
+const MAX_RESPUESTAS_VALIDADAS = 50;
+const respuestasValidadas = new Map<string, { etag: string; data: unknown }>();
+
+const claveValidacion = (config: InternalAxiosRequestConfig) => api.getUri(config);
+
+const guardarValidada = (response: AxiosResponse) => {
+  const etag = response.headers?.etag;
+  if (response.config.method !== 'get' || !etag) return;
+  const clave = claveValidacion(response.config);
+  respuestasValidadas.delete(clave);
+  respuestasValidadas.set(clave, { etag, data: response.data });
+  if (respuestasValidadas.size > MAX_RESPUESTAS_VALIDADAS) {
+    respuestasValidadas.delete(respuestasValidadas.keys().next().value as string);
+  }
+};
+
 // 2. EXPORTACIÓN PARA USO EXTERNO
 // Exportamos la instancia `api` para poder importarla directamente.
 export { api };
@@ -26,6 +44,12 @@ export default boot(({ app, router }) => {
       if (token) {
         config.headers.Authorization = `Bearer ${token}`;
       }
+
+      const validada = config.method === 'get' ? respuestasValidadas.get(claveValidacion(config)) : undefined;
+      if (validada) {
+        config.headers['If-None-Match'] = validada.etag;
+        config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+      }
       return config;
     },
     (error) => {
@@ -35,7 +59,19 @@ export default boot(({ app, router }) => {
 
   // 5. INTERCEPTOR DE RESPUESTAS (RESPONSE)
   api.interceptors.response.use(
-    (response) => response,
+    (response) => {
+      if (response.status === 304) {
+        const validada = respuestasValidadas.get(claveValidacion(response.config));
+        if (!validada) {
+          // El cuerpo guardado se descartó mientras tanto: se pide de nuevo sin validador
+          response.config.headers.delete('If-None-Match');
+          return api.request(response.config);
+        }
+        return { ...response, status: 200, data: validada.data };
+      }
+      guardarValidada(response);
+      return response;
+    },
     (error) => {
       // Verificamos si el error es de tipo 401 (Unauthorized).
       if (error.response && error.response.status === 401) {
@@ -0,0 +1,31 @@
+// src/composables/useEventosTablero.ts
+
+import { onBeforeUnmount, onMounted } from 'vue';
+import { useAuthStore } from 'stores/auth';
+import { useTrabajosStore } from 'stores/trabajosStore';
+
+/**
+ * Mantiene el tablero al día escuchando /eventos/stream (SSE) en lugar de recargar periódicamente.
+ * Los deltas de un trabajo se aplican en el store; una importación o un pedido de
+ * resincronización recargan la página actual.
+ */
+export function useEventosTablero() {
+  const authStore = useAuthStore();
+  const trabajosStore = useTrabajosStore();
+  let fuente: EventSource | null = null;
+
+  const conectar = () => {
+    if (!authStore.token) return;
+    // EventSource no permite cabeceras: el token va como query param
+    fuente = new EventSource(`/api/eventos/stream?token=${encodeURIComponent(authStore.token)}`);
+
+    const aplicar = (mensaje: MessageEvent) => trabajosStore.aplicarEvento(JSON.parse(mensaje.data));
+    fuente.addEventListener('estado', aplicar);
+    fuente.addEventListener('actualizacion', aplicar);
+    fuente.addEventListener('importacion', () => trabajosStore.fetchTrabajos());
+    fuente.addEventListener('resincronizar', () => trabajosStore.fetchTrabajos());
+  };
+
+  onMounted(conectar);
+  onBeforeUnmount(() => fuente?.close());
+}
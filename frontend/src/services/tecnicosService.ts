@@ -8,6 +8,15 @@ interface Tecnico {
   // Agrega aquí otros campos si los hubiera, ej: especialidad
 }
 
+// Carga de trabajo de un técnico (GET /tecnicos/carga)
+export interface CargaTecnico {
+  tecnico_id: number;
+  nombre: string;
+  activos: number;
+  detenidos: number;
+  por_estado: Record<string, number>;
+}
+
 // Interfaz para la creación (no se necesita ID)
 interface TecnicoCreate {
   nombre: string;
@@ -31,6 +40,23 @@ export const tecnicosService = {
     }
   },
 
+  /**
+   * Obtiene los técnicos con su carga de trabajo (trabajos activos por estado y detenidos).
+   */
+  getCarga: async (): Promise<CargaTecnico[]> => {
+    try {
+      const response = await api.get<CargaTecnico[]>('/tecnicos/carga');
+      return response.data;
+    } catch (error) {
+      Notify.create({
+        type: 'negative',
+        message: 'Error al cargar la carga de los técnicos',
+      });
+      console.error('Error fetching carga de tecnicos:', error);
+      throw error;
+    }
+  },
+
   /**
    * Crea un nuevo técnico.
    */
@@ -14,6 +14,13 @@ export const trabajosService = {
     return api.get('/trabajos/', { params });
   },
 
+  /**
+   * Valores de asesor, marca, tipo de pedido, estado y técnico (con conteos) para los filtros dados.
+   */
+  getFacetas(params: Record<string, any>): Promise<AxiosResponse<any>> {
+    return api.get('/trabajos/facetas', { params });
+  },
+
   /**
    * Actualiza el estado de un trabajo específico.
    */
@@ -21,6 +28,14 @@ export const trabajosService = {
     return api.patch(`/trabajos/${id}/estado`, payload);
   },
 
+  /**
+   * Aplica varias transiciones de estado en una sola petición (mover un grupo de tarjetas).
+   * Con `atomico` no se aplica ninguna si alguna no es válida; la respuesta trae el resultado de cada una.
+   */
+  updateEstados(transiciones: Record<string, any>[], atomico = false): Promise<AxiosResponse<any>> {
+    return api.post('/trabajos/transiciones/', { transiciones, atomico });
+  },
+
   /**
    * Actualiza los detalles de un trabajo (como la descripción).
    */
@@ -28,6 +43,13 @@ export const trabajosService = {
     return api.patch(`/trabajos/${id}`, payload);
   },
 
+  /**
+   * Descarga los trabajos que cumplen los filtros (los mismos de getAll) en CSV o XLSX.
+   */
+  exportar(params: Record<string, any>, formato: 'csv' | 'xlsx'): Promise<AxiosResponse<Blob>> {
+    return api.get('/trabajos/exportar', { params: { ...params, formato }, responseType: 'blob' });
+  },
+
   /**
    * Obtiene el historial de estados de un trabajo.
    */
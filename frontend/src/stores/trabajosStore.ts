@@ -86,16 +86,15 @@ export const useTrabajosStore = defineStore('trabajos', {
           estado_actual: this.filters.estado_actual || undefined,
           asesor_servicio: this.filters.asesor_servicio || undefined,
           fecha_inicio: this.filters.dateRange?.from || undefined,
-          fecha_fin: this.filters.dateRange?.to || undefined
+          fecha_fin: this.filters.dateRange?.to || undefined,
+          // Tarjeta reducida: el historial se pide aparte al abrir el diálogo
+          include: 'tecnico_asignado'
         };
 
         const response = await trabajosService.getAll(params);
         this.trabajos = response.data.items;
         this.pagination.rowsNumber = response.data.total;
-        
-        if (response.data.items.length > 0) {
-           this.opcionesAsesor = [...new Set(response.data.items.map(item => item.asesor_servicio).filter(Boolean))];
-        }
+        this.fetchFacetas();
 
       } catch (err: any) {
         if (err.response?.status !== 401) {
@@ -106,6 +105,26 @@ export const useTrabajosStore = defineStore('trabajos', {
       }
     },
 
+    /**
+     * Opciones de los desplegables de filtros (asesores, etc.) para los filtros actuales.
+     * El backend las sirve desde caché (y con ETag), así que es una petición barata.
+     */
+    async fetchFacetas() {
+      try {
+        const response = await trabajosService.getFacetas({
+          search: this.filters.search || undefined,
+          estado_actual: this.filters.estado_actual || undefined,
+          asesor_servicio: this.filters.asesor_servicio || undefined,
+          fecha_desde: this.filters.dateRange?.from || undefined,
+          fecha_hasta: this.filters.dateRange?.to || undefined
+        });
+        this.opcionesAsesor = response.data.asesor_servicio.map((faceta: { valor: string }) => faceta.valor);
+      } catch (err) {
+        // Sin facetas el panel sigue funcionando: se conservan las opciones anteriores
+        console.error('Error al cargar las facetas:', err);
+      }
+    },
+
     /**
      * ACCIÓN INTERNA: Actualiza el estado en la API.
      * Esta acción es llamada por 'manejarCambioDeEstado' después de las confirmaciones.
@@ -246,6 +265,30 @@ export const useTrabajosStore = defineStore('trabajos', {
       }
     },
 
+    /**
+     * Aplica un delta recibido por el flujo de eventos (ver useEventosTablero).
+     * Si el trabajo no está en la página actual se ignora.
+     */
+    aplicarEvento(evento: Record<string, any>) {
+      const trabajoIndex = this.trabajos.findIndex(t => t.id === evento.trabajo_id);
+      if (trabajoIndex === -1 || this.updatingIds.has(evento.trabajo_id)) return;
+
+      if (evento.estado_actual === 'entregado al cliente') {
+        this.trabajos.splice(trabajoIndex, 1);
+        this.pagination.rowsNumber--;
+        return;
+      }
+      const actual = this.trabajos[trabajoIndex];
+      this.trabajos[trabajoIndex] = {
+        ...actual,
+        estado_actual: evento.estado_actual,
+        tecnico_id: evento.tecnico_id,
+        tecnico_asignado: evento.tecnico_id ? { ...actual.tecnico_asignado, id: evento.tecnico_id, nombre: evento.tecnico_nombre } : null,
+        fecha_llegada_taller: evento.fecha_llegada_taller,
+        detenido_desde: evento.detenido_desde
+      };
+    },
+
     /**
      * Limpia todos los filtros aplicados y vuelve a cargar los datos.
      */